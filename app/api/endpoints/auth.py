@@ -30,7 +30,7 @@ async def register(
     """Register a new user."""
     # Check rate limit
     client_ip = request.client.host
-    if not check_rate_limit(client_ip, limit=10):  # Stricter limit for registrations
+    if not await check_rate_limit(client_ip, limit=10):  # Stricter limit for registrations
         raise HTTPException(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
             detail="Too many registration attempts. Please try again later."
@@ -48,7 +48,7 @@ async def login_for_access_token(
     """Authenticate a user and generate access token."""
     # Check rate limit
     client_ip = request.client.host
-    if not check_rate_limit(client_ip, limit=10):  # Stricter limit for login attempts
+    if not await check_rate_limit(client_ip, limit=10):  # Stricter limit for login attempts
         raise HTTPException(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
             detail="Too many login attempts. Please try again later."
@@ -218,7 +218,7 @@ async def google_login(
     """Authenticate a user with Google OAuth token and generate access token."""
     # Check rate limit
     client_ip = request.client.host
-    if not check_rate_limit(client_ip, limit=10):
+    if not await check_rate_limit(client_ip, limit=10):
         raise HTTPException(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
             detail="Too many login attempts. Please try again later."
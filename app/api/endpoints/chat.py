@@ -1,35 +1,89 @@
 from fastapi import APIRouter, Depends, HTTPException, Path, Request
+from fastapi.responses import StreamingResponse
 from uuid import uuid4
+import json
 from typing import List, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import func as sql_func
+from sqlalchemy import func as sql_func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.schemas import (
     ChatRequest, ChatResponse, User, 
     ConversationResponse, ConversationDetailResponse, 
     ConversationListResponse
 )
-from app.services.chatbot import get_chat_response
-from app.dependencies import get_retriever, get_llm, get_conversation_memory
+from app.services.chatbot import get_chat_response, stream_chat_response
+from app.services.session_memory import get_session_store
+from app.dependencies import get_category_retriever, get_llm
+from app.utils.concurrency import run_blocking
 from app.services.auth import get_current_active_user, check_rate_limit, get_current_user_optional
 from app.services.conversation import (
     create_conversation, get_conversation_by_session_id, 
     add_message, get_conversation_messages, get_user_conversations,
     delete_conversation
 )
-from app.database import get_db, Conversation
+from app.database import get_async_db, AsyncSessionLocal, Conversation
 from app.config import settings
 
 router = APIRouter()
 
+
+def normalize_category(category: str) -> Optional[str]:
+    """
+    Match a category from a URL against settings.LEGAL_CATEGORIES.
+    
+    Accepts exact names as well as kebab-case and case-insensitive variants
+    (e.g. "know-your-rights" for "Know Your Rights").
+    
+    Returns:
+        The matching category name, or None if there is no match
+    """
+    # 1. Direct matching
+    if category in settings.LEGAL_CATEGORIES:
+        return category
+    
+    # 2. Convert kebab-case to proper case
+    category_normalized = " ".join(word.capitalize() for word in category.split("-"))
+    if category_normalized in settings.LEGAL_CATEGORIES:
+        return category_normalized
+    
+    # 3. Case-insensitive matching
+    return next((c for c in settings.LEGAL_CATEGORIES 
+                 if c.lower() == category_normalized.lower() 
+                 or c.lower().replace(" ", "-") == category.lower()
+                 or c.lower().replace(" ", "") == category.lower().replace("-", "")), None)
+
+
+def session_owner(request: Request, current_user: Optional[User]) -> str:
+    """Who a chat session belongs to: the signed-in user, or the client IP for anonymous chats."""
+    if current_user:
+        return f"user:{current_user.id}"
+    return f"ip:{request.client.host}"
+
+
+async def load_conversation_memory(request: Request, chat_request: ChatRequest, current_user: Optional[User]):
+    """
+    Get conversation memory for a chat request's session from the session
+    store. Sessions are scoped to their owner (see session_owner), so a
+    session_id never gives access to another caller's memory. The message
+    history sent by the client is only used for sessions the store doesn't know.
+    """
+    return await get_session_store().load(
+        chat_request.session_id, session_owner(request, current_user), chat_request.messages
+    )
+
+
+def format_sse(event: str, data: dict) -> str:
+    """Format a Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
 @router.post("/", response_model=ChatResponse)
 async def chat(
     request: Request,
     chat_request: ChatRequest,
     current_user: User = Depends(get_current_active_user),
-    retriever = Depends(get_retriever),
     llm = Depends(get_llm),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Process a chat request and return a response.
@@ -38,36 +92,24 @@ async def chat(
     - **category**: Legal category
     - **language**: Response language (default: English)
     - **session_id**: Unique session identifier
-    - **messages**: Previous messages in the conversation (optional)
+    - **messages**: Previous messages, only needed to start a session the server doesn't know (optional)
     """
     # Apply rate limiting
     client_id = f"user:{current_user.id}"
-    if not check_rate_limit(client_id):
+    if not await check_rate_limit(client_id):
         raise HTTPException(
             status_code=429,
             detail="Rate limit exceeded. Please try again later."
         )
         
     try:
-        # Get or create conversation memory for this session
-        memory = get_conversation_memory(chat_request.session_id)
-        
-        # If message history is provided, populate the memory with it
-        if chat_request.messages:
-            # Clear existing memory to avoid duplicates
-            memory.clear()
-            
-            # Add all messages to the memory
-            for msg in chat_request.messages:
-                if msg['role'] == 'user':
-                    memory.chat_memory.add_user_message(msg['content'])
-                elif msg['role'] == 'assistant':
-                    memory.chat_memory.add_ai_message(msg['content'])
+        # Get conversation memory for this session
+        memory = await load_conversation_memory(request, chat_request, current_user)
         
         # Get or create conversation in the database
-        conversation = get_conversation_by_session_id(db, chat_request.session_id)
+        conversation = await get_conversation_by_session_id(db, chat_request.session_id)
         if not conversation:
-            conversation = create_conversation(
+            conversation = await create_conversation(
                 db, 
                 user_id=current_user.id, 
                 session_id=chat_request.session_id,
@@ -75,10 +117,15 @@ async def chat(
             )
         
         # Store user's message in the database
-        add_message(db, conversation.id, "user", chat_request.query)
+        await add_message(db, conversation.id, "user", chat_request.query)
             
+        # Search the category's own index where there is one
+        retriever = await run_blocking(
+            get_category_retriever, normalize_category(chat_request.category) or chat_request.category
+        )
+        
         # Get response from chatbot service
-        response = get_chat_response(
+        response = await get_chat_response(
             query=chat_request.query,
             category=chat_request.category,
             language=chat_request.language,
@@ -86,9 +133,10 @@ async def chat(
             llm=llm,
             memory=memory
         )
+        await get_session_store().save(memory)
         
         # Store assistant's response in the database
-        add_message(db, conversation.id, "assistant", response["answer"])
+        await add_message(db, conversation.id, "assistant", response["answer"])
         
         # Set the conversation_id in the response
         response["conversation_id"] = conversation.id
@@ -104,9 +152,8 @@ async def category_chat(
     chat_request: ChatRequest,
     category: str = Path(..., description="Legal category"),
     current_user: User = Depends(get_current_active_user),
-    retriever = Depends(get_retriever),
     llm = Depends(get_llm),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Process a category-specific chat request and return a response.
@@ -115,11 +162,11 @@ async def category_chat(
     - **query**: User's question
     - **language**: Response language (default: English)
     - **session_id**: Unique session identifier
-    - **messages**: Previous messages in the conversation (optional)
+    - **messages**: Previous messages, only needed to start a session the server doesn't know (optional)
     """
     # Apply rate limiting
     client_id = f"user:{current_user.id}"
-    if not check_rate_limit(client_id):
+    if not await check_rate_limit(client_id):
         raise HTTPException(
             status_code=429,
             detail="Rate limit exceeded. Please try again later."
@@ -133,25 +180,13 @@ async def category_chat(
     chat_request.category = category
     
     try:
-        # Get or create conversation memory for this session
-        memory = get_conversation_memory(chat_request.session_id)
-        
-        # If message history is provided, populate the memory with it
-        if chat_request.messages:
-            # Clear existing memory to avoid duplicates
-            memory.clear()
-            
-            # Add all messages to the memory
-            for msg in chat_request.messages:
-                if msg['role'] == 'user':
-                    memory.chat_memory.add_user_message(msg['content'])
-                elif msg['role'] == 'assistant':
-                    memory.chat_memory.add_ai_message(msg['content'])
+        # Get conversation memory for this session
+        memory = await load_conversation_memory(request, chat_request, current_user)
         
         # Get or create conversation in the database
-        conversation = get_conversation_by_session_id(db, chat_request.session_id)
+        conversation = await get_conversation_by_session_id(db, chat_request.session_id)
         if not conversation:
-            conversation = create_conversation(
+            conversation = await create_conversation(
                 db, 
                 user_id=current_user.id, 
                 session_id=chat_request.session_id,
@@ -159,10 +194,13 @@ async def category_chat(
             )
         
         # Store user's message in the database
-        add_message(db, conversation.id, "user", chat_request.query)
+        await add_message(db, conversation.id, "user", chat_request.query)
+        
+        # Search the category's own index where there is one
+        retriever = await run_blocking(get_category_retriever, category)
         
         # Get response from chatbot service with strict category relevance check
-        response = get_chat_response(
+        response = await get_chat_response(
             query=chat_request.query,
             category=category,
             language=chat_request.language,
@@ -171,9 +209,10 @@ async def category_chat(
             memory=memory,
             strict_category_check=True  # Enforce strict category relevance
         )
+        await get_session_store().save(memory)
         
         # Store assistant's response in the database
-        add_message(db, conversation.id, "assistant", response["answer"])
+        await add_message(db, conversation.id, "assistant", response["answer"])
         
         # Set the conversation_id in the response
         response["conversation_id"] = conversation.id
@@ -190,9 +229,8 @@ async def public_chat(
     chat_request: ChatRequest,
     category: str = Path(..., description="Legal category"),
     current_user: User = Depends(get_current_user_optional),
-    retriever = Depends(get_retriever),
     llm = Depends(get_llm),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Public chat endpoint that doesn't require authentication.
@@ -201,12 +239,12 @@ async def public_chat(
     - **query**: User's question
     - **language**: Response language (default: English)
     - **session_id**: Unique session identifier
-    - **messages**: Previous messages in the conversation (optional)
+    - **messages**: Previous messages, only needed to start a session the server doesn't know (optional)
     """
     # Apply basic rate limiting based on IP address
     client_ip = request.client.host
     client_id = f"ip:{client_ip}"
-    if not check_rate_limit(client_id, limit=10):  # Lower limit for non-auth users
+    if not await check_rate_limit(client_id, limit=10):  # Lower limit for non-auth users
         raise HTTPException(
             status_code=429,
             detail="Rate limit exceeded. Please try again later or login for higher limits."
@@ -216,69 +254,29 @@ async def public_chat(
         # Log the request
         print(f"Public chat request: category={category}, query={chat_request.query[:50]}...")
         
-        # Try different formats for category matching
-        # 1. Direct matching
-        if category in settings.LEGAL_CATEGORIES:
-            category_normalized = category
-        else:
-            # 2. Convert kebab-case to proper case
-            category_normalized = " ".join(word.capitalize() for word in category.split("-"))
-            
-            # 3. Try more flexible matching if direct match fails
-            if category_normalized not in settings.LEGAL_CATEGORIES:
-                # Case-insensitive matching
-                category_matched = next((c for c in settings.LEGAL_CATEGORIES 
-                                    if c.lower() == category_normalized.lower() 
-                                    or c.lower().replace(" ", "-") == category.lower()
-                                    or c.lower().replace(" ", "") == category.lower().replace("-", "")), None)
-                
-                if category_matched:
-                    category_normalized = category_matched
-                else:
-                    # If we still can't find a match, try a special case for 'know-your-rights'
-                    if category.lower() == 'know-your-rights':
-                        category_matched = next((c for c in settings.LEGAL_CATEGORIES 
-                                        if c.lower() == 'know your rights'), None)
-                        if category_matched:
-                            category_normalized = category_matched
-                        else:
-                            raise HTTPException(
-                                status_code=400, 
-                                detail=f"Invalid category '{category}'. Available categories are: {', '.join(settings.LEGAL_CATEGORIES)}"
-                            )
-                    else:
-                        raise HTTPException(
-                            status_code=400, 
-                            detail=f"Invalid category '{category}'. Available categories are: {', '.join(settings.LEGAL_CATEGORIES)}"
-                        )
+        # Match the category against the known categories
+        category_normalized = normalize_category(category)
+        if not category_normalized:
+            raise HTTPException(
+                status_code=400, 
+                detail=f"Invalid category '{category}'. Available categories are: {', '.join(settings.LEGAL_CATEGORIES)}"
+            )
         
         # If category is valid, update the request category field
         chat_request.category = category_normalized
         print(f"Matched category: {category_normalized}")
         
-        # Get or create conversation memory for this session
-        memory = get_conversation_memory(chat_request.session_id)
-        
-        # If message history is provided, populate the memory with it
-        if chat_request.messages:
-            # Clear existing memory to avoid duplicates
-            memory.clear()
-            
-            # Add all messages to the memory
-            for msg in chat_request.messages:
-                if msg['role'] == 'user':
-                    memory.chat_memory.add_user_message(msg['content'])
-                elif msg['role'] == 'assistant':
-                    memory.chat_memory.add_ai_message(msg['content'])
+        # Get conversation memory for this session
+        memory = await load_conversation_memory(request, chat_request, current_user)
         
         # For public chats without authentication, we might not store conversations
         # unless the user is authenticated
         conversation_id = "public-" + str(uuid4())
         if current_user:
             # Store conversation if user is authenticated
-            conversation = get_conversation_by_session_id(db, chat_request.session_id)
+            conversation = await get_conversation_by_session_id(db, chat_request.session_id)
             if not conversation:
-                conversation = create_conversation(
+                conversation = await create_conversation(
                     db, 
                     user_id=current_user.id, 
                     session_id=chat_request.session_id,
@@ -286,11 +284,14 @@ async def public_chat(
                 )
             
             # Store user's message in the database
-            add_message(db, conversation.id, "user", chat_request.query)
+            await add_message(db, conversation.id, "user", chat_request.query)
             conversation_id = conversation.id
         
+        # Search the category's own index where there is one
+        retriever = await run_blocking(get_category_retriever, category_normalized)
+        
         # Get response from chatbot service with strict category relevance check
-        response = get_chat_response(
+        response = await get_chat_response(
             query=chat_request.query,
             category=category_normalized,
             language=chat_request.language,
@@ -299,12 +300,13 @@ async def public_chat(
             memory=memory,
             strict_category_check=True  # Enforce strict category relevance
         )
+        await get_session_store().save(memory)
         
         # Store assistant's response if user is authenticated
         if current_user:
-            conversation = get_conversation_by_session_id(db, chat_request.session_id)
+            conversation = await get_conversation_by_session_id(db, chat_request.session_id)
             if conversation:
-                add_message(db, conversation.id, "assistant", response["answer"])
+                await add_message(db, conversation.id, "assistant", response["answer"])
         
         # Set the conversation_id in the response
         response["conversation_id"] = conversation_id
@@ -318,6 +320,100 @@ async def public_chat(
         raise HTTPException(status_code=500, detail=f"Error processing chat request: {str(e)}")
 
 
+@router.post("/stream/{category}")
+async def stream_chat(
+    request: Request,
+    chat_request: ChatRequest,
+    category: str = Path(..., description="Legal category"),
+    current_user: User = Depends(get_current_user_optional),
+    llm = Depends(get_llm),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Stream a chat response as Server-Sent Events.
+    
+    Emits `token` events with answer text as it is generated, followed by a
+    single `done` event carrying the full answer, sources, suggested_questions
+    and message_type. Authentication is optional, as for the public endpoint;
+    conversations are only stored for authenticated users.
+    
+    - **category**: Legal category (from path)
+    - **query**: User's question
+    - **language**: Response language (default: English)
+    - **session_id**: Unique session identifier
+    - **messages**: Previous messages, only needed to start a session the server doesn't know (optional)
+    """
+    # Apply rate limiting: per user if authenticated, otherwise per IP
+    if current_user:
+        rate_limited = not await check_rate_limit(f"user:{current_user.id}")
+    else:
+        rate_limited = not await check_rate_limit(f"ip:{request.client.host}", limit=10)
+    if rate_limited:
+        raise HTTPException(
+            status_code=429,
+            detail="Rate limit exceeded. Please try again later."
+        )
+    
+    # Match the category against the known categories
+    category_normalized = normalize_category(category)
+    if not category_normalized:
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Invalid category '{category}'. Available categories are: {', '.join(settings.LEGAL_CATEGORIES)}"
+        )
+    chat_request.category = category_normalized
+    
+    # Get conversation memory for this session
+    memory = await load_conversation_memory(request, chat_request, current_user)
+    retriever = await run_blocking(get_category_retriever, category_normalized)
+    
+    conversation_id = "public-" + str(uuid4())
+    if current_user:
+        conversation = await get_conversation_by_session_id(db, chat_request.session_id)
+        if not conversation:
+            conversation = await create_conversation(
+                db, 
+                user_id=current_user.id, 
+                session_id=chat_request.session_id,
+                category=category_normalized
+            )
+        
+        # Store user's message in the database
+        await add_message(db, conversation.id, "user", chat_request.query)
+        conversation_id = conversation.id
+    
+    async def event_stream():
+        async for event, data in stream_chat_response(
+            query=chat_request.query,
+            category=category_normalized,
+            language=chat_request.language,
+            retriever=retriever,
+            llm=llm,
+            memory=memory,
+            strict_category_check=True
+        ):
+            if event == "done":
+                await get_session_store().save(memory)
+                data["conversation_id"] = conversation_id
+                data = ChatResponse(**data).model_dump(mode="json")
+                
+                # Store assistant's response once the answer is complete. The
+                # request's session may already be closed by now, so use a new one.
+                if current_user:
+                    async with AsyncSessionLocal() as session:
+                        await add_message(session, conversation_id, "assistant", data["answer"])
+            yield format_sse(event, data)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # Disable proxy buffering (nginx)
+        }
+    )
+
+
 @router.post("/session")
 async def create_session():
     """Create a new chat session and return a session ID."""
@@ -372,7 +468,7 @@ async def list_conversations(
     skip: int = 0,
     limit: int = 10,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get all conversations for the current user.
@@ -380,8 +476,10 @@ async def list_conversations(
     - **skip**: Number of records to skip for pagination
     - **limit**: Maximum number of records to return
     """
-    conversations = get_user_conversations(db, current_user.id, skip, limit)
-    total = db.query(sql_func.count('*')).select_from(Conversation).filter(Conversation.user_id == current_user.id).scalar()
+    conversations = await get_user_conversations(db, current_user.id, skip, limit)
+    total = await db.scalar(
+        select(sql_func.count()).select_from(Conversation).where(Conversation.user_id == current_user.id)
+    )
     
     return {
         "conversations": conversations,
@@ -393,17 +491,20 @@ async def list_conversations(
 async def get_conversation(
     conversation_id: str,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get a conversation by ID with all messages.
     
     - **conversation_id**: Conversation ID
     """
-    conversation = db.query(Conversation).filter(
-        Conversation.id == conversation_id,
-        Conversation.user_id == current_user.id
-    ).first()
+    result = await db.execute(
+        select(Conversation).where(
+            Conversation.id == conversation_id,
+            Conversation.user_id == current_user.id
+        )
+    )
+    conversation = result.scalars().first()
     
     if not conversation:
         raise HTTPException(
@@ -412,7 +513,7 @@ async def get_conversation(
         )
     
     # Get all messages for this conversation
-    messages = get_conversation_messages(db, conversation_id)
+    messages = await get_conversation_messages(db, conversation_id)
     
     # Include messages in the response
     return {
@@ -425,7 +526,7 @@ async def get_conversation(
 async def remove_conversation(
     conversation_id: str,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Delete a conversation.
@@ -433,10 +534,13 @@ async def remove_conversation(
     - **conversation_id**: Conversation ID
     """
     # First check if the conversation belongs to the user
-    conversation = db.query(Conversation).filter(
-        Conversation.id == conversation_id,
-        Conversation.user_id == current_user.id
-    ).first()
+    result = await db.execute(
+        select(Conversation).where(
+            Conversation.id == conversation_id,
+            Conversation.user_id == current_user.id
+        )
+    )
+    conversation = result.scalars().first()
     
     if not conversation:
         raise HTTPException(
@@ -445,7 +549,7 @@ async def remove_conversation(
         )
     
     # Delete the conversation
-    deleted = delete_conversation(db, conversation_id)
+    deleted = await delete_conversation(db, conversation_id)
     
     if deleted:
         return {"status": "ok", "message": "Conversation deleted"}
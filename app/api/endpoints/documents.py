@@ -10,6 +10,7 @@ from app.models.schemas import DocumentAnalysisResponse, User
 from app.services.auth import get_current_active_user, check_rate_limit
 from app.dependencies import get_llm
 from app.services.document_analysis import analyze_document
+from app.utils.concurrency import run_blocking
 from app.config import settings
 
 router = APIRouter()
@@ -32,7 +33,7 @@ async def upload_document(
     """
     # Apply rate limiting
     client_id = f"user:{current_user.id}"
-    if not check_rate_limit(client_id):
+    if not await check_rate_limit(client_id):
         raise HTTPException(
             status_code=429,
             detail="Rate limit exceeded. Please try again later."
@@ -57,11 +58,14 @@ async def upload_document(
         file_path = os.path.join(user_upload_dir, filename)
         
         # Save the uploaded file
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(document.file, buffer)
+        def save_upload():
+            with open(file_path, "wb") as buffer:
+                shutil.copyfileobj(document.file, buffer)
+        await run_blocking(save_upload)
         
-        # Analyze the document
-        analysis_result = analyze_document(
+        # Analyze the document (synchronous PDF parsing and LLM calls)
+        analysis_result = await run_blocking(
+            analyze_document,
             file_path=file_path, 
             document_type=document_type, 
             language=language,
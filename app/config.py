@@ -31,12 +31,43 @@ class Settings(BaseSettings):
     # Embedding model settings
     EMBEDDING_MODEL: str = "models/embedding-001"
     
+    # Embedding cache: vectors are stored on disk keyed by model and text hash
+    # (an empty path disables it) and recent query vectors are kept in memory
+    EMBEDDING_CACHE_PATH: str = os.getenv("EMBEDDING_CACHE_PATH", "embedding_cache.db")
+    EMBEDDING_QUERY_CACHE_SIZE: int = 1024
+    
     # LLM settings
     LLM_MODEL: str = "llama3-70b-8192"
     
+    # "single_pass" writes answers in their final conversational style in the
+    # QA prompt; "structured" also returns follow-up questions and the sources
+    # used in the same generation, as JSON; "rewrite" restyles each answer
+    # with a second LLM call
+    ANSWER_MODE: str = os.getenv("ANSWER_MODE", "single_pass")
+    
+    # Follow-ups that refer back to earlier turns are rewritten into standalone
+    # questions by this smaller, faster model; self-contained queries (at
+    # least SELF_CONTAINED_MIN_WORDS words, no back-references) skip rewriting
+    CONDENSE_MODEL: str = os.getenv("CONDENSE_MODEL", "llama-3.1-8b-instant")
+    SELF_CONTAINED_MIN_WORDS: int = 5
+    
+    # Connection pool shared by LLM clients
+    LLM_MAX_CONNECTIONS: int = 100
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    LLM_KEEPALIVE_EXPIRY: float = 60.0
+    
     # Translation settings
     ENABLE_TRANSLATION: bool = True
     
+    # "direct" has the QA prompt answer in the user's language, with a fixed
+    # legal glossary (answers that still come back in English are translated);
+    # "translate" answers in English and translates afterwards
+    TRANSLATION_MODE: str = os.getenv("TRANSLATION_MODE", "direct")
+    
+    # Segment-level translation memory (set a path to persist it on disk)
+    TRANSLATION_MEMORY_SIZE: int = 5000
+    TRANSLATION_MEMORY_PATH: str = os.getenv("TRANSLATION_MEMORY_PATH", "")
+    
     # Supported languages
     SUPPORTED_LANGUAGES: dict = {
         "English": "en",
@@ -55,13 +86,134 @@ class Settings(BaseSettings):
         "Consumer Law",
         "Corporate Law",
     ]
-    
+
+    # Short description of each category, used to route queries
+    CATEGORY_DESCRIPTIONS: dict = {
+        "Know Your Rights": "Fundamental rights of citizens under the Constitution of India, rights on arrest, police procedure, free legal aid, RTI and everyday legal protections.",
+        "Criminal Law": "Crimes and punishments under the Indian Penal Code and criminal procedure: FIR, arrest, bail, trial and offences such as theft, cheating, assault, murder and sexual offences.",
+        "Civil Law": "Civil disputes between private parties: contracts, civil suits, recovery of money, injunctions, torts, limitation, and labour and employment disputes.",
+        "Family Law": "Marriage, divorce, maintenance, alimony, child custody, adoption, succession, inheritance and wills under personal laws in India.",
+        "Cyber Law": "Online and computer offences under the Information Technology Act: hacking, online fraud, identity theft, cyber stalking, data protection and social media crimes.",
+        "Property Law": "Ownership, sale, transfer, registration and inheritance of land and buildings, tenancy and eviction, property disputes and stamp duty.",
+        "Consumer Law": "Consumer rights and complaints under the Consumer Protection Act: defective goods, deficient services, unfair trade practices and consumer courts.",
+        "Corporate Law": "Companies and business regulation under the Companies Act 2013: incorporation, directors, shareholders, compliance, winding up, customs duties and copyright.",
+    }
+
+    # Source documents in LEGAL-DATA that belong to each category
+    CATEGORY_SOURCES: dict = {
+        "Know Your Rights": ["know_your_rights.pdf", "COI.pdf"],
+        "Criminal Law": ["criminal_law.pdf", "ipc_act.pdf", "CSdivTheCriminalLawAct_14082018_0.pdf"],
+        "Civil Law": ["Labour Act.pdf"],
+        "Property Law": ["property_law.pdf"],
+        "Corporate Law": ["CompaniesAct2013.pdf", "customacta1962-52.pdf", "CopyrightRules1957.pdf"],
+    }
+
+    # Embedding category classifier: a query scoring at least ACCEPT against its
+    # category is relevant, below REJECT (or beaten by another category by more
+    # than MARGIN) is not; scores in between fall back to an LLM check
+    ENABLE_CATEGORY_CLASSIFIER: bool = bool(os.getenv("ENABLE_CATEGORY_CLASSIFIER", "True") == "True")
+    CATEGORY_ACCEPT_THRESHOLD: float = float(os.getenv("CATEGORY_ACCEPT_THRESHOLD", "0.72"))
+    CATEGORY_REJECT_THRESHOLD: float = float(os.getenv("CATEGORY_REJECT_THRESHOLD", "0.55"))
+    CATEGORY_MARGIN: float = 0.1
+
     # Chunk size for document splitting
     CHUNK_SIZE: int = 1000
     CHUNK_OVERLAP: int = 200
     
+    # Ingestion pipeline: PDF parsing processes, chunks per embedding request,
+    # embedding requests in flight and the embedding API's request rate limit
+    INGEST_WORKERS: int = int(os.getenv("INGEST_WORKERS", str(os.cpu_count() or 1)))
+    EMBEDDING_BATCH_SIZE: int = 100
+    EMBEDDING_CONCURRENCY: int = int(os.getenv("EMBEDDING_CONCURRENCY", "4"))
+    EMBEDDING_REQUESTS_PER_MINUTE: int = int(os.getenv("EMBEDDING_REQUESTS_PER_MINUTE", "150"))
+    EMBEDDING_MAX_RETRIES: int = 5
+    
     # Retrieval settings
     RETRIEVAL_K: int = 4
+    
+    # Retrieved chunks are packed into the QA prompt: overlapping chunks of a
+    # page are merged, then spans are added most relevant first up to
+    # CONTEXT_MAX_TOKENS (estimated at CONTEXT_CHARS_PER_TOKEN characters per
+    # token). 0 sends the chunks as retrieved.
+    CONTEXT_MAX_TOKENS: int = int(os.getenv("CONTEXT_MAX_TOKENS", "1000"))
+    CONTEXT_CHARS_PER_TOKEN: float = 4.0
+    
+    # "hybrid" merges BM25 keyword search with vector search by reciprocal
+    # rank fusion (needs the lexical index built by ingestion); "vector" uses
+    # vector search only. HYBRID_CANDIDATES results are fused from each.
+    RETRIEVAL_MODE: str = os.getenv("RETRIEVAL_MODE", "hybrid")
+    HYBRID_CANDIDATES: int = 20
+    RRF_K: int = 60
+
+    # Concurrent retrievals are collected for up to RETRIEVAL_BATCH_WINDOW_MS
+    # (or RETRIEVAL_MAX_BATCH queries), embedded in one request and searched
+    # as one matrix
+    ENABLE_RETRIEVAL_BATCHING: bool = bool(os.getenv("ENABLE_RETRIEVAL_BATCHING", "True") == "True")
+    RETRIEVAL_BATCH_WINDOW_MS: float = float(os.getenv("RETRIEVAL_BATCH_WINDOW_MS", "5"))
+    RETRIEVAL_MAX_BATCH: int = 64
+
+    # Vector index searched at query time: "flat" (exact) or an approximate
+    # index built by ingestion for large corpora: "ivf_flat", "ivf_pq" or
+    # "hnsw". Stores with fewer than INDEX_MIN_VECTORS vectors stay flat.
+    INDEX_TYPE: str = os.getenv("INDEX_TYPE", "flat")
+    INDEX_MIN_VECTORS: int = 10000
+    INDEX_TRAINING_SAMPLE: int = 50000
+    INDEX_NLIST: int = 0  # IVF lists; 0 uses about 4 * sqrt(number of vectors)
+    INDEX_PQ_M: int = 64  # PQ sub-quantizers (reduced to a divisor of the dimension)
+    INDEX_PQ_BITS: int = 8
+    INDEX_HNSW_M: int = 32
+    INDEX_HNSW_EF_CONSTRUCTION: int = 200
+    
+    # Query-time search breadth of approximate indexes (higher: better
+    # recall, slower search)
+    INDEX_NPROBE: int = int(os.getenv("INDEX_NPROBE", "16"))
+    INDEX_EF_SEARCH: int = int(os.getenv("INDEX_EF_SEARCH", "64"))
+    
+    # Categories with fewer chunks than this in their own sub-index are
+    # searched in the global index instead
+    CATEGORY_INDEX_MIN_CHUNKS: int = 50
+
+    # Statutes whose section/article/rule headings ingestion indexes, so
+    # citations like "Section 420 IPC" or "Article 21" are answered from the
+    # exact provision instead of search. Aliases name the act in queries.
+    ENABLE_CITATION_LOOKUP: bool = bool(os.getenv("ENABLE_CITATION_LOOKUP", "True") == "True")
+    STATUTES: dict = {
+        "ipc_act.pdf": {"name": "Indian Penal Code", "unit": "section", "aliases": ["ipc", "indian penal code", "penal code"]},
+        "COI.pdf": {"name": "Constitution of India", "unit": "article", "aliases": ["constitution", "coi"]},
+        "CompaniesAct2013.pdf": {"name": "Companies Act, 2013", "unit": "section", "aliases": ["companies act"]},
+        "customacta1962-52.pdf": {"name": "Customs Act, 1962", "unit": "section", "aliases": ["customs act"]},
+        "CopyrightRules1957.pdf": {"name": "Copyright Rules, 1957", "unit": "rule", "aliases": ["copyright rules"]},
+    }
+    STATUTE_MAX_CHARS: int = 6000  # Longer provisions are truncated
+    # Context budget of cited provisions, shared equally between them, so
+    # citation answers aren't cut to the general CONTEXT_MAX_TOKENS (the
+    # default fits two provisions of STATUTE_MAX_CHARS in full, with headings)
+    CITATION_CONTEXT_MAX_TOKENS: int = int(os.getenv("CITATION_CONTEXT_MAX_TOKENS", "3200"))
+
+    # Follow-up and suggested questions: "pool" ranks a precomputed per-category
+    # pool against the query, "llm" generates them with an extra LLM call
+    FOLLOW_UP_MODE: str = os.getenv("FOLLOW_UP_MODE", "pool")
+    SUGGESTION_POOL_SIZE: int = 20
+    SUGGESTION_REFRESH_SECONDS: int = 6 * 60 * 60
+    # Pools are shared through Redis if configured, otherwise this file; one
+    # worker at a time rebuilds them and the others reload every poll
+    SUGGESTION_POOL_PATH: str = os.getenv("SUGGESTION_POOL_PATH", "question_pools.json")
+    SUGGESTION_POLL_SECONDS: int = 60
+    SUGGESTION_LOCK_SECONDS: int = 15 * 60
+    SUGGESTION_DUPLICATE_THRESHOLD: float = 0.97
+
+    # Per-stage timeouts (seconds) for the chat pipeline
+    STAGE_TIMEOUTS: dict = {
+        "cache": 2,
+        "relevance": 10,
+        "answer": 60,
+        "format": 30,
+        "translation": 45,
+        "follow_up": 15,
+        "suggestions": 15,
+        "session": 2,
+        "summary": 30
+    }
 
     # Security settings
     SECRET_KEY: str = os.getenv("SECRET_KEY", "mysecretkey")
@@ -71,10 +223,27 @@ class Settings(BaseSettings):
     # Rate limiting
     RATE_LIMIT_PER_MINUTE: int = 60
     
+    # Max threads for blocking work on the async request path
+    BLOCKING_POOL_SIZE: int = int(os.getenv("BLOCKING_POOL_SIZE", "16"))
+    
     # Redis cache settings (optional)
     REDIS_URL: str = os.getenv("REDIS_URL", "")
     ENABLE_CACHE: bool = bool(os.getenv("ENABLE_CACHE", "False") == "True")
     
+    # Answer cache settings (a similarity threshold of 1.0 disables near-duplicate matching)
+    CACHE_TTL_SECONDS: int = int(os.getenv("CACHE_TTL_SECONDS", str(24 * 60 * 60)))
+    CACHE_MAX_ENTRIES: int = 1000
+    CACHE_SIMILARITY_THRESHOLD: float = float(os.getenv("CACHE_SIMILARITY_THRESHOLD", "0.95"))
+    CACHE_SEMANTIC_CANDIDATES: int = 200
+    
+    # Server-side session memory (Redis if configured, otherwise in-process):
+    # the last SESSION_MEMORY_TURNS turns are kept verbatim and older ones are
+    # folded into a running summary by CONDENSE_MODEL
+    SESSION_MEMORY_TURNS: int = int(os.getenv("SESSION_MEMORY_TURNS", "2"))
+    SESSION_MEMORY_SIZE: int = 10000  # Sessions kept by the in-process store
+    SESSION_TTL_SECONDS: int = int(os.getenv("SESSION_TTL_SECONDS", str(24 * 60 * 60)))
+    SESSION_SUMMARY_MAX_WORDS: int = 150
+    
     # Monitoring
     ENABLE_MONITORING: bool = bool(os.getenv("ENABLE_MONITORING", "False") == "True")
     
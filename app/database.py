@@ -1,8 +1,10 @@
 from datetime import datetime
-from typing import Generator
+from typing import AsyncGenerator, Generator
 from sqlalchemy import create_engine, Column, String, Boolean, DateTime, Text, ForeignKey, Integer
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session, relationship
+import redis.asyncio as aioredis
 
 from app.config import settings
 
@@ -15,6 +17,39 @@ engine = create_engine(
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Map synchronous database drivers to their asyncio counterparts
+ASYNC_DRIVERS = {
+    "sqlite://": "sqlite+aiosqlite://",
+    "postgresql://": "postgresql+asyncpg://",
+    "mysql://": "mysql+aiomysql://",
+}
+
+def get_async_database_url(url: str) -> str:
+    """Return the asyncio driver URL for a synchronous database URL."""
+    for sync_prefix, async_prefix in ASYNC_DRIVERS.items():
+        if url.startswith(sync_prefix):
+            return async_prefix + url[len(sync_prefix):]
+    return url
+
+# Create async SQLAlchemy engine and session factory for the async endpoints
+async_engine = create_async_engine(
+    get_async_database_url(settings.DATABASE_URL),
+    connect_args={"check_same_thread": False} if settings.DATABASE_URL.startswith("sqlite") else {}
+)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+# Setup async Redis client (if configured)
+redis_client = None
+if settings.REDIS_URL:
+    try:
+        redis_client = aioredis.from_url(settings.REDIS_URL)
+    except Exception:
+        pass
+
 # Create base class for models
 Base = declarative_base()
 
@@ -77,4 +112,9 @@ def get_db() -> Generator[Session, None, None]:
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """Get async database session."""
+    async with AsyncSessionLocal() as db:
+        yield db
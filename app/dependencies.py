@@ -1,13 +1,28 @@
 import os
+import re
+import threading
 from typing import Generator
 from functools import lru_cache
 
+import httpx
+import numpy as np
+from langchain.chains import ConversationalRetrievalChain
+from langchain.retrievers import ContextualCompressionRetriever
 from langchain_community.vectorstores import FAISS
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from langchain_groq import ChatGroq
 from langchain.memory import ConversationBufferWindowMemory
+from langchain_core.messages import SystemMessage
 
 from app.config import settings
+from app.services.batch_retrieval import RetrievalBatcher
+from app.services.context import ContextPacker
+from app.services.embedding_cache import CachedEmbeddings, EmbeddingStore
+from app.services.prompts import QA_PROMPT, SOURCE_DOCUMENT_PROMPT, STRUCTURED_QA_PROMPT
+from app.services.lexical import LexicalIndex, has_lexical_index
+from app.services.retrieval import HybridRetriever, VectorRetriever
+from app.services.statutes import INDEX_FILE as STATUTE_INDEX_FILE, StatuteIndex, read_statute_provisions
+from app.services.vector_store import load_vector_store, store_file_dir, store_files_path
 
 # Set environment variables
 os.environ["GOOGLE_API_KEY"] = settings.GOOGLE_API_KEY
@@ -15,54 +30,279 @@ os.environ["GOOGLE_API_KEY"] = settings.GOOGLE_API_KEY
 # Create a custom memory class that extends the base memory class
 class SessionMemory(ConversationBufferWindowMemory):
     """Custom memory class that can store session_id as a property"""
-    def __init__(self, session_id: str, **kwargs):
-        super().__init__(**kwargs)
-        self._session_id = session_id
-    
-    @property
-    def session_id(self) -> str:
-        return self._session_id
+    # Declared as a field: memory classes are pydantic models and reject
+    # undeclared attributes
+    session_id: str = "unknown"
+    # Who the session belongs to ("user:<id>" or "ip:<address>"); part of the
+    # session store key, so one caller can't load another's memory
+    owner: str = ""
+    # Running summary of the turns that have left the window
+    summary: str = ""
         
     def clear(self):
         """Clear the chat memory"""
         self.chat_memory.clear()
+        self.summary = ""
+    
+    def load_memory_variables(self, inputs: dict) -> dict:
+        """Recent turns, preceded by the summary of earlier ones (if any)."""
+        variables = super().load_memory_variables(inputs)
+        if self.summary and self.return_messages:
+            summary = SystemMessage(content=f"Summary of the earlier conversation: {self.summary}")
+            variables[self.memory_key] = [summary] + variables[self.memory_key]
+        return variables
+
+@lru_cache
+def get_embeddings() -> CachedEmbeddings:
+    """
+    Get Google Generative AI embeddings with caching.
+    
+    Embeddings read through the on-disk embedding cache, with recent query
+    embeddings also kept in memory, so the same text is never embedded twice.
+    """
+    embeddings = GoogleGenerativeAIEmbeddings(model=settings.EMBEDDING_MODEL)
+    store = EmbeddingStore(settings.EMBEDDING_CACHE_PATH) if settings.EMBEDDING_CACHE_PATH else None
+    return CachedEmbeddings(
+        embeddings,
+        model=settings.EMBEDDING_MODEL,
+        store=store,
+        max_query_entries=settings.EMBEDDING_QUERY_CACHE_SIZE
+    )
+
+async def embed_query(text: str) -> np.ndarray:
+    """
+    Embed a user query. Pipeline stages that need the query vector (answer
+    cache, follow-up ranking) share one embedding call through the query
+    cache of get_embeddings.
+    
+    Args:
+        text: Query text
+        
+    Returns:
+        Unit-length float32 vector
+    """
+    vector = np.asarray(await get_embeddings().aembed_query(text), dtype=np.float32)
+    return vector / (np.linalg.norm(vector) or 1.0)
+
+@lru_cache
+def get_retrieval_batcher() -> RetrievalBatcher:
+    """Get the process-wide batcher for concurrent vector searches."""
+    return RetrievalBatcher(
+        get_embeddings(),
+        window_ms=settings.RETRIEVAL_BATCH_WINDOW_MS,
+        max_batch=settings.RETRIEVAL_MAX_BATCH
+    )
 
 @lru_cache
-def get_embeddings() -> GoogleGenerativeAIEmbeddings:
-    """Get Google Generative AI embeddings with caching."""
-    return GoogleGenerativeAIEmbeddings(model=settings.EMBEDDING_MODEL)
+def get_vector_store_files_path() -> str:
+    """
+    Version directory of the global vector store, resolved once per process
+    so the index and the lexical index are read from the same version.
+    """
+    return store_files_path(settings.VECTOR_STORE_PATH)
 
 @lru_cache
 def get_vector_store() -> FAISS:
-    """Load vector store from disk with caching."""
+    """Load vector store from disk (memory-mapped) with caching."""
     embeddings = get_embeddings()
-    return FAISS.load_local(
-        settings.VECTOR_STORE_PATH, 
-        embeddings, 
-        allow_dangerous_deserialization=True
-    )
+    return load_vector_store(get_vector_store_files_path(), embeddings)
 
+@lru_cache
 def get_retriever():
-    """Get vector store retriever."""
-    vector_store = get_vector_store()
-    return vector_store.as_retriever(
-        search_type="similarity", 
-        search_kwargs={"k": settings.RETRIEVAL_K}
+    """Get vector store retriever with caching."""
+    return make_retriever(get_vector_store(), get_vector_store_files_path())
+
+def make_retriever(vector_store: FAISS, path: str):
+    """
+    Build the retriever for a vector store.
+    
+    In "hybrid" RETRIEVAL_MODE, stores with a lexical index get BM25 and
+    vector search merged by rank fusion; otherwise plain vector search.
+    With ENABLE_RETRIEVAL_BATCHING, async vector searches of concurrent
+    requests are batched. Results are packed into the CONTEXT_MAX_TOKENS
+    budget.
+    
+    Args:
+        vector_store: FAISS vector store
+        path: Version directory the store was loaded from (see store_files_path)
+        
+    Returns:
+        Retriever
+    """
+    batcher = get_retrieval_batcher() if settings.ENABLE_RETRIEVAL_BATCHING else None
+    if settings.RETRIEVAL_MODE == "hybrid" and has_lexical_index(path):
+        retriever = HybridRetriever(
+            vector_store=vector_store,
+            lexical_index=LexicalIndex(path),
+            k=settings.RETRIEVAL_K,
+            candidates=settings.HYBRID_CANDIDATES,
+            rrf_k=settings.RRF_K,
+            batcher=batcher
+        )
+    elif batcher is not None:
+        retriever = VectorRetriever(vector_store=vector_store, batcher=batcher, k=settings.RETRIEVAL_K)
+    else:
+        retriever = vector_store.as_retriever(
+            search_type="similarity", 
+            search_kwargs={"k": settings.RETRIEVAL_K}
+        )
+    
+    if not settings.CONTEXT_MAX_TOKENS:
+        return retriever
+    return ContextualCompressionRetriever(base_compressor=get_context_packer(), base_retriever=retriever)
+
+@lru_cache
+def get_context_packer() -> ContextPacker:
+    """Get the packer that fits retrieved chunks into the prompt's token budget."""
+    return ContextPacker(
+        max_tokens=settings.CONTEXT_MAX_TOKENS,
+        chars_per_token=settings.CONTEXT_CHARS_PER_TOKEN,
+        max_overlap=2 * settings.CHUNK_OVERLAP
     )
 
-def get_llm():
-    """Get LLM model."""
+def category_index_path(category: str) -> str:
+    """Directory of a category's FAISS sub-index."""
+    slug = re.sub(r"[^a-z0-9]+", "-", category.lower()).strip("-")
+    return os.path.join(settings.VECTOR_STORE_PATH, "categories", slug)
+
+CENTROIDS_FILE = "centroids.npz"
+
+def category_centroids_path() -> str:
+    """File with the mean chunk embedding of each category, saved by ingestion with the vector store."""
+    return os.path.join(store_file_dir(settings.VECTOR_STORE_PATH, CENTROIDS_FILE), CENTROIDS_FILE)
+
+def get_category_retriever(category: str):
+    """
+    Get the retriever for a legal category.
+    
+    Uses the category's own FAISS sub-index when ingestion built one with at
+    least CATEGORY_INDEX_MIN_CHUNKS chunks, and the global index otherwise.
+    Categories that aren't in settings.LEGAL_CATEGORIES always get the
+    global index, so made-up categories from request bodies can't fill or
+    evict the per-category cache.
+    
+    Args:
+        category: Legal category
+        
+    Returns:
+        Vector store retriever
+    """
+    if category not in settings.LEGAL_CATEGORIES:
+        return get_retriever()
+    return _get_known_category_retriever(category)
+
+# Bounded by the number of LEGAL_CATEGORIES: only known categories get here
+@lru_cache(maxsize=None)
+def _get_known_category_retriever(category: str):
+    """Retriever of a category in settings.LEGAL_CATEGORIES (see get_category_retriever)."""
+    path = category_index_path(category)
+    if os.path.exists(path):
+        try:
+            path = store_files_path(path)
+            vector_store = load_vector_store(path, get_embeddings())
+            if vector_store.index.ntotal >= settings.CATEGORY_INDEX_MIN_CHUNKS:
+                return make_retriever(vector_store, path)
+        except Exception as e:
+            print(f"Error loading sub-index for {category}: {str(e)}")
+    return get_retriever()
+
+@lru_cache
+def get_statute_index() -> StatuteIndex:
+    """Get the section/article lookup index built by ingestion, with caching."""
+    try:
+        return StatuteIndex(read_statute_provisions(store_file_dir(settings.VECTOR_STORE_PATH, STATUTE_INDEX_FILE)))
+    except Exception as e:
+        print(f"Error loading statute index: {str(e)}")
+        return StatuteIndex({})
+
+@lru_cache
+def get_llm_http_clients():
+    """
+    Get the HTTP clients shared by all LLM clients, so keep-alive
+    connections to the LLM API are reused across requests.
+    """
+    limits = httpx.Limits(
+        max_connections=settings.LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.LLM_KEEPALIVE_EXPIRY
+    )
+    return httpx.Client(limits=limits), httpx.AsyncClient(limits=limits)
+
+@lru_cache
+def get_chat_model(model_name: str) -> ChatGroq:
+    """Get the process-wide LLM client for a model."""
+    http_client, http_async_client = get_llm_http_clients()
     return ChatGroq(
         groq_api_key=settings.GROQ_API_KEY, 
-        model_name=settings.LLM_MODEL
+        model_name=model_name,
+        http_client=http_client,
+        http_async_client=http_async_client
     )
 
-def get_conversation_memory(session_id: str) -> SessionMemory:
+def get_llm():
+    """Get LLM model."""
+    return get_chat_model(settings.LLM_MODEL)
+
+def get_condense_llm():
+    """Get the small, fast model that rewrites follow-ups into standalone questions."""
+    return get_chat_model(settings.CONDENSE_MODEL)
+
+# Process-wide QA chains, keyed by the LLM and retriever they wrap
+_qa_chains = {}
+_qa_chains_lock = threading.Lock()
+MAX_QA_CHAINS = 32
+
+def get_qa_chain(llm, retriever) -> ConversationalRetrievalChain:
+    """
+    Get the process-wide QA chain for an LLM and retriever.
+    
+    Chains are built once and hold no memory; callers pass the session's
+    chat_history with each call and save the turn to their own memory.
+    Follow-ups are condensed into standalone questions by CONDENSE_MODEL;
+    callers pass an empty chat_history to skip condensing. In single-pass
+    ANSWER_MODE the answer prompt carries the response style guidelines; in
+    structured mode it also asks for JSON with follow-up questions and
+    sources.
+    
+    Args:
+        llm: Language model
+        retriever: Vector store retriever
+        
+    Returns:
+        ConversationalRetrievalChain
+    """
+    # The chain keeps references to llm and retriever, so their ids stay unique
+    key = (id(llm), id(retriever))
+    with _qa_chains_lock:
+        chain = _qa_chains.get(key)
+        if chain is None:
+            if len(_qa_chains) >= MAX_QA_CHAINS:
+                _qa_chains.pop(next(iter(_qa_chains)))
+            chain = ConversationalRetrievalChain.from_llm(
+                llm=llm,
+                retriever=retriever,
+                condense_question_llm=get_condense_llm(),
+                combine_docs_chain_kwargs=get_answer_prompt_kwargs(),
+                return_source_documents=True
+            )
+            _qa_chains[key] = chain
+        return chain
+
+def get_answer_prompt_kwargs():
+    """Prompt arguments of the QA chain's answer step for settings.ANSWER_MODE."""
+    if settings.ANSWER_MODE == "structured":
+        return {"prompt": STRUCTURED_QA_PROMPT, "document_prompt": SOURCE_DOCUMENT_PROMPT}
+    if settings.ANSWER_MODE == "single_pass":
+        return {"prompt": QA_PROMPT}
+    return None
+
+def get_conversation_memory(session_id: str, owner: str = "") -> SessionMemory:
     """Get conversation memory for a session."""
     # Create memory object using our custom class
     memory = SessionMemory(
         session_id=session_id,
-        k=2, 
+        owner=owner,
+        k=settings.SESSION_MEMORY_TURNS, 
         memory_key="chat_history", 
         return_messages=True,
         output_key="answer"
@@ -1,4 +1,5 @@
 import os
+import sys
 from dotenv import load_dotenv
 from app.services.embedding import embed_and_save_documents
 
@@ -7,9 +8,9 @@ load_dotenv()
 os.environ['GOOGLE_API_KEY'] = os.getenv("GOOGLE_API_KEY")
 
 def main():
-    """Entry point for document ingestion."""
+    """Entry point for document ingestion. Pass --full to re-index every file."""
     print("Starting document ingestion...")
-    num_chunks = embed_and_save_documents()
+    num_chunks = embed_and_save_documents(full="--full" in sys.argv)
     print(f"Document ingestion complete. Created {num_chunks} document chunks.")
 
 if __name__ == "__main__":
@@ -8,6 +8,9 @@ import os
 from app.api.router import api_router
 from app.config import settings
 from app.middleware import MetricsMiddleware, LoggingMiddleware
+from app.utils.concurrency import install_default_executor
+from app.dependencies import get_llm
+from app.services.suggestions import start_question_pool_refresh
 
 # Create needed directories at startup
 os.makedirs("./LEGAL-DATA", exist_ok=True)
@@ -19,6 +22,17 @@ app = FastAPI(
     version="1.0.0",
 )
 
+@app.on_event("startup")
+async def configure_executor():
+    """Route the event loop's blocking work through the bounded thread pool."""
+    install_default_executor()
+
+@app.on_event("startup")
+async def start_background_tasks():
+    """Start background refresh of the suggested question pools."""
+    if settings.FOLLOW_UP_MODE == "pool":
+        start_question_pool_refresh(get_llm())
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -16,7 +16,7 @@ class ChatRequest(BaseModel):
     category: str = Field(..., description="Legal category")
     language: str = Field("English", description="Response language")
     session_id: str = Field(..., description="Unique session identifier")
-    messages: Optional[List[Dict[str, Any]]] = Field(None, description="Previous messages in the conversation")
+    messages: Optional[List[Dict[str, Any]]] = Field(None, description="Previous messages in the conversation; only used to start a session the server doesn't know, since the server keeps each session's memory")
 
 
 class ChatResponse(BaseModel):
@@ -1,17 +1,18 @@
 from datetime import datetime, timedelta
 from uuid import uuid4
 from typing import Optional
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 import time
-import redis
 
 from app.config import settings
 from app.models.schemas import TokenData, User, UserCreate, UserInDB, RateLimitData
-from app.database import get_db, User as DBUser
+from app.database import get_db, get_async_db, redis_client, User as DBUser
 
 # Setup password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -19,14 +20,6 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 # Setup OAuth2 with Password flow
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/token")
 
-# Setup Redis for rate limiting (if configured)
-redis_client = None
-if settings.REDIS_URL:
-    try:
-        redis_client = redis.from_url(settings.REDIS_URL)
-    except:
-        pass
-
 # Create an optional OAuth2 scheme that doesn't require authentication
 class OAuth2PasswordBearerOptional(OAuth2PasswordBearer):
     async def __call__(self, request: Request) -> Optional[str]:
@@ -75,6 +68,11 @@ def get_user_by_username(db: Session, username: str) -> Optional[DBUser]:
     """Get a user by username."""
     return db.query(DBUser).filter(DBUser.username == username).first()
 
+async def get_user_by_username_async(db: AsyncSession, username: str) -> Optional[DBUser]:
+    """Get a user by username using an async session."""
+    result = await db.execute(select(DBUser).where(DBUser.username == username))
+    return result.scalars().first()
+
 def get_user_by_email(db: Session, email: str) -> Optional[DBUser]:
     """Get a user by email."""
     return db.query(DBUser).filter(DBUser.email == email).first()
@@ -170,7 +168,7 @@ def authenticate_user(db: Session, username: str, password: str) -> Optional[DBU
 # Dependency functions
 async def get_current_user(
     token: str = Depends(oauth2_scheme), 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> User:
     """Get the current authenticated user."""
     credentials_exception = HTTPException(
@@ -191,7 +189,7 @@ async def get_current_user(
         raise credentials_exception
     
     # Get user from database
-    user = get_user_by_username(db, username=token_data.username)
+    user = await get_user_by_username_async(db, username=token_data.username)
     if user is None:
         raise credentials_exception
     
@@ -210,19 +208,22 @@ async def get_current_active_user(current_user: User = Depends(get_current_user)
     return current_user
 
 # Add a new function for optional authentication
-async def get_current_user_optional(token: str = Depends(oauth2_scheme_optional)):
+async def get_current_user_optional(
+    token: str = Depends(oauth2_scheme_optional),
+    db: AsyncSession = Depends(get_async_db)
+):
     if token is None:
         # Return None if no token provided - this will allow public access
         return None
     
     try:
-        return await get_current_user(token)
+        return await get_current_user(token, db)
     except:
         # If token is invalid, return None instead of raising an exception
         return None
 
 # Rate limiting
-def check_rate_limit(client_id: str, limit: int = settings.RATE_LIMIT_PER_MINUTE) -> bool:
+async def check_rate_limit(client_id: str, limit: int = settings.RATE_LIMIT_PER_MINUTE) -> bool:
     """
     Check if a client has exceeded their rate limit.
     Returns True if limit not exceeded, False otherwise.
@@ -234,19 +235,12 @@ def check_rate_limit(client_id: str, limit: int = settings.RATE_LIMIT_PER_MINUTE
     current_time = time.time()
     minute_window = int(current_time / 60)
     
-    # Get rate limit data
+    # Increment the counter for this window and set its expiry in one round trip
     rate_key = f"rate:{client_id}:{minute_window}"
-    current_count = redis_client.get(rate_key)
-    
-    # If no data or expired window, reset
-    if current_count is None:
-        redis_client.set(rate_key, 1, ex=90)  # 90 seconds expiration (1.5 minutes)
-        return True
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.incr(rate_key)
+        pipe.expire(rate_key, 90, nx=True)  # 90 seconds expiration (1.5 minutes)
+        current_count, _ = await pipe.execute()
     
     # Check if limit exceeded
-    if int(current_count) >= limit:
-        return False
-    
-    # Increment count and return
-    redis_client.incr(rate_key)
-    return True
\ No newline at end of file
+    return int(current_count) <= limit
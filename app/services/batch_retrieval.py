@@ -0,0 +1,103 @@
+import asyncio
+from typing import Any, List, Tuple
+
+import numpy as np
+
+from app.utils.concurrency import run_blocking
+
+
+def search_many(embeddings, requests: List[Tuple[Any, str, int]]) -> List[List[int]]:
+    """
+    Vector search for many queries at once: all queries are embedded in one
+    request, then each vector store is searched once with the matrix of its
+    queries.
+
+    Args:
+        embeddings: CachedEmbeddings
+        requests: (FAISS vector store, query, k) tuples
+
+    Returns:
+        Vector positions per request, nearest first
+    """
+    texts = list(dict.fromkeys(query for _, query, _ in requests))
+    vectors = dict(zip(texts, embeddings.embed_queries(texts)))
+
+    # Group by store (category sub-indexes are separate stores)
+    groups = {}
+    for i, (vector_store, _, _) in enumerate(requests):
+        groups.setdefault(id(vector_store), []).append(i)
+
+    results = [None] * len(requests)
+    for indexes in groups.values():
+        vector_store = requests[indexes[0]][0]
+        matrix = np.array([vectors[requests[i][1]] for i in indexes], dtype=np.float32)
+        k = max(requests[i][2] for i in indexes)
+        _, positions = vector_store.index.search(matrix, k)
+        for row, i in enumerate(indexes):
+            results[i] = [int(p) for p in positions[row][:requests[i][2]] if p >= 0]
+    return results
+
+
+class RetrievalBatcher:
+    """
+    Collects vector searches made concurrently by different requests and
+    runs them as one batch (see search_many), fanning the results back out.
+
+    A batch is sent when the first query in it has waited `window_ms`, or as
+    soon as `max_batch` queries are waiting.
+    """
+
+    def __init__(self, embeddings, window_ms: float = 5, max_batch: int = 64):
+        self.embeddings = embeddings
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._pending = []
+        self._timer = None
+        self._batches = set()
+
+    async def search(self, vector_store, query: str, k: int) -> List[int]:
+        """
+        Search a vector store for a query as part of the next batch.
+
+        Args:
+            vector_store: FAISS vector store
+            query: Query text
+            k: Number of results
+
+        Returns:
+            Vector positions, nearest first
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((vector_store, query, k, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            # Hold a reference so the task isn't garbage collected mid-run
+            task = asyncio.ensure_future(self._run(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _run(self, batch):
+        try:
+            results = await run_blocking(
+                search_many, self.embeddings, [(vector_store, query, k) for vector_store, query, k, _ in batch]
+            )
+        except Exception as e:
+            for *_, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (*_, future), positions in zip(batch, results):
+            # Callers that timed out or were cancelled have gone away
+            if not future.done():
+                future.set_result(positions)
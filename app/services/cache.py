@@ -0,0 +1,207 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.database import redis_client
+from app.dependencies import embed_query
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a query for cache lookups: lowercase, no punctuation, single spaces."""
+    query = re.sub(r"[^\w\s]", " ", query.lower())
+    return " ".join(query.split())
+
+
+def number_tokens(query: str) -> List[str]:
+    """Numbers in a query (provision numbers like "420" or "498a", years, amounts), sorted."""
+    return sorted(set(re.findall(r"\b\d+[a-z]*\b", normalize_query(query))))
+
+
+def cache_key(query: str, category: str, language: str, strict: bool = False) -> str:
+    """Build the exact-match cache key for a normalized query."""
+    raw = f"{category}|{language}|{strict}|{normalize_query(query)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def cache_namespace(query: str, category: str, language: str, strict: bool = False) -> str:
+    """
+    Build the namespace a query is matched against for near-duplicates.
+
+    Questions that differ only in a number ("Section 302 IPC" vs "Section 420
+    IPC") embed almost identically, so the query's numbers are part of the
+    namespace: near-duplicates must cite exactly the same ones.
+    """
+    mode = "strict" if strict else "any"
+    return f"{category}:{language}:{mode}:{','.join(number_tokens(query))}"
+
+
+def best_match(query_vector: np.ndarray, candidates: List[Tuple[str, np.ndarray]]) -> Tuple[Optional[str], float]:
+    """
+    Find the candidate most similar to a query vector.
+
+    Args:
+        query_vector: Normalized query embedding
+        candidates: (key, normalized embedding) pairs
+
+    Returns:
+        (key, cosine similarity) of the best candidate, or (None, 0.0)
+    """
+    if not candidates:
+        return None, 0.0
+    matrix = np.stack([vector for _, vector in candidates])
+    scores = matrix @ query_vector
+    best = int(np.argmax(scores))
+    return candidates[best][0], float(scores[best])
+
+
+class InMemoryAnswerCache:
+    """Process-local answer cache with TTL and LRU eviction."""
+
+    def __init__(self, max_entries: int, ttl: int):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # key -> (namespace, response, vector, expires_at)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[3] < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    async def set(self, key: str, namespace: str, response: Dict, vector: Optional[np.ndarray]):
+        with self._lock:
+            self._entries[key] = (namespace, response, vector, time.time() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def candidates(self, namespace: str, limit: int) -> List[Tuple[str, np.ndarray]]:
+        now = time.time()
+        with self._lock:
+            recent = [
+                (key, entry[2]) for key, entry in reversed(self._entries.items())
+                if entry[0] == namespace and entry[2] is not None and entry[3] >= now
+            ]
+        return recent[:limit]
+
+
+class RedisAnswerCache:
+    """
+    Redis-backed answer cache shared by all workers.
+
+    Entries expire by TTL; Redis' maxmemory policy (allkeys-lru) handles LRU
+    eviction. Embeddings of recent queries are kept per category and language
+    in a capped list for near-duplicate matching.
+    """
+
+    def __init__(self, client, max_entries: int, ttl: int):
+        self.client = client
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+    async def get(self, key: str) -> Optional[Dict]:
+        value = await self.client.get(f"answer-cache:{key}")
+        return json.loads(value) if value else None
+
+    async def set(self, key: str, namespace: str, response: Dict, vector: Optional[np.ndarray]):
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.set(f"answer-cache:{key}", json.dumps(response), ex=self.ttl)
+            if vector is not None:
+                recent_key = f"answer-cache:recent:{namespace}"
+                pipe.lpush(recent_key, key.encode("ascii") + vector.astype(np.float32).tobytes())
+                pipe.ltrim(recent_key, 0, self.max_entries - 1)
+                pipe.expire(recent_key, self.ttl)
+            await pipe.execute()
+
+    async def candidates(self, namespace: str, limit: int) -> List[Tuple[str, np.ndarray]]:
+        items = await self.client.lrange(f"answer-cache:recent:{namespace}", 0, limit - 1)
+        # Each item is the 64-character hex key followed by the float32 vector
+        return [
+            (item[:64].decode("ascii"), np.frombuffer(item[64:], dtype=np.float32))
+            for item in items
+        ]
+
+
+class AnswerCache:
+    """
+    Cache of chat responses keyed on normalized query, category and language.
+
+    Lookups first try an exact match on the normalized query, then compare
+    the query embedding against recent queries for the same category and
+    language (and the same numbers, see cache_namespace) and accept the
+    closest one above CACHE_SIMILARITY_THRESHOLD. Answers that went through
+    the strict category relevance check are cached apart from the others.
+    """
+
+    def __init__(self, backend, semantic: bool = True):
+        self.backend = backend
+        self.semantic = semantic
+
+    async def get(self, query: str, category: str, language: str, strict: bool = False) -> Optional[Dict]:
+        """
+        Look up a cached response.
+
+        Args:
+            query: User's question
+            category: Legal category
+            language: Response language
+            strict: Whether the strict category relevance check applies
+
+        Returns:
+            Cached response dictionary, or None on a miss
+        """
+        response = await self.backend.get(cache_key(query, category, language, strict))
+        if response is not None or not self.semantic:
+            return response
+
+        query_vector = await embed_query(query)
+        namespace = cache_namespace(query, category, language, strict)
+        candidates = await self.backend.candidates(namespace, settings.CACHE_SEMANTIC_CANDIDATES)
+        key, score = best_match(query_vector, candidates)
+        if key is None or score < settings.CACHE_SIMILARITY_THRESHOLD:
+            return None
+        return await self.backend.get(key)
+
+    async def set(self, query: str, category: str, language: str, response: Dict, strict: bool = False):
+        """
+        Store a response in the cache.
+
+        Args:
+            query: User's question
+            category: Legal category
+            language: Response language
+            response: Response dictionary (answer, sources, suggested_questions, message_type)
+            strict: Whether the strict category relevance check was applied
+        """
+        vector = await embed_query(query) if self.semantic else None
+        await self.backend.set(
+            cache_key(query, category, language, strict),
+            cache_namespace(query, category, language, strict),
+            response,
+            vector
+        )
+
+
+@lru_cache
+def get_answer_cache() -> AnswerCache:
+    """Get the process-wide answer cache (Redis if configured, otherwise in-process)."""
+    if redis_client is not None:
+        backend = RedisAnswerCache(redis_client, settings.CACHE_MAX_ENTRIES, settings.CACHE_TTL_SECONDS)
+    else:
+        backend = InMemoryAnswerCache(settings.CACHE_MAX_ENTRIES, settings.CACHE_TTL_SECONDS)
+    return AnswerCache(backend, semantic=settings.CACHE_SIMILARITY_THRESHOLD < 1.0)
@@ -1,11 +1,26 @@
-from langchain.chains import ConversationalRetrievalChain
+import asyncio
+
 from langchain.memory import ConversationBufferWindowMemory
 
-from app.services.translation import translate_text
+from app.services.translation import (
+    SegmentMarkerError, is_in_language, stream_translation, translate_text, translate_whole_text
+)
+from app.services.cache import get_answer_cache
+from app.services.classifier import classify_category_relevance
+from app.services.prompts import ANSWER_STYLE_GUIDELINES, answer_language_instructions
+from app.services.intents import detect_small_talk, get_small_talk_reply, is_self_contained, starts_with_greeting
+from app.services.structured import AnswerStreamParser, parse_structured_answer
+from app.services.context import share_budget
+from app.services.suggestions import get_suggested_questions, select_follow_up_questions
+from app.dependencies import get_qa_chain, get_statute_index
 from app.config import settings
 
 
-def get_chat_response(
+# Characters of a direct answer to see before checking its language
+LANGUAGE_CHECK_CHARS = 80
+
+
+async def get_chat_response(
     query: str,
     category: str,
     language: str,
@@ -17,6 +32,10 @@ def get_chat_response(
     """
     Process a user query and return a response using RAG architecture.
     
+    Independent LLM stages run concurrently: the category relevance check
+    runs alongside retrieval and answer generation, and follow-up question
+    generation runs alongside translation.
+    
     Args:
         query: User's question
         category: Legal category
@@ -41,67 +60,148 @@ def get_chat_response(
             # Fallback if session_id is not available
             conversation_id = "unknown"
         
-        # If strict category check is enabled, first verify query relevance
+        # Greetings, thanks and help requests get a templated reply without
+        # retrieval or any LLM call
+        small_talk = get_small_talk_response(query, category, language)
+        if small_talk:
+            return {**small_talk, "conversation_id": conversation_id}
+        
+        # Answer first-turn questions from the cache when possible; answers
+        # that build on earlier turns can't be reused
+        chat_history = load_chat_history(memory)
+        use_cache = settings.ENABLE_CACHE and not chat_history
+        if use_cache:
+            cached = await _run_stage("cache", get_answer_cache().get(query, category, language, strict_category_check), fallback=None)
+            if cached:
+                return {**cached, "conversation_id": conversation_id}
+        
+        # Get the shared QA chain; only this session's history is bound per call
+        qa = get_qa_chain(llm, retriever)
+        direct = answers_directly(language)
+        answer_inputs = {
+            "question": enhanced_query,
+            "language_instructions": answer_language_instructions(language if direct else "English")
+        }
+        chain_inputs = {**answer_inputs, "chat_history": condensing_history(query, chat_history)}
+        
+        # Questions citing a provision ("Section 420 IPC") are answered from
+        # its exact text, without question condensing or vector search
+        cited_documents = get_cited_provisions(query, category)
+        if cited_documents:
+            answer_coro = answer_from_documents(qa, cited_documents, answer_inputs)
+        else:
+            answer_coro = qa.ainvoke(chain_inputs)
+        
+        # Start retrieval and answer generation straight away so that the
+        # relevance check (if any) does not delay them
+        answer_task = asyncio.create_task(
+            asyncio.wait_for(answer_coro, timeout=settings.STAGE_TIMEOUTS["answer"])
+        )
+        
+        # If strict category check is enabled, verify query relevance meanwhile
         if strict_category_check:
-            relevance_check = check_category_relevance(query, category, llm)
+            relevance_check = await _run_stage(
+                "relevance",
+                check_category_relevance(query, category, llm),
+                fallback={"is_relevant": True, "message": ""}
+            )
             if not relevance_check["is_relevant"]:
+                answer_task.cancel()
+                suggested_questions = await _run_stage(
+                    "suggestions",
+                    get_category_suggestions(category, language, llm),
+                    fallback=[
+                        f"What are the basics of {category}?",
+                        f"What rights do I have under {category} law?",
+                        f"What recent developments have occurred in {category} law?"
+                    ]
+                )
                 return {
                     "answer": relevance_check["message"],
                     "sources": [],
                     "conversation_id": conversation_id,
-                    "suggested_questions": generate_suggested_questions(category, llm),
+                    "suggested_questions": suggested_questions,
                     "message_type": "error"
                 }
         
-        # Setup QA chain
-        qa = ConversationalRetrievalChain.from_llm(
-            llm=llm,
-            retriever=retriever,
-            memory=memory,
-            return_source_documents=True
-        )
-        
         # Get response
-        result = qa({"question": enhanced_query})
+        result = await answer_task
         
         # Extract answer and sources
         english_response = result["answer"]
         source_documents = result.get("source_documents", [])
         
         # Extract source filenames
-        sources = []
-        for doc in source_documents:
-            if hasattr(doc, "metadata") and "source" in doc.metadata:
-                source = doc.metadata["source"]
-                if source not in sources:
-                    sources.append(source)
+        sources = extract_sources(source_documents)
+        
+        # Structured answers carry their follow-up questions and sources
+        structured_questions = []
+        if settings.ANSWER_MODE == "structured":
+            structured = parse_structured_answer(english_response, sources)
+            english_response, sources = structured.answer, structured.sources
+            structured_questions = structured.suggested_questions
+        memory.save_context({"question": enhanced_query}, {"answer": english_response})
         
         # Determine message type
         message_type = determine_message_type(query)
         
-        # First format the response to be conversational with some structure
-        formatted_response = make_response_conversational(english_response, query, message_type, llm)
-        
-        # Then translate response if needed
-        final_response = formatted_response
-        if language != "English" and settings.ENABLE_TRANSLATION:
-            final_response = translate_text(
-                text=formatted_response, 
-                source_lang="English", 
-                target_lang=language,
-                llm=llm
+        # In single-pass mode the QA prompt already wrote the answer in its
+        # final style; the rewrite mode restyles it with a second LLM call
+        if settings.ANSWER_MODE == "rewrite":
+            formatted_response = await _run_stage(
+                "format",
+                make_response_conversational(english_response, query, message_type, llm),
+                fallback=english_response
             )
+        else:
+            formatted_response = english_response
         
-        # Generate relevant follow-up questions based on the context and category
-        suggested_questions = generate_follow_up_questions(query, final_response, category, llm)
+        # Follow-up questions only need the answer, so get them while the
+        # response is being translated
+        if structured_questions:
+            follow_up_stage = asyncio.sleep(0, result=structured_questions)
+        else:
+            follow_up_stage = _run_stage(
+                "follow_up",
+                get_follow_up_questions(query, formatted_response, category, language, llm),
+                fallback=[
+                    f"Can you explain more about {category}?",
+                    f"What are the common issues in {category} law?",
+                    f"How can I learn more about {category}?"
+                ]
+            )
         
-        return {
+        # Answers written directly in the language need no translation, unless
+        # the model answered in English anyway
+        if direct and is_in_language(formatted_response, language):
+            suggested_questions = await follow_up_stage
+            final_response = formatted_response
+        elif language != "English" and settings.ENABLE_TRANSLATION:
+            translation_stage = _run_stage(
+                "translation",
+                translate_text(
+                    text=formatted_response, 
+                    source_lang="English", 
+                    target_lang=language,
+                    llm=llm
+                ),
+                fallback=formatted_response
+            )
+            suggested_questions, final_response = await asyncio.gather(follow_up_stage, translation_stage)
+        else:
+            suggested_questions = await follow_up_stage
+            final_response = formatted_response
+        
+        response = {
             "answer": final_response,
             "sources": sources,
-            "conversation_id": conversation_id,
             "suggested_questions": suggested_questions,
             "message_type": message_type
         }
+        if use_cache and message_type == "answer":
+            await _run_stage("cache", get_answer_cache().set(query, category, language, response, strict_category_check), fallback=None)
+        
+        return {**response, "conversation_id": conversation_id}
     except Exception as e:
         # Fallback response in case of any exceptions
         print(f"Error in get_chat_response: {str(e)}")
@@ -118,17 +218,466 @@ def get_chat_response(
         }
 
 
-def check_category_relevance(query: str, category: str, llm):
+async def stream_chat_response(
+    query: str,
+    category: str,
+    language: str,
+    retriever,
+    llm,
+    memory: ConversationBufferWindowMemory,
+    strict_category_check: bool = False
+):
+    """
+    Process a user query like get_chat_response, streaming the answer as it is generated.
+    
+    Answers are streamed straight from the QA chain, without the rewrite pass
+    of ANSWER_MODE "rewrite". Other languages are answered directly when
+    answers_directly allows it; otherwise the English answer is generated
+    first and its translation is streamed.
+    
+    Args:
+        query: User's question
+        category: Legal category
+        language: Response language
+        retriever: Vector store retriever
+        llm: Language model
+        memory: Conversation memory
+        strict_category_check: Whether to enforce strict category relevance
+        
+    Yields:
+        (event, data) tuples: ("token", {"token": ...}) for each chunk of the
+        answer, then a single ("done", {...}) with the same fields as
+        get_chat_response
+    """
+    conversation_id = getattr(memory, "session_id", "unknown")
+    chain_task = None
+    follow_up_task = None
+    try:
+        # Add category context to the query
+        enhanced_query = f"[Category: {category}] {query}"
+        
+        # Greetings, thanks and help requests get a templated reply
+        small_talk = get_small_talk_response(query, category, language)
+        if small_talk:
+            yield "token", {"token": small_talk["answer"]}
+            yield "done", {**small_talk, "conversation_id": conversation_id}
+            return
+        
+        # Answer first-turn questions from the cache when possible
+        chat_history = load_chat_history(memory)
+        use_cache = settings.ENABLE_CACHE and not chat_history
+        if use_cache:
+            cached = await _run_stage("cache", get_answer_cache().get(query, category, language, strict_category_check), fallback=None)
+            if cached:
+                yield "token", {"token": cached["answer"]}
+                yield "done", {**cached, "conversation_id": conversation_id}
+                return
+        
+        # Get the shared QA chain; only this session's history is bound per call
+        qa = get_qa_chain(llm, retriever)
+        direct = answers_directly(language)
+        answer_inputs = {
+            "question": enhanced_query,
+            "language_instructions": answer_language_instructions(language if direct else "English")
+        }
+        chain_inputs = {**answer_inputs, "chat_history": condensing_history(query, chat_history)}
+        
+        stream_answer = language == "English" or not settings.ENABLE_TRANSLATION or direct
+        tokens = asyncio.Queue()
+        # Structured answers are JSON; only the answer string is streamed
+        parser = AnswerStreamParser() if settings.ANSWER_MODE == "structured" else None
+        
+        # Questions citing a provision are answered from its exact text by the
+        # chain's answer step alone
+        cited_documents = get_cited_provisions(query, category)
+        if cited_documents:
+            runnable = qa.combine_docs_chain
+            runnable_inputs = {"input_documents": cited_documents, **answer_inputs}
+        else:
+            runnable, runnable_inputs = qa, chain_inputs
+        
+        async def run_chain():
+            retrieved = bool(cited_documents)
+            result = None
+            try:
+                async for event in runnable.astream_events(runnable_inputs, version="v2"):
+                    kind = event["event"]
+                    if kind == "on_retriever_end":
+                        retrieved = True
+                    elif kind == "on_chat_model_stream" and retrieved and stream_answer:
+                        # Tokens generated before retrieval come from the
+                        # question-condensing step, not the answer
+                        content = event["data"]["chunk"].content
+                        if content and parser is not None:
+                            content = parser.feed(content)
+                        if content:
+                            await tokens.put(content)
+                    elif kind == "on_chain_end" and not event["parent_ids"]:
+                        result = event["data"]["output"]
+            finally:
+                await tokens.put(None)
+            if cited_documents:
+                return {"answer": result["output_text"], "source_documents": cited_documents}
+            return result
+        
+        # Start the chain straight away; tokens are buffered until the
+        # relevance check (if any) has passed
+        chain_task = asyncio.create_task(
+            asyncio.wait_for(run_chain(), timeout=settings.STAGE_TIMEOUTS["answer"])
+        )
+        
+        if strict_category_check:
+            relevance_check = await _run_stage(
+                "relevance",
+                check_category_relevance(query, category, llm),
+                fallback={"is_relevant": True, "message": ""}
+            )
+            if not relevance_check["is_relevant"]:
+                chain_task.cancel()
+                suggested_questions = await _run_stage(
+                    "suggestions",
+                    get_category_suggestions(category, language, llm),
+                    fallback=[
+                        f"What are the basics of {category}?",
+                        f"What rights do I have under {category} law?",
+                        f"What recent developments have occurred in {category} law?"
+                    ]
+                )
+                yield "done", {
+                    "answer": relevance_check["message"],
+                    "sources": [],
+                    "conversation_id": conversation_id,
+                    "suggested_questions": suggested_questions,
+                    "message_type": "error"
+                }
+                return
+        
+        # Forward answer tokens as they arrive. Direct answers are held back
+        # until there is enough text to tell whether the model kept to the
+        # language; if it didn't, the answer is translated instead
+        held = [] if direct else None
+        in_language = not direct
+        streamed = False
+        while (token := await tokens.get()) is not None:
+            if held is None:
+                if in_language:
+                    streamed = True
+                    yield "token", {"token": token}
+                continue
+            held.append(token)
+            if len("".join(held)) >= LANGUAGE_CHECK_CHARS:
+                in_language = is_in_language("".join(held), language)
+                if in_language:
+                    streamed = True
+                    yield "token", {"token": "".join(held)}
+                held = None
+        
+        result = await chain_task
+        english_response = result["answer"]
+        sources = extract_sources(result.get("source_documents", []))
+        structured_questions = []
+        if parser is not None:
+            structured = parse_structured_answer(english_response, sources)
+            english_response, sources = structured.answer, structured.sources
+            structured_questions = structured.suggested_questions
+        if held is not None:
+            # Short answer, decided on its full text
+            in_language = is_in_language(english_response, language)
+        if stream_answer and in_language and not streamed:
+            # Nothing could be streamed (short answer, or output that wasn't JSON)
+            yield "token", {"token": english_response}
+        memory.save_context({"question": enhanced_query}, {"answer": english_response})
+        message_type = determine_message_type(query)
+        
+        # Follow-up questions only need the answer
+        if structured_questions:
+            follow_up_task = asyncio.create_task(asyncio.sleep(0, result=structured_questions))
+        else:
+            follow_up_task = asyncio.create_task(_run_stage(
+                "follow_up",
+                get_follow_up_questions(query, english_response, category, language, llm),
+                fallback=[
+                    f"Can you explain more about {category}?",
+                    f"What are the common issues in {category} law?",
+                    f"How can I learn more about {category}?"
+                ]
+            ))
+        
+        if stream_answer and in_language:
+            final_response = english_response
+        else:
+            translated_parts = []
+            try:
+                async for chunk in stream_translation(english_response, "English", language, llm):
+                    translated_parts.append(chunk)
+                    yield "token", {"token": chunk}
+                final_response = "".join(translated_parts)
+            except SegmentMarkerError as e:
+                # The streamed segments may be misaligned; the done event
+                # carries a translation of the whole answer instead
+                print(f"Streamed translation discarded: {str(e)}")
+                final_response = await translate_whole_text(english_response, "English", language, llm)
+        
+        response = {
+            "answer": final_response,
+            "sources": sources,
+            "suggested_questions": await follow_up_task,
+            "message_type": message_type
+        }
+        if use_cache and message_type == "answer":
+            await _run_stage("cache", get_answer_cache().set(query, category, language, response, strict_category_check), fallback=None)
+        
+        yield "done", {**response, "conversation_id": conversation_id}
+    except Exception as e:
+        print(f"Error in stream_chat_response: {str(e)}")
+        yield "done", {
+            "answer": f"I'm sorry, I encountered an error while processing your question. Please try again or ask a different question about {category}.",
+            "sources": [],
+            "conversation_id": conversation_id,
+            "suggested_questions": [
+                f"What is {category}?",
+                f"Can you explain the basics of {category}?",
+                f"What are important concepts in {category}?"
+            ],
+            "message_type": "error"
+        }
+    finally:
+        # Don't leave LLM calls running if the client went away mid-stream
+        for task in (chain_task, follow_up_task):
+            if task and not task.done():
+                task.cancel()
+
+
+async def get_follow_up_questions(query, answer, category, language, llm):
+    """
+    Get follow-up questions for an answer, according to settings.FOLLOW_UP_MODE.
+    
+    In "pool" mode they are ranked from the category's precomputed question
+    pool (no LLM call); in "llm" mode they are generated from the answer.
+    
+    Args:
+        query: User's question
+        answer: English answer
+        category: Legal category
+        language: Response language
+        llm: Language model
+        
+    Returns:
+        List of follow-up questions
+    """
+    if settings.FOLLOW_UP_MODE == "llm":
+        return await generate_follow_up_questions(query, answer, category, llm)
+    return await select_follow_up_questions(query, category, language)
+
+
+async def get_category_suggestions(category, language, llm):
+    """
+    Get general suggested questions for a category, according to settings.FOLLOW_UP_MODE.
+    
+    Args:
+        category: Legal category
+        language: Response language
+        llm: Language model
+        
+    Returns:
+        List of suggested questions
+    """
+    if settings.FOLLOW_UP_MODE == "llm":
+        return await generate_suggested_questions(category, llm)
+    return get_suggested_questions(category, language)
+
+
+def load_chat_history(memory: ConversationBufferWindowMemory) -> list:
+    """
+    Get the chat history to pass to the QA chain for a session's memory.
+    
+    Args:
+        memory: Conversation memory
+        
+    Returns:
+        List of recent chat messages
+    """
+    return memory.load_memory_variables({})[memory.memory_key]
+
+
+def answers_directly(language: str) -> bool:
+    """
+    Check whether answers in a language are generated in it directly by the
+    QA prompt (TRANSLATION_MODE "direct", single-pass or structured answers) rather than
+    generated in English and translated.
+    
+    Args:
+        language: Response language
+        
+    Returns:
+        True for direct answers
+    """
+    return (
+        language != "English"
+        and settings.ENABLE_TRANSLATION
+        and settings.TRANSLATION_MODE == "direct"
+        and settings.ANSWER_MODE in ("single_pass", "structured")
+    )
+
+
+def condensing_history(query: str, chat_history: list) -> list:
+    """
+    Get the chat history the QA chain should condense a question with.
+    
+    The chain makes an extra LLM call to rewrite a question into a
+    standalone one whenever it gets history. Questions that already stand on
+    their own are sent without history, skipping that call; the answer
+    prompt doesn't use the history either way.
+    
+    Args:
+        query: User's question
+        chat_history: Earlier turns of the session
+        
+    Returns:
+        chat_history, or [] if the question needs no condensing
+    """
+    if not chat_history or is_self_contained(query, settings.SELF_CONTAINED_MIN_WORDS):
+        return []
+    return chat_history
+
+
+def get_cited_provisions(query: str, category: str) -> list:
+    """
+    Get the statute provisions a query cites by number, from the index built
+    by ingestion.
+    
+    Args:
+        query: User's question
+        category: Legal category
+        
+    Returns:
+        Provision documents (empty if the query cites none, or lookup is disabled)
+    """
+    if not settings.ENABLE_CITATION_LOOKUP:
+        return []
+    try:
+        documents = get_statute_index().lookup(query, category, limit=settings.RETRIEVAL_K)
+        if documents and settings.CITATION_CONTEXT_MAX_TOKENS:
+            documents = share_budget(
+                documents, settings.CITATION_CONTEXT_MAX_TOKENS, settings.CONTEXT_CHARS_PER_TOKEN
+            )
+        return documents
+    except Exception as e:
+        print(f"Error looking up cited provisions: {str(e)}")
+        return []
+
+
+async def answer_from_documents(qa, documents, inputs):
+    """
+    Answer a question from given documents with the QA chain's answer step,
+    skipping its question-condensing and retrieval steps.
+    
+    Args:
+        qa: ConversationalRetrievalChain
+        documents: Documents to answer from
+        inputs: Answer prompt inputs (question, language_instructions)
+        
+    Returns:
+        Dictionary with answer and source_documents, like the full chain
+    """
+    output = await qa.combine_docs_chain.ainvoke({"input_documents": documents, **inputs})
+    return {"answer": output["output_text"], "source_documents": documents}
+
+
+def extract_sources(source_documents) -> list:
+    """
+    Get the unique source filenames of retrieved documents, in retrieval order.
+    
+    Args:
+        source_documents: Retrieved documents
+        
+    Returns:
+        List of source filenames
+    """
+    sources = []
+    for doc in source_documents:
+        if hasattr(doc, "metadata") and "source" in doc.metadata:
+            source = doc.metadata["source"]
+            if source not in sources:
+                sources.append(source)
+    return sources
+
+
+async def _run_stage(stage: str, coro, fallback):
+    """
+    Await a pipeline stage, bounded by its configured timeout.
+    
+    Args:
+        stage: Stage name, used to look up the timeout in settings.STAGE_TIMEOUTS
+        coro: Coroutine producing the stage result
+        fallback: Value to return if the stage times out or fails
+        
+    Returns:
+        Stage result, or the fallback value
+    """
+    try:
+        return await asyncio.wait_for(coro, timeout=settings.STAGE_TIMEOUTS.get(stage))
+    except asyncio.TimeoutError:
+        print(f"Stage '{stage}' timed out after {settings.STAGE_TIMEOUTS.get(stage)}s")
+        return fallback
+    except Exception as e:
+        print(f"Error in stage '{stage}': {str(e)}")
+        return fallback
+
+
+async def check_category_relevance(query: str, category: str, llm):
     """
     Check if a query is relevant to the specified legal category.
     
+    The query is scored locally against per-category embedding centroids;
+    the LLM is only asked when the score falls between the accept and reject
+    thresholds or the classifier is unavailable.
+    
     Args:
         query: User's question
         category: Legal category
         llm: Language model
         
     Returns:
-        Dictionary with relevance check result
+        Dictionary with relevance check result, confidence, per-category
+        scores and the method that decided it ("embedding" or "llm")
+    """
+    classification = None
+    if settings.ENABLE_CATEGORY_CLASSIFIER:
+        try:
+            classification = await classify_category_relevance(query, category)
+        except Exception as e:
+            print(f"Error classifying category relevance: {str(e)}")
+    
+    if classification and classification["is_relevant"] is not None:
+        is_relevant = classification["is_relevant"]
+        method = "embedding"
+    else:
+        is_relevant = await check_category_relevance_with_llm(query, category, llm)
+        method = "llm"
+    
+    result = {
+        "is_relevant": is_relevant,
+        "message": "",
+        "confidence": classification["confidence"] if classification else None,
+        "scores": classification["scores"] if classification else {},
+        "method": method
+    }
+    if not is_relevant:
+        result["message"] = f"I'm sorry, but your question doesn't appear to be related to the '{category}' category. Please ask a question specifically about {category} or select a different legal category."
+    return result
+
+async def check_category_relevance_with_llm(query: str, category: str, llm) -> bool:
+    """
+    Ask the LLM whether a query is relevant to the specified legal category.
+    
+    Args:
+        query: User's question
+        category: Legal category
+        llm: Language model
+        
+    Returns:
+        True if the LLM answered YES
     """
     prompt = f"""
     You are a legal expert responsible for routing questions to the appropriate department.
@@ -145,21 +694,10 @@ def check_category_relevance(query: str, category: str, llm):
     - Respond with only a single word: "YES" or "NO".
     """
     
-    response = llm.invoke(prompt)
-    is_relevant = response.content.strip().upper() == "YES"
-    
-    if is_relevant:
-        return {
-            "is_relevant": True,
-            "message": ""
-        }
-    else:
-        return {
-            "is_relevant": False,
-            "message": f"I'm sorry, but your question doesn't appear to be related to the '{category}' category. Please ask a question specifically about {category} or select a different legal category."
-        }
+    response = await llm.ainvoke(prompt)
+    return response.content.strip().upper() == "YES"
 
-def generate_follow_up_questions(user_query, response, category, llm):
+async def generate_follow_up_questions(user_query, response, category, llm):
     """
     Generate relevant follow-up questions based on the context and category.
     
@@ -194,7 +732,7 @@ def generate_follow_up_questions(user_query, response, category, llm):
         """
         
         try:
-            result = llm.invoke(prompt)
+            result = await llm.ainvoke(prompt)
             questions = [q.strip() for q in result.content.strip().split('\n') if q.strip()]
             
             # Validate the questions - they should be actual questions (ending with ?)
@@ -215,7 +753,7 @@ def generate_follow_up_questions(user_query, response, category, llm):
             # Back-off to simpler prompt on failure
             try:
                 simple_prompt = f"Generate 3 common questions about {category} law. Format as a simple list."
-                result = llm.invoke(simple_prompt)
+                result = await llm.ainvoke(simple_prompt)
                 questions = [q.strip() for q in result.content.strip().split('\n') if q.strip()]
                 return questions[:3]
             except:
@@ -240,18 +778,39 @@ def determine_message_type(query):
     Returns:
         Message type as string
     """
-    query_lower = query.lower()
-    
-    if any(greeting in query_lower for greeting in ["hello", "hi", "hey", "greetings", "good morning", "good afternoon", "good evening"]):
+    small_talk = detect_small_talk(query)
+    if small_talk:
+        return small_talk
+    elif starts_with_greeting(query):
+        # A greeting followed by a question still gets a full answer
         return "greeting"
-    elif any(word in query_lower for word in ["thanks", "thank you", "appreciate"]):
-        return "acknowledgment"
-    elif any(word in query_lower for word in ["help", "assist", "what can you do", "capabilities"]):
-        return "help"
     else:
         return "answer"
 
-def generate_suggested_questions(category, llm):
+def get_small_talk_response(query, category, language):
+    """
+    Build a templated response for greetings, thanks and help requests.
+    
+    Args:
+        query: User's query
+        category: Legal category
+        language: Response language
+        
+    Returns:
+        Response dictionary without conversation_id, or None if the query
+        needs a real answer
+    """
+    intent = detect_small_talk(query)
+    if intent is None:
+        return None
+    return {
+        "answer": get_small_talk_reply(intent, category, language),
+        "sources": [],
+        "suggested_questions": get_suggested_questions(category, language),
+        "message_type": intent
+    }
+
+async def generate_suggested_questions(category, llm):
     """
     Generate suggested questions for a category when user's query is not relevant.
     
@@ -274,7 +833,7 @@ def generate_suggested_questions(category, llm):
         Format your response as a simple list with each question on a new line, without numbers or bullets.
         """
         
-        result = llm.invoke(prompt)
+        result = await llm.ainvoke(prompt)
         questions = [q.strip() for q in result.content.strip().split('\n') if q.strip()]
         
         # Return at most 3 questions
@@ -288,7 +847,7 @@ def generate_suggested_questions(category, llm):
             f"What recent developments have occurred in {category} law?"
         ]
 
-def make_response_conversational(response, query, message_type, llm):
+async def make_response_conversational(response, query, message_type, llm):
     """
     Make the response more conversational based on the message type.
     
@@ -313,7 +872,7 @@ def make_response_conversational(response, query, message_type, llm):
             Original response: "{response}"
             """
             
-            result = llm.invoke(prompt)
+            result = await llm.ainvoke(prompt)
             return result.content.strip()
             
         elif message_type == "acknowledgment":
@@ -330,17 +889,13 @@ def make_response_conversational(response, query, message_type, llm):
             Original Response: "{response}"
             
             Guidelines:
-            - Keep the friendly, conversational tone
             - Maintain most of the original flow and structure
-            - Use bullet points only for lists or when it helps clarify multiple points
-            - Use simple language where possible while keeping legal terms when necessary
-            - Break up very long paragraphs but don't change the style dramatically
             - Ensure it flows naturally as part of a conversation
-            - Do not add disclaimers or unnecessary statements
+            {ANSWER_STYLE_GUIDELINES}
             """
             
             try:
-                result = llm.invoke(prompt)
+                result = await llm.ainvoke(prompt)
                 return result.content.strip()
             except Exception as inner_e:
                 print(f"Error in LLM invocation: {str(inner_e)}")
@@ -0,0 +1,125 @@
+import json
+import mmap
+import os
+from typing import List
+
+import numpy as np
+from langchain_core.documents import Document
+
+HEADER_FILE = "chunks.json"
+TEXT_FILE = "chunks.txt"
+OFFSETS_FILE = "chunk_offsets.npy"
+IDS_FILE = "chunk_ids.npy"
+METADATA_FILE = "chunk_metadata.npy"
+STORE_FILES = [HEADER_FILE, TEXT_FILE, OFFSETS_FILE, IDS_FILE, METADATA_FILE]
+
+
+def write_chunk_store(path: str, docs: List[Document]):
+    """
+    Write chunks in columnar form, in vector position order.
+
+    - chunks.txt: all chunk texts as one UTF-8 blob
+    - chunk_offsets.npy: int64 byte offsets into the blob (count + 1 entries)
+    - chunk_ids.npy: fixed-width docstore ids
+    - chunk_metadata.npy: int32 codes (count x keys) into the interned value
+      tables in chunks.json, -1 where a chunk lacks a key
+    - chunks.json: count, metadata keys and value tables
+
+    Files are written under temporary names and swapped in with os.replace,
+    the header last.
+
+    Args:
+        path: Directory to write to
+        docs: Chunk documents, one per vector position
+    """
+    keys = sorted({key for doc in docs for key in doc.metadata})
+    values = {key: [] for key in keys}
+    codes_by_value = {key: {} for key in keys}
+    codes = np.full((len(docs), len(keys)), -1, dtype=np.int32)
+    offsets = np.zeros(len(docs) + 1, dtype=np.int64)
+
+    with open(os.path.join(path, TEXT_FILE + ".tmp"), "wb") as blob:
+        for i, doc in enumerate(docs):
+            text = doc.page_content.encode("utf-8")
+            blob.write(text)
+            offsets[i + 1] = offsets[i] + len(text)
+            for j, key in enumerate(keys):
+                if key not in doc.metadata:
+                    continue
+                # Intern by JSON form so any JSON-serializable value works
+                value_key = json.dumps(doc.metadata[key], sort_keys=True)
+                code = codes_by_value[key].get(value_key)
+                if code is None:
+                    code = codes_by_value[key][value_key] = len(values[key])
+                    values[key].append(doc.metadata[key])
+                codes[i, j] = code
+
+    ids = [(doc.id or "").encode("utf-8") for doc in docs]
+    id_width = max((len(doc_id) for doc_id in ids), default=1) or 1
+    for name, array in [
+        (OFFSETS_FILE, offsets),
+        (IDS_FILE, np.array(ids, dtype=f"S{id_width}")),
+        (METADATA_FILE, codes),
+    ]:
+        with open(os.path.join(path, name + ".tmp"), "wb") as f:
+            np.save(f, array)
+    with open(os.path.join(path, HEADER_FILE + ".tmp"), "w", encoding="utf-8") as f:
+        json.dump({"count": len(docs), "keys": keys, "values": [values[key] for key in keys]}, f)
+
+    for name in [TEXT_FILE, OFFSETS_FILE, IDS_FILE, METADATA_FILE, HEADER_FILE]:
+        os.replace(os.path.join(path, name + ".tmp"), os.path.join(path, name))
+
+
+class ChunkStore:
+    """
+    Read-only columnar chunk store written by write_chunk_store.
+
+    The text blob and arrays are memory-mapped, so they are shared across
+    workers through the page cache, and any chunk is read in O(1) by its
+    vector position.
+    """
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, HEADER_FILE), encoding="utf-8") as f:
+            header = json.load(f)
+        self.count = header["count"]
+        self.keys = header["keys"]
+        self.values = header["values"]
+
+        # Empty files can't be mapped
+        mmap_mode = "r" if self.count else None
+        self.offsets = np.load(os.path.join(path, OFFSETS_FILE), mmap_mode=mmap_mode)
+        self.ids = np.load(os.path.join(path, IDS_FILE), mmap_mode=mmap_mode)
+        self.codes = np.load(os.path.join(path, METADATA_FILE), mmap_mode=mmap_mode)
+        if len(self.offsets) != self.count + 1:
+            raise ValueError(f"Chunk store in {path} is incomplete")
+
+        self._text = b""
+        text_path = os.path.join(path, TEXT_FILE)
+        if os.path.getsize(text_path):
+            with open(text_path, "rb") as f:
+                self._text = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return self.count
+
+    def text(self, position: int) -> str:
+        start, end = self.offsets[position], self.offsets[position + 1]
+        return self._text[start:end].decode("utf-8")
+
+    def metadata(self, position: int) -> dict:
+        return {
+            key: self.values[j][code]
+            for j, (key, code) in enumerate(zip(self.keys, self.codes[position]))
+            if code >= 0
+        }
+
+    def doc_id(self, position: int) -> str:
+        return self.ids[position].decode("utf-8")
+
+    def document(self, position: int) -> Document:
+        return Document(
+            id=self.doc_id(position),
+            page_content=self.text(position),
+            metadata=self.metadata(position)
+        )
@@ -0,0 +1,155 @@
+import asyncio
+import os
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.config import settings
+from app.dependencies import category_centroids_path, embed_query, get_embeddings
+from app.utils.concurrency import run_blocking
+
+
+class CategoryClassifier:
+    """Scores queries against one centroid embedding per legal category."""
+
+    def __init__(self, categories: List[str], centroids: np.ndarray):
+        self.categories = categories
+        # Unit-length centroids, one row per category
+        self.centroids = centroids
+
+    def scores(self, query_vector: np.ndarray) -> Dict[str, float]:
+        """Cosine similarity of a query to every category."""
+        similarities = self.centroids @ query_vector
+        return {category: float(score) for category, score in zip(self.categories, similarities)}
+
+    def classify(self, query_vector: np.ndarray, category: str) -> Dict:
+        """
+        Decide whether a query belongs to a category.
+
+        A query is relevant if its score reaches CATEGORY_ACCEPT_THRESHOLD and
+        irrelevant if it is below CATEGORY_REJECT_THRESHOLD, or if another
+        category beats it by more than CATEGORY_MARGIN. Anything else is
+        left undecided.
+
+        Args:
+            query_vector: Unit-length query embedding
+            category: Legal category
+
+        Returns:
+            Dictionary with is_relevant (True, False or None if uncertain),
+            confidence (0-1 that the query belongs to the category) and
+            per-category scores
+        """
+        scores = self.scores(query_vector)
+        score = scores.get(category)
+        if score is None:
+            return {"is_relevant": None, "confidence": None, "scores": scores}
+
+        best_other = max((s for c, s in scores.items() if c != category), default=-1.0)
+        accept = settings.CATEGORY_ACCEPT_THRESHOLD
+        reject = settings.CATEGORY_REJECT_THRESHOLD
+        confidence = float(np.clip((score - reject) / (accept - reject), 0.0, 1.0))
+
+        if score >= accept:
+            is_relevant = True
+        elif score < reject or best_other - score > settings.CATEGORY_MARGIN:
+            is_relevant = False
+        else:
+            is_relevant = None
+        return {"is_relevant": is_relevant, "confidence": confidence, "scores": scores}
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """Scale each row of a matrix to unit length."""
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def category_chunk_means() -> Dict[str, np.ndarray]:
+    """
+    Load the per-category mean chunk embeddings saved by ingestion
+    (see embedding.save_category_centroids).
+
+    Returns:
+        Dictionary of category to unit-length mean vector, empty if the file
+        is missing (stores ingested before it was written)
+    """
+    path = category_centroids_path()
+    if not os.path.exists(path):
+        print("No category centroids saved; re-run ingestion to use chunk embeddings in the classifier")
+        return {}
+    with np.load(path) as data:
+        return {str(category): vector for category, vector in zip(data["categories"], data["centroids"])}
+
+
+async def build_category_classifier() -> CategoryClassifier:
+    """
+    Build category centroids from the category descriptions and the chunk
+    means saved by ingestion. Each centroid is the sum of the description
+    embedding and the mean chunk embedding of the category's sources.
+
+    Returns:
+        CategoryClassifier
+    """
+    categories = list(settings.LEGAL_CATEGORIES)
+    descriptions = [
+        f"{category}: {settings.CATEGORY_DESCRIPTIONS.get(category, category)}"
+        for category in categories
+    ]
+    description_vectors = normalize_rows(
+        np.asarray(await get_embeddings().aembed_documents(descriptions), dtype=np.float32)
+    )
+    chunk_means = await run_blocking(category_chunk_means)
+
+    centroids = np.stack([
+        description_vectors[i] + chunk_means.get(category, 0)
+        for i, category in enumerate(categories)
+    ])
+    return CategoryClassifier(categories, normalize_rows(centroids).astype(np.float32))
+
+
+_classifier: Optional[CategoryClassifier] = None
+_classifier_failed_at = 0.0
+_classifier_lock = asyncio.Lock()
+CLASSIFIER_RETRY_SECONDS = 300
+
+
+async def get_category_classifier() -> Optional[CategoryClassifier]:
+    """
+    Get the process-wide category classifier, building it on first use.
+
+    Returns:
+        CategoryClassifier, or None if it couldn't be built (retried after
+        CLASSIFIER_RETRY_SECONDS)
+    """
+    global _classifier, _classifier_failed_at
+    if _classifier is not None:
+        return _classifier
+    if time.time() - _classifier_failed_at < CLASSIFIER_RETRY_SECONDS:
+        return None
+    async with _classifier_lock:
+        if _classifier is None:
+            try:
+                _classifier = await build_category_classifier()
+            except Exception as e:
+                print(f"Error building category classifier: {str(e)}")
+                _classifier_failed_at = time.time()
+    return _classifier
+
+
+async def classify_category_relevance(query: str, category: str) -> Optional[Dict]:
+    """
+    Score a query's relevance to a category with the embedding classifier.
+
+    Args:
+        query: User's question
+        category: Legal category
+
+    Returns:
+        Classification from CategoryClassifier.classify, or None if the
+        classifier is unavailable
+    """
+    classifier = await get_category_classifier()
+    if classifier is None:
+        return None
+    return classifier.classify(await embed_query(query), category)
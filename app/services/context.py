@@ -0,0 +1,135 @@
+from typing import List, Optional, Sequence
+
+from langchain_core.callbacks import Callbacks
+from langchain_core.documents import Document
+from langchain_core.documents.compressor import BaseDocumentCompressor
+
+# Overlaps shorter than this are treated as coincidence, not shared text
+MIN_OVERLAP = 20
+
+
+def merge_overlapping(first: str, second: str, max_overlap: int) -> Optional[str]:
+    """
+    Join two chunks if the end of the first is repeated at the start of the
+    second (or one contains the other).
+
+    Args:
+        first: Text that would come first
+        second: Text that would follow it
+        max_overlap: Longest overlap to look for
+
+    Returns:
+        The joined text, or None if the chunks don't overlap
+    """
+    if second in first:
+        return first
+    if first in second:
+        return second
+    for size in range(min(len(first), len(second), max_overlap), MIN_OVERLAP - 1, -1):
+        if first.endswith(second[:size]):
+            return first + second[size:]
+    return None
+
+
+def pack_documents(documents: Sequence[Document], max_tokens: int, chars_per_token: float = 4.0,
+                   max_overlap: int = 400) -> List[Document]:
+    """
+    Pack retrieved chunks into a context of at most `max_tokens` tokens.
+
+    Chunks of the same source page that overlap (neighbours share their
+    splitter overlap) are merged into one span, so shared text is sent once.
+    Spans are then added in order of their most relevant chunk while they
+    fit the budget; if even the most relevant one doesn't, it is truncated.
+
+    Args:
+        documents: Chunks, most relevant first
+        max_tokens: Token budget for the whole context
+        chars_per_token: Characters per token used to estimate token counts
+        max_overlap: Longest overlap between neighbouring chunks
+
+    Returns:
+        Packed documents, most relevant first
+    """
+    spans = []
+    for rank, doc in enumerate(documents):
+        span = {
+            "key": (doc.metadata.get("source"), doc.metadata.get("page")),
+            "text": doc.page_content,
+            "metadata": doc.metadata,
+            "rank": rank,
+        }
+        # A new chunk may bridge two spans, so keep merging until nothing joins
+        merged = True
+        while merged:
+            merged = False
+            for other in spans:
+                if other["key"] != span["key"]:
+                    continue
+                text = (merge_overlapping(other["text"], span["text"], max_overlap)
+                        or merge_overlapping(span["text"], other["text"], max_overlap))
+                if text is not None:
+                    spans.remove(other)
+                    best = other if other["rank"] < span["rank"] else span
+                    span = {**best, "text": text}
+                    merged = True
+                    break
+        spans.append(span)
+
+    budget = int(max_tokens * chars_per_token)
+    packed = []
+    used = 0
+    for span in sorted(spans, key=lambda span: span["rank"]):
+        text = span["text"]
+        if used + len(text) > budget:
+            if packed:
+                continue
+            text = text[:budget]
+        packed.append(Document(page_content=text, metadata=span["metadata"]))
+        used += len(text)
+    return packed
+
+
+def share_budget(documents: Sequence[Document], max_tokens: int, chars_per_token: float = 4.0) -> List[Document]:
+    """
+    Fit documents into a budget of `max_tokens` tokens by giving each an
+    equal share, so every document is kept (truncated if need be) rather
+    than the last ones being dropped. Shares that short documents don't use
+    go to the longer ones.
+
+    Args:
+        documents: Documents to fit, in order
+        max_tokens: Token budget for all of them
+        chars_per_token: Characters per token used to estimate token counts
+
+    Returns:
+        Documents in the same order, truncated to their shares
+    """
+    remaining = int(max_tokens * chars_per_token)
+    limits = {}
+    by_length = sorted(range(len(documents)), key=lambda i: len(documents[i].page_content))
+    for count, i in enumerate(by_length):
+        limits[i] = min(len(documents[i].page_content), remaining // (len(documents) - count))
+        remaining -= limits[i]
+    return [
+        Document(page_content=doc.page_content[:limits[i]], metadata=doc.metadata)
+        for i, doc in enumerate(documents)
+    ]
+
+
+class ContextPacker(BaseDocumentCompressor):
+    """Retriever post-transform that packs retrieved chunks with pack_documents."""
+
+    max_tokens: int = 1000
+    chars_per_token: float = 4.0
+    max_overlap: int = 400
+
+    def compress_documents(
+        self, documents: Sequence[Document], query: str, callbacks: Optional[Callbacks] = None
+    ) -> Sequence[Document]:
+        return pack_documents(documents, self.max_tokens, self.chars_per_token, self.max_overlap)
+
+    async def acompress_documents(
+        self, documents: Sequence[Document], query: str, callbacks: Optional[Callbacks] = None
+    ) -> Sequence[Document]:
+        # Plain string work on a handful of chunks; not worth a thread hop
+        return self.compress_documents(documents, query, callbacks)
@@ -1,13 +1,15 @@
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 from uuid import uuid4
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
 from app.database import Conversation, Message, User
 
 
-def create_conversation(
-    db: Session,
+async def create_conversation(
+    db: AsyncSession,
     user_id: str,
     session_id: str,
     category: str,
@@ -37,14 +39,14 @@ def create_conversation(
     )
     
     db.add(conversation)
-    db.commit()
-    db.refresh(conversation)
+    await db.commit()
+    await db.refresh(conversation)
     
     return conversation
 
 
-def get_conversation_by_session_id(
-    db: Session,
+async def get_conversation_by_session_id(
+    db: AsyncSession,
     session_id: str
 ) -> Optional[Conversation]:
     """
@@ -57,11 +59,12 @@ def get_conversation_by_session_id(
     Returns:
         Conversation or None if not found
     """
-    return db.query(Conversation).filter(Conversation.session_id == session_id).first()
+    result = await db.execute(select(Conversation).where(Conversation.session_id == session_id))
+    return result.scalars().first()
 
 
-def add_message(
-    db: Session,
+async def add_message(
+    db: AsyncSession,
     conversation_id: str,
     role: str,
     content: str
@@ -86,20 +89,20 @@ def add_message(
     )
     
     db.add(message)
-    db.commit()
-    db.refresh(message)
     
     # Update conversation's updated_at timestamp
-    conversation = db.query(Conversation).filter(Conversation.id == conversation_id).first()
+    conversation = await db.get(Conversation, conversation_id)
     if conversation:
         conversation.updated_at = datetime.utcnow()
-        db.commit()
+    
+    await db.commit()
+    await db.refresh(message)
     
     return message
 
 
-def get_conversation_messages(
-    db: Session,
+async def get_conversation_messages(
+    db: AsyncSession,
     conversation_id: str
 ) -> List[Message]:
     """
@@ -112,11 +115,16 @@ def get_conversation_messages(
     Returns:
         List of messages
     """
-    return db.query(Message).filter(Message.conversation_id == conversation_id).order_by(Message.timestamp).all()
+    result = await db.execute(
+        select(Message)
+        .where(Message.conversation_id == conversation_id)
+        .order_by(Message.timestamp)
+    )
+    return result.scalars().all()
 
 
-def get_user_conversations(
-    db: Session,
+async def get_user_conversations(
+    db: AsyncSession,
     user_id: str,
     skip: int = 0,
     limit: int = 100
@@ -133,16 +141,18 @@ def get_user_conversations(
     Returns:
         List of conversations
     """
-    return db.query(Conversation)\
-        .filter(Conversation.user_id == user_id)\
-        .order_by(Conversation.updated_at.desc())\
-        .offset(skip)\
-        .limit(limit)\
-        .all()
+    result = await db.execute(
+        select(Conversation)
+        .where(Conversation.user_id == user_id)
+        .order_by(Conversation.updated_at.desc())
+        .offset(skip)
+        .limit(limit)
+    )
+    return result.scalars().all()
 
 
-def delete_conversation(
-    db: Session,
+async def delete_conversation(
+    db: AsyncSession,
     conversation_id: str
 ) -> bool:
     """
@@ -155,9 +165,15 @@ def delete_conversation(
     Returns:
         True if deleted, False if not found
     """
-    conversation = db.query(Conversation).filter(Conversation.id == conversation_id).first()
+    # Load messages up front so the delete cascade doesn't lazy-load them
+    result = await db.execute(
+        select(Conversation)
+        .options(selectinload(Conversation.messages))
+        .where(Conversation.id == conversation_id)
+    )
+    conversation = result.scalars().first()
     if conversation:
-        db.delete(conversation)
-        db.commit()
+        await db.delete(conversation)
+        await db.commit()
         return True
     return False 
\ No newline at end of file
@@ -1,17 +1,391 @@
+import asyncio
+import glob
+import hashlib
+import json
 import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from uuid import uuid4
+
+import faiss
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
-from langchain_community.document_loaders import PyPDFDirectoryLoader
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from langchain_community.document_loaders import PyPDFLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 
 from app.config import settings
+from app.dependencies import CENTROIDS_FILE, category_centroids_path, category_index_path, get_embeddings
+from app.services.classifier import normalize_rows
+from app.services.statutes import INDEX_FILE as STATUTE_INDEX_FILE, parse_provisions, read_statute_provisions, write_statute_index
+from app.services.vector_store import INDEX_FILE, load_vector_store, save_vector_store, store_file_dir, store_files_path
+from app.utils.concurrency import RateLimiter, run_blocking
+
+def category_for_source(source):
+    """
+    Get the legal category a source document belongs to.
+    
+    Args:
+        source: Source file name
+        
+    Returns:
+        Category name from settings.CATEGORY_SOURCES, or "" if unassigned
+    """
+    for category, sources in settings.CATEGORY_SOURCES.items():
+        if source in sources:
+            return category
+    return ""
+
+def save_category_indexes(vectors, embeddings):
+    """
+    Split a vector store into one FAISS sub-index per category and save them
+    next to it. Vectors are copied from the global index, not re-embedded.
+    
+    Args:
+        vectors: Global FAISS vector store with category-tagged chunks
+        embeddings: Embedding model for the sub-indexes
+    
+    Returns:
+        Dictionary of category to number of chunks
+    """
+    matrix = vectors.index.reconstruct_n(0, vectors.index.ntotal)
+    grouped = {}
+    for position, doc_id in vectors.index_to_docstore_id.items():
+        doc = vectors.docstore.search(doc_id)
+        category = doc.metadata.get("category")
+        if category:
+            grouped.setdefault(category, []).append((doc, matrix[position]))
+    
+    # Each sub-index is saved as a new version of its own store, so workers
+    # reading the previous version keep their files
+    for category, items in grouped.items():
+        sub_index = FAISS.from_embeddings(
+            [(doc.page_content, vector.tolist()) for doc, vector in items],
+            embeddings,
+            metadatas=[doc.metadata for doc, _ in items]
+        )
+        save_vector_store(sub_index, category_index_path(category))
+        print(f"Saved {category} sub-index with {len(items)} chunks")
+
+    # Only then remove sub-indexes of categories that no longer have documents
+    current = {category_index_path(category) for category in grouped}
+    for old_path in glob.glob(os.path.join(settings.VECTOR_STORE_PATH, "categories", "*")):
+        if old_path not in current:
+            shutil.rmtree(old_path, ignore_errors=True)
+            print(f"Removed sub-index {os.path.basename(old_path)}")
+    return {category: len(items) for category, items in grouped.items()}
+
+def save_category_centroids(vectors, files_path):
+    """
+    Save the mean chunk embedding of each category with the vector store.
+    The category classifier loads this small file instead of reading every
+    vector of the index (which may be memory-mapped or approximate) itself.
+    
+    Args:
+        vectors: Global FAISS vector store, with its exact index in memory
+        files_path: Version directory of the vector store
+    """
+    source_categories = {
+        source: category
+        for category, sources in settings.CATEGORY_SOURCES.items()
+        for source in sources
+    }
+    matrix = normalize_rows(vectors.index.reconstruct_n(0, vectors.index.ntotal))
+    sums = {}
+    for position, doc_id in vectors.index_to_docstore_id.items():
+        metadata = vectors.docstore.search(doc_id).metadata
+        category = metadata.get("category") or source_categories.get(metadata.get("source"))
+        if category:
+            sums[category] = sums.get(category, 0) + matrix[position]
+    categories = sorted(sums)
+    centroids = normalize_rows(np.stack([sums[c] for c in categories])) if categories else np.zeros((0, matrix.shape[1]))
+    
+    path = os.path.join(files_path, CENTROIDS_FILE)
+    with open(path + ".tmp", "wb") as f:
+        np.savez(f, categories=np.array(categories, dtype=str), centroids=centroids.astype(np.float32))
+    os.replace(path + ".tmp", path)
+
+def file_hash(path):
+    """SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def content_hash(text):
+    """SHA-256 of a chunk's text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+MANIFEST_FILE = "manifest.json"
+
+def manifest_settings():
+    """Settings that invalidate every stored vector when they change."""
+    return {
+        "embedding_model": settings.EMBEDDING_MODEL,
+        "chunk_size": settings.CHUNK_SIZE,
+        "chunk_overlap": settings.CHUNK_OVERLAP
+    }
+
+def load_indexed_store(embeddings):
+    """
+    Load the saved vector store together with its ingestion manifest.
+    
+    The manifest records, per source file, the file's content hash and the
+    hash and docstore id of each of its chunks.
+    
+    Args:
+        embeddings: Embedding model
+    
+    Returns:
+        (FAISS vector store, manifest), or (None, None) if there is no
+        usable store and the corpus has to be indexed from scratch
+    """
+    # Read the manifest and the vectors from the same version
+    files_path = store_files_path(settings.VECTOR_STORE_PATH)
+    manifest_path = os.path.join(store_file_dir(settings.VECTOR_STORE_PATH, MANIFEST_FILE, files_path), MANIFEST_FILE)
+    if not os.path.exists(manifest_path) or not os.path.exists(os.path.join(files_path, INDEX_FILE)):
+        return None, None
+    try:
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("settings") != manifest_settings():
+            print("Embedding or chunking settings changed; rebuilding the vector store")
+            return None, None
+        vectors = load_vector_store(files_path, embeddings, writable=True)
+        return vectors, manifest
+    except Exception as e:
+        print(f"Error loading the existing vector store, rebuilding it: {str(e)}")
+        return None, None
+
+def save_manifest(files, files_path):
+    """
+    Save the ingestion manifest.
+    
+    Args:
+        files: Dictionary of file name to {"hash": ..., "chunks": [{"hash": ..., "id": ...}]}
+        files_path: Version directory of the vector store
+    """
+    with open(os.path.join(files_path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump({"settings": manifest_settings(), "files": files}, f)
+
+def append_vectors(vectors, embeddings, docs, doc_vectors):
+    """
+    Append embedded chunks to a FAISS store, creating it on first use.
+    
+    Args:
+        vectors: FAISS vector store, or None
+        embeddings: Embedding model
+        docs: Chunk documents (their ids become docstore ids)
+        doc_vectors: Embedding vectors aligned with docs
+    
+    Returns:
+        FAISS vector store
+    """
+    if vectors is None:
+        vectors = FAISS(
+            embedding_function=embeddings,
+            index=faiss.IndexFlatL2(len(doc_vectors[0])),
+            docstore=InMemoryDocstore(),
+            index_to_docstore_id={}
+        )
+    vectors.add_embeddings(
+        zip([doc.page_content for doc in docs], doc_vectors),
+        metadatas=[doc.metadata for doc in docs],
+        ids=[doc.id or str(uuid4()) for doc in docs]
+    )
+    return vectors
+
+def load_pdf(path):
+    """
+    Parse one PDF into per-page documents. Runs in a worker process.
+    
+    Args:
+        path: Path of the PDF file
+    
+    Returns:
+        List of page documents (empty if the file couldn't be parsed)
+    """
+    try:
+        return PyPDFLoader(path).load()
+    except Exception as e:
+        print(f"Error loading {path}: {str(e)}")
+        return []
 
-def embed_and_save_documents(data_dir="./LEGAL-DATA"):
+def iter_documents(pdf_paths, workers):
+    """
+    Parse PDFs across a process pool, yielding pages in file order as each
+    file becomes available.
+    
+    Args:
+        pdf_paths: Paths of the PDF files
+        workers: Number of worker processes
+    
+    Yields:
+        Page documents
+    """
+    if workers <= 1 or len(pdf_paths) <= 1:
+        pages_per_file = map(load_pdf, pdf_paths)
+        for path, pages in zip(pdf_paths, pages_per_file):
+            print(f"Loaded {os.path.basename(path)}: {len(pages)} pages")
+            yield from pages
+        return
+    
+    with ProcessPoolExecutor(max_workers=min(workers, len(pdf_paths))) as pool:
+        for path, pages in zip(pdf_paths, pool.map(load_pdf, pdf_paths)):
+            print(f"Loaded {os.path.basename(path)}: {len(pages)} pages")
+            yield from pages
+
+def collect_statute_pages(documents, pages):
+    """
+    Pass page documents through, keeping those of the statutes in
+    settings.STATUTES for the section/article index.
+    
+    Args:
+        documents: Iterable of page documents
+        pages: Dictionary of source file name to page list, filled in
+    
+    Yields:
+        The same page documents
+    """
+    for doc in documents:
+        source = os.path.basename(doc.metadata.get('source', ''))
+        if source in settings.STATUTES:
+            pages.setdefault(source, []).append(doc)
+        yield doc
+
+def update_statute_index(data_dir, pages, stale, files_path):
+    """
+    Update the section/article index saved with the vector store.
+    
+    Statutes that are new, changed, or missing from the current index are
+    parsed into provisions; the rest are kept as they are.
+    
+    Args:
+        data_dir: Directory containing PDF files
+        pages: Dictionary of source file name to pages already parsed by the pipeline
+        stale: Files whose indexed provisions are out of date
+        files_path: Version directory of the vector store to save to
+    """
+    current = read_statute_provisions(store_file_dir(settings.VECTOR_STORE_PATH, STATUTE_INDEX_FILE))
+    provisions = {source: items for source, items in current.items() if source not in stale}
+    for source in settings.STATUTES:
+        path = os.path.join(data_dir, source)
+        if source in provisions or not os.path.exists(path):
+            continue
+        provisions[source] = parse_provisions(pages.get(source) or load_pdf(path))
+        print(f"Indexed {len(provisions[source])} provisions of {source}")
+    write_statute_index(files_path, provisions)
+
+def iter_chunks(documents, text_splitter, data_dir):
+    """
+    Split documents into chunks tagged with their source file and category.
+    
+    Args:
+        documents: Iterable of page documents
+        text_splitter: Text splitter
+        data_dir: Directory the documents were loaded from
+    
+    Yields:
+        Chunk documents
+    """
+    for doc in documents:
+        for chunk in text_splitter.split_documents([doc]):
+            if 'source' in chunk.metadata:
+                chunk.metadata['source'] = os.path.basename(chunk.metadata['source'])
+            else:
+                # If source metadata is not present, add it
+                chunk.metadata['source'] = os.path.basename(data_dir)
+            chunk.metadata['category'] = category_for_source(chunk.metadata['source'])
+            yield chunk
+
+def iter_batches(items, size):
+    """Group an iterable into lists of up to `size` items."""
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+async def embed_with_retry(embeddings, texts, limiter):
+    """
+    Embed texts, respecting the request rate limit and backing off on errors.
+    
+    Args:
+        embeddings: Embedding model
+        texts: Texts to embed
+        limiter: Shared RateLimiter for the embedding API
+    
+    Returns:
+        List of embedding vectors
+    """
+    for attempt in range(settings.EMBEDDING_MAX_RETRIES + 1):
+        await limiter.wait()
+        try:
+            return await embeddings.aembed_documents(texts)
+        except Exception as e:
+            if attempt == settings.EMBEDDING_MAX_RETRIES:
+                raise
+            delay = 2 ** attempt
+            print(f"Embedding request failed ({str(e)}), retrying in {delay}s")
+            # Slow down every request, not just this one: errors are usually
+            # the API pushing back on the request rate
+            limiter.pause(delay)
+
+async def embed_batches(batches, embeddings, vectors=None):
+    """
+    Embed batches of chunks with up to EMBEDDING_CONCURRENCY requests in
+    flight, appending the vectors into a single FAISS store.
+    
+    Batches are pulled from the (blocking) generator in a worker thread, so
+    PDF parsing and chunking keep going while embeddings are requested.
+    
+    Args:
+        batches: Iterator of chunk lists
+        embeddings: Embedding model
+        vectors: Existing FAISS store to append to (a new one is created if None)
+    
+    Returns:
+        (FAISS vector store or None if there were no chunks, number of chunks embedded)
+    """
+    semaphore = asyncio.Semaphore(settings.EMBEDDING_CONCURRENCY)
+    limiter = RateLimiter(settings.EMBEDDING_REQUESTS_PER_MINUTE)
+    num_chunks = 0
+    
+    async def embed_batch(number, batch):
+        nonlocal vectors
+        try:
+            batch_vectors = await embed_with_retry(embeddings, [doc.page_content for doc in batch], limiter)
+            vectors = append_vectors(vectors, embeddings, batch, batch_vectors)
+            print(f"Embedded batch {number} ({len(batch)} chunks)")
+        finally:
+            semaphore.release()
+    
+    tasks = []
+    while (batch := await run_blocking(next, batches, None)) is not None:
+        num_chunks += len(batch)
+        # Wait for a free slot before pulling more, so parsing can't run far
+        # ahead of embedding
+        await semaphore.acquire()
+        tasks.append(asyncio.create_task(embed_batch(len(tasks) + 1, batch)))
+    await asyncio.gather(*tasks)
+    return vectors, num_chunks
+
+def embed_and_save_documents(data_dir="./LEGAL-DATA", full=False):
     """
     Load PDF documents, split them into chunks, embed them, and save to disk.
     
+    Runs as a streaming pipeline: PDFs are parsed across a process pool,
+    chunked as they arrive, and embedded in concurrent, rate-limited batches
+    whose vectors are appended to one index.
+    
+    Indexing is incremental: a manifest of file and chunk content hashes is
+    kept next to the vector store, so only new or changed files are parsed,
+    only chunks whose text is new are embedded, and vectors of removed files
+    are deleted. The store is then updated in place.
+    
     Args:
         data_dir: Directory containing PDF files
+        full: Re-index every file, ignoring the saved store and manifest
     
     Returns:
         Number of chunks created
@@ -24,74 +398,103 @@ def embed_and_save_documents(data_dir="./LEGAL-DATA"):
         return 0
     
     # Check if directory contains PDF files
-    pdf_files = [f for f in os.listdir(data_dir) if f.lower().endswith('.pdf')]
+    pdf_files = sorted(f for f in os.listdir(data_dir) if f.lower().endswith('.pdf'))
     if not pdf_files:
         print(f"No PDF files found in {data_dir}. Please add PDF files to this directory.")
         return 0
     
     print(f"Found {len(pdf_files)} PDF files: {', '.join(pdf_files)}")
     
-    # Initialize embeddings
-    embeddings = GoogleGenerativeAIEmbeddings(model=settings.EMBEDDING_MODEL)
+    # Initialize embeddings (cached, so re-ingested text isn't embedded again)
+    embeddings = get_embeddings()
     
-    # Load documents
-    loader = PyPDFDirectoryLoader(data_dir)
-    print("Loader initialized")
-    docs = loader.load()
-    print(f"Loaded {len(docs)} documents")
+    # Compare the corpus against the manifest of the saved store
+    file_hashes = {f: file_hash(os.path.join(data_dir, f)) for f in pdf_files}
+    vectors, manifest = (None, None) if full else load_indexed_store(embeddings)
+    indexed_files = manifest["files"] if manifest else {}
+    changed = [f for f in pdf_files if indexed_files.get(f, {}).get("hash") != file_hashes[f]]
+    removed = [f for f in indexed_files if f not in file_hashes]
     
-    if not docs:
-        print(f"No content could be extracted from the PDF files in {data_dir}.")
-        print("Please ensure the PDF files are valid and contain text content.")
+    if vectors is not None and not changed and not removed:
+        # The vectors don't change, so missing files are added to the current version
+        files_path = store_files_path(settings.VECTOR_STORE_PATH)
+        update_statute_index(data_dir, {}, [], files_path)
+        if not os.path.exists(category_centroids_path()):
+            save_category_centroids(vectors, files_path)
+        print("Vector store is up to date")
         return 0
+    print(f"{len(changed)} new or changed files, {len(removed)} removed files")
+    
+    # Drop the old vectors of changed and removed files, keeping those of
+    # changed files by chunk hash so unchanged text isn't embedded again
+    reusable = {}
+    if vectors is not None:
+        positions = {doc_id: position for position, doc_id in vectors.index_to_docstore_id.items()}
+        stale_ids = []
+        for f in changed + removed:
+            for chunk in indexed_files.get(f, {}).get("chunks", []):
+                if chunk["id"] not in positions:
+                    continue
+                stale_ids.append(chunk["id"])
+                if f in file_hashes:
+                    reusable[chunk["hash"]] = vectors.index.reconstruct(positions[chunk["id"]])
+        if stale_ids:
+            vectors.delete(stale_ids)
+    
+    files = {f: info for f, info in indexed_files.items() if f not in changed and f not in removed}
+    for f in changed:
+        files[f] = {"hash": file_hashes[f], "chunks": []}
+    reused = []
+    
+    def track_chunks(chunks):
+        """Record chunks in the manifest; pass on only those that need embedding."""
+        for chunk in chunks:
+            chunk.id = str(uuid4())
+            chunk_hash = content_hash(chunk.page_content)
+            files[chunk.metadata['source']]["chunks"].append({"hash": chunk_hash, "id": chunk.id})
+            vector = reusable.get(chunk_hash)
+            if vector is not None:
+                reused.append((chunk, vector))
+            else:
+                yield chunk
     
-    # Split documents
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=settings.CHUNK_SIZE, 
         chunk_overlap=settings.CHUNK_OVERLAP
     )
-    final_documents = text_splitter.split_documents(docs)
-    print(f"Split into {len(final_documents)} chunks")
     
-    if not final_documents:
+    # Parse -> chunk -> batch, lazily; batches stay under the API's payload limit
+    statute_pages = {}
+    documents = iter_documents([os.path.join(data_dir, f) for f in changed], settings.INGEST_WORKERS)
+    documents = collect_statute_pages(documents, statute_pages)
+    chunks = track_chunks(iter_chunks(documents, text_splitter, data_dir))
+    batches = iter_batches(chunks, settings.EMBEDDING_BATCH_SIZE)
+    
+    vectors, num_embedded = asyncio.run(embed_batches(batches, embeddings, vectors))
+    if reused:
+        vectors = append_vectors(vectors, embeddings, [doc for doc, _ in reused], [vector for _, vector in reused])
+    num_chunks = num_embedded + len(reused)
+    print(f"Split into {num_chunks} chunks ({num_embedded} embedded, {len(reused)} reused)")
+    
+    if vectors is None:
         print("No document chunks were created. The PDFs might be empty or contain only images.")
         return 0
     
-    # Ensure metadata includes the source file name
-    for doc in final_documents:
-        if 'source' in doc.metadata:
-            source_file = doc.metadata['source']
-            doc.metadata['source'] = os.path.basename(source_file)
-        else:
-            # If source metadata is not present, add it
-            doc.metadata['source'] = os.path.basename(data_dir)
-    
-    # Batch documents to avoid payload size limits
-    batch_size = 100
-    batched_documents = [
-        final_documents[i:i + batch_size] 
-        for i in range(0, len(final_documents), batch_size)
-    ]
-    
-    # Create vector stores for each batch
-    print(f"Processing {len(batched_documents)} batches")
-    vector_stores = []
-    for i, batch in enumerate(batched_documents):
-        print(f"Processing batch {i+1}/{len(batched_documents)}")
-        vector_store = FAISS.from_documents(batch, embeddings)
-        vector_stores.append(vector_store)
-    
-    # Merge vector stores only if there are any
-    if vector_stores:
-        vectors = vector_stores[0]
-        for vector_store in vector_stores[1:]:
-            vectors.merge_from(vector_store)
-        print("Merged vector stores")
-        
-        # Save to disk
-        vectors.save_local(settings.VECTOR_STORE_PATH)
-        print(f"Saved vector store to {settings.VECTOR_STORE_PATH}")
-    else:
-        print("No vector stores were created.")
+    def write_store_files(files_path):
+        """Save the files derived from the vectors into their new version."""
+        save_manifest(files, files_path)
+        update_statute_index(data_dir, statute_pages, changed + removed, files_path)
+        save_category_centroids(vectors, files_path)
+    
+    # Save to disk
+    save_vector_store(vectors, settings.VECTOR_STORE_PATH, write_files=write_store_files)
+    # Copies of these files from before they were versioned are now outdated
+    for name in (MANIFEST_FILE, STATUTE_INDEX_FILE, CENTROIDS_FILE):
+        if os.path.exists(os.path.join(settings.VECTOR_STORE_PATH, name)):
+            os.remove(os.path.join(settings.VECTOR_STORE_PATH, name))
+    print(f"Saved vector store to {settings.VECTOR_STORE_PATH}")
+    
+    # Smaller per-category indexes for category-specific chats
+    save_category_indexes(vectors, embeddings)
     
-    return len(final_documents)
\ No newline at end of file
+    return num_chunks
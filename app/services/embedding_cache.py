@@ -0,0 +1,159 @@
+import hashlib
+import inspect
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+class EmbeddingStore:
+    """
+    On-disk embedding cache.
+
+    Vectors are stored as float32 blobs in a SQLite file, keyed by a hash of
+    the model name, the embedding kind (query or document, which some models
+    embed differently) and the text.
+    """
+
+    # SQLite's default limit on parameters per statement is 999
+    LOOKUP_BATCH_SIZE = 500
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        # WAL lets the API workers read while an ingestion run writes
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self._db.commit()
+
+    @staticmethod
+    def key(model: str, kind: str, text: str) -> str:
+        raw = f"{model}|{kind}|{text}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), self.LOOKUP_BATCH_SIZE):
+                batch = keys[i:i + self.LOOKUP_BATCH_SIZE]
+                rows = self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                    batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return found
+
+    def set_many(self, items: Dict[str, List[float]]):
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items.items()]
+            )
+            self._db.commit()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embedding model wrapper that reads through an embedding cache.
+
+    Document and query embeddings are looked up in the on-disk store (if
+    any) and only missing texts are sent to the wrapped model. Query
+    embeddings are also kept in an in-memory LRU, so repeated queries don't
+    touch the disk either.
+    """
+
+    def __init__(self, embeddings: Embeddings, model: str, store: Optional[EmbeddingStore] = None,
+                 max_query_entries: int = 1024):
+        self.embeddings = embeddings
+        self.model = model
+        self.store = store
+        self.max_query_entries = max_query_entries
+        self._queries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [EmbeddingStore.key(self.model, "document", text) for text in texts]
+        found = self.store.get_many(list(set(keys))) if self.store else {}
+
+        # Embed each missing text once, even if it appears several times
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            new = dict(zip(missing, vectors))
+            if self.store:
+                self.store.set_many(new)
+            found.update(new)
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_queries([text])[0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed several queries, with every query not already cached sent to
+        the model in a single request.
+
+        Args:
+            texts: Query texts
+
+        Returns:
+            List of embedding vectors, in the order of texts
+        """
+        keys = [EmbeddingStore.key(self.model, "query", text) for text in texts]
+        found = {}
+        for key in keys:
+            vector = self._recent_query(key)
+            if vector is not None:
+                found[key] = vector
+        if self.store and len(found) < len(set(keys)):
+            found.update(self.store.get_many([key for key in set(keys) if key not in found]))
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+        if missing:
+            new = dict(zip(missing, self._embed_missing_queries(list(missing.values()))))
+            if self.store:
+                self.store.set_many(new)
+            found.update(new)
+        for key in set(keys):
+            self._remember_query(key, found[key])
+        return [found[key] for key in keys]
+
+    def _embed_missing_queries(self, texts: List[str]) -> List[List[float]]:
+        # Models with a task type (Google's) embed a batch of queries in one
+        # request; others one query at a time
+        if len(texts) > 1 and "task_type" in inspect.signature(self.embeddings.embed_documents).parameters:
+            return self.embeddings.embed_documents(texts, task_type="RETRIEVAL_QUERY")
+        return [self.embeddings.embed_query(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        # Recent queries are answered without a trip to the thread pool
+        vector = self._recent_query(EmbeddingStore.key(self.model, "query", text))
+        if vector is not None:
+            return vector
+        return await super().aembed_query(text)
+
+    def _recent_query(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            vector = self._queries.get(key)
+            if vector is not None:
+                self._queries.move_to_end(key)
+            return vector
+
+    def _remember_query(self, key: str, vector: List[float]):
+        with self._lock:
+            self._queries[key] = vector
+            self._queries.move_to_end(key)
+            while len(self._queries) > self.max_query_entries:
+                self._queries.popitem(last=False)
@@ -0,0 +1,145 @@
+import re
+from typing import List, Optional
+
+# Phrases that mark each small-talk intent, matched on word boundaries
+INTENT_PHRASES = {
+    "greeting": [
+        "hello", "hi", "hey", "hii", "greetings", "good morning", "good afternoon",
+        "good evening", "namaste", "namaskar",
+    ],
+    "acknowledgment": [
+        "thanks", "thank you", "thank u", "thx", "appreciate it", "appreciate",
+        "great", "dhanyavad", "dhanyawad",
+    ],
+    "help": [
+        "help", "assist", "what can you do", "capabilities", "how does this work",
+        "who are you", "what are you",
+    ],
+}
+
+# Words that may accompany small talk without turning it into a question
+FILLER_WORDS = {
+    "a", "again", "all", "and", "bot", "can", "could", "everyone", "for", "i",
+    "it", "lawzo", "lot", "madam", "me", "much", "need", "ok", "okay", "please",
+    "sir", "so", "some", "there", "very", "you", "your",
+}
+
+# Checked in this order, so "hi, can you help?" is a help request
+INTENT_PRIORITY = ["help", "acknowledgment", "greeting"]
+
+
+def compile_phrases(phrases: List[str]) -> re.Pattern:
+    """Compile phrases into one case-insensitive, word-boundary-aware pattern."""
+    # Longest first so "thank you" wins over a shorter overlapping phrase
+    alternatives = "|".join(re.escape(p).replace(r"\ ", r"\s+") for p in sorted(phrases, key=len, reverse=True))
+    return re.compile(rf"\b(?:{alternatives})\b", re.IGNORECASE)
+
+
+INTENT_PATTERNS = {intent: compile_phrases(phrases) for intent, phrases in INTENT_PHRASES.items()}
+ANY_INTENT_PATTERN = compile_phrases([p for phrases in INTENT_PHRASES.values() for p in phrases])
+WORD_PATTERN = re.compile(r"\w+")
+
+# Phrases that refer back to earlier turns of a conversation. Common words
+# like "it", "this" or "more" appear in most standalone questions too, so
+# only phrases that can't be read without the earlier turns are listed.
+FOLLOW_UP_PHRASES = [
+    "what about", "how about", "what if", "and if", "and for", "and in",
+    "in that case", "in this case", "in such a case", "the same", "same thing",
+    "as above", "the above", "mentioned above", "above mentioned", "you mentioned",
+    "you said", "as mentioned", "mentioned earlier", "said earlier", "previous answer",
+    "your answer", "last answer", "the former", "the latter", "for it", "about it",
+    "of it", "for that", "about that", "do that", "elaborate", "tell me more",
+    "explain more", "explain further", "more details", "more on",
+    # Demonstrative references to a law or provision named in an earlier turn
+    "this law", "that law", "these laws", "those laws", "this act", "that act",
+    "this section", "that section", "these sections", "those sections",
+    "this article", "that article", "this rule", "that rule",
+    "this provision", "that provision", "these provisions", "those provisions",
+    "this offence", "that offence", "this offense", "that offense", "that case",
+    "the said",
+]
+FOLLOW_UP_PATTERN = compile_phrases(FOLLOW_UP_PHRASES)
+
+# Templated replies per intent and language; {category} is filled in
+SMALL_TALK_REPLIES = {
+    "greeting": {
+        "English": "Hello! I'm your legal assistant. Ask me any question about {category} and I'll do my best to help.",
+        "Hindi": "नमस्ते! मैं आपका कानूनी सहायक हूँ। {category} से जुड़ा कोई भी प्रश्न पूछें, मैं आपकी पूरी मदद करूँगा।",
+        "Marathi": "नमस्कार! मी तुमचा कायदेशीर सहाय्यक आहे. {category} विषयी कोणताही प्रश्न विचारा, मी तुम्हाला मदत करण्याचा पूर्ण प्रयत्न करेन.",
+    },
+    "acknowledgment": {
+        "English": "You're welcome! I'm happy to help with any other legal questions you might have.",
+        "Hindi": "आपका स्वागत है! आपके किसी भी अन्य कानूनी प्रश्न में मदद करके मुझे खुशी होगी।",
+        "Marathi": "तुमचे स्वागत आहे! तुमच्या इतर कोणत्याही कायदेशीर प्रश्नांसाठी मदत करायला मला आनंद होईल.",
+    },
+    "help": {
+        "English": "I'm your legal assistant, designed to help answer questions about various legal topics. I can provide information on legal categories like Criminal Law, Civil Law, Family Law, and more. Just ask your legal question about {category}, and I'll do my best to assist you with accurate information and resources.",
+        "Hindi": "मैं आपका कानूनी सहायक हूँ, जो विभिन्न कानूनी विषयों पर प्रश्नों के उत्तर देने के लिए बनाया गया है। मैं आपराधिक कानून, दीवानी कानून, पारिवारिक कानून जैसी श्रेणियों पर जानकारी दे सकता हूँ। {category} से जुड़ा अपना कानूनी प्रश्न पूछें, मैं सटीक जानकारी और संसाधनों के साथ आपकी मदद करूँगा।",
+        "Marathi": "मी तुमचा कायदेशीर सहाय्यक आहे, विविध कायदेशीर विषयांवरील प्रश्नांची उत्तरे देण्यासाठी तयार केलेला. मी फौजदारी कायदा, दिवाणी कायदा, कौटुंबिक कायदा यांसारख्या श्रेणींबद्दल माहिती देऊ शकतो. {category} विषयी तुमचा कायदेशीर प्रश्न विचारा, मी अचूक माहिती आणि संसाधनांसह तुम्हाला मदत करेन.",
+    },
+}
+
+
+def detect_small_talk(query: str) -> Optional[str]:
+    """
+    Detect messages that are only a greeting, thanks or help request.
+
+    A message counts as small talk if nothing but intent phrases and filler
+    words is left in it, so "hi" and "thank you so much!" match while
+    "hi, what is bail?" or "this history" do not.
+
+    Args:
+        query: User's message
+
+    Returns:
+        "greeting", "acknowledgment" or "help", or None for anything else
+    """
+    remainder = ANY_INTENT_PATTERN.sub(" ", query)
+    if remainder == query:
+        return None
+    if any(word.lower() not in FILLER_WORDS for word in WORD_PATTERN.findall(remainder)):
+        return None
+    for intent in INTENT_PRIORITY:
+        if INTENT_PATTERNS[intent].search(query):
+            return intent
+    return None
+
+
+def starts_with_greeting(query: str) -> bool:
+    """Check whether a message opens with a greeting."""
+    return INTENT_PATTERNS["greeting"].match(query.strip()) is not None
+
+
+def get_small_talk_reply(intent: str, category: str, language: str) -> str:
+    """
+    Get the templated reply for a small-talk intent.
+
+    Args:
+        intent: "greeting", "acknowledgment" or "help"
+        category: Legal category
+        language: Response language (English if no template exists)
+
+    Returns:
+        Reply text
+    """
+    replies = SMALL_TALK_REPLIES[intent]
+    return replies.get(language, replies["English"]).format(category=category)
+
+
+def is_self_contained(query: str, min_words: int = 5) -> bool:
+    """
+    Check whether a follow-up question can be understood without the
+    earlier turns, so it doesn't need rewriting into a standalone question.
+
+    Short questions ("and for women?") and questions with back-references
+    ("what about under the new law?", "what is the punishment for it?") are
+    not self-contained.
+
+    Args:
+        query: User's question
+        min_words: Minimum number of words
+
+    Returns:
+        True if the question stands on its own
+    """
+    return len(WORD_PATTERN.findall(query)) >= min_words and not FOLLOW_UP_PATTERN.search(query)
@@ -0,0 +1,138 @@
+import json
+import math
+import os
+import re
+from collections import Counter
+from typing import List, Tuple
+
+import numpy as np
+
+HEADER_FILE = "lexical.json"
+VOCAB_FILE = "lexical_vocab.txt"
+OFFSETS_FILE = "lexical_offsets.npy"
+DOCS_FILE = "lexical_docs.npy"
+TFS_FILE = "lexical_tfs.npy"
+LENGTHS_FILE = "lexical_lengths.npy"
+INDEX_FILES = [HEADER_FILE, VOCAB_FILE, OFFSETS_FILE, DOCS_FILE, TFS_FILE, LENGTHS_FILE]
+
+# BM25 parameters
+K1 = 1.5
+B = 0.75
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Very common English words; numbers and short legal tokens ("21", "a") are
+# kept because citations depend on them
+STOPWORDS = {
+    "the", "of", "and", "to", "in", "is", "or", "for", "by", "on", "be", "as",
+    "with", "any", "such", "that", "shall", "this", "which", "an", "are", "it",
+    "from", "at", "under", "was", "has", "have", "been", "not", "who", "what",
+    "how", "can", "i", "my", "me", "do", "does", "if", "there", "their",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word and number tokens, without stopwords."""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def write_lexical_index(path: str, texts: List[str]):
+    """
+    Build a BM25 inverted index over chunk texts and save it.
+
+    Postings are stored term by term in flat arrays: uint32 chunk positions
+    and uint16 term frequencies, with int64 offsets per term into them. The
+    sorted vocabulary is a text file, one term per line.
+
+    Args:
+        path: Directory to write to (the vector store's directory)
+        texts: Chunk texts in vector position order
+    """
+    postings = {}
+    lengths = np.zeros(len(texts), dtype=np.uint32)
+    for position, text in enumerate(texts):
+        tokens = tokenize(text)
+        lengths[position] = len(tokens)
+        for term, tf in Counter(tokens).items():
+            postings.setdefault(term, []).append((position, tf))
+
+    vocab = sorted(postings)
+    offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+    for i, term in enumerate(vocab):
+        offsets[i + 1] = offsets[i] + len(postings[term])
+    docs = np.empty(offsets[-1], dtype=np.uint32)
+    tfs = np.empty(offsets[-1], dtype=np.uint16)
+    for i, term in enumerate(vocab):
+        term_postings = np.array(postings[term], dtype=np.int64)
+        docs[offsets[i]:offsets[i + 1]] = term_postings[:, 0]
+        tfs[offsets[i]:offsets[i + 1]] = np.minimum(term_postings[:, 1], np.iinfo(np.uint16).max)
+
+    with open(os.path.join(path, VOCAB_FILE + ".tmp"), "w", encoding="utf-8") as f:
+        f.write("\n".join(vocab))
+    for name, array in [(OFFSETS_FILE, offsets), (DOCS_FILE, docs), (TFS_FILE, tfs), (LENGTHS_FILE, lengths)]:
+        with open(os.path.join(path, name + ".tmp"), "wb") as f:
+            np.save(f, array)
+    with open(os.path.join(path, HEADER_FILE + ".tmp"), "w", encoding="utf-8") as f:
+        json.dump({"count": len(texts), "average_length": float(lengths.mean()) if len(texts) else 0.0}, f)
+
+    for name in [VOCAB_FILE, OFFSETS_FILE, DOCS_FILE, TFS_FILE, LENGTHS_FILE, HEADER_FILE]:
+        os.replace(os.path.join(path, name + ".tmp"), os.path.join(path, name))
+
+
+def has_lexical_index(path: str) -> bool:
+    """Check whether a store directory has a lexical index."""
+    return os.path.exists(os.path.join(path, HEADER_FILE))
+
+
+class LexicalIndex:
+    """
+    Read-only BM25 index written by write_lexical_index. Postings are
+    memory-mapped; only the vocabulary is loaded into memory.
+    """
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, HEADER_FILE), encoding="utf-8") as f:
+            header = json.load(f)
+        self.count = header["count"]
+        self.average_length = header["average_length"] or 1.0
+        with open(os.path.join(path, VOCAB_FILE), encoding="utf-8") as f:
+            self.term_ids = {term: i for i, term in enumerate(f.read().split("\n")) if term}
+
+        # Empty files can't be mapped
+        mmap_mode = "r" if self.term_ids else None
+        self.offsets = np.load(os.path.join(path, OFFSETS_FILE), mmap_mode=mmap_mode)
+        self.docs = np.load(os.path.join(path, DOCS_FILE), mmap_mode=mmap_mode)
+        self.tfs = np.load(os.path.join(path, TFS_FILE), mmap_mode=mmap_mode)
+        self.lengths = np.load(os.path.join(path, LENGTHS_FILE), mmap_mode="r" if self.count else None)
+
+    def search(self, query: str, k: int) -> List[Tuple[int, float]]:
+        """
+        Rank chunks against a query with BM25.
+
+        Args:
+            query: Query text
+            k: Number of results
+
+        Returns:
+            (vector position, score) pairs, best first
+        """
+        positions = []
+        scores = []
+        for term in set(tokenize(query)):
+            term_id = self.term_ids.get(term)
+            if term_id is None:
+                continue
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            docs = np.asarray(self.docs[start:end])
+            tfs = np.asarray(self.tfs[start:end], dtype=np.float32)
+            idf = math.log(1 + (self.count - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = K1 * (1 - B + B * np.asarray(self.lengths[docs], dtype=np.float32) / self.average_length)
+            positions.append(docs)
+            scores.append(idf * tfs * (K1 + 1) / (tfs + norm))
+        if not positions:
+            return []
+
+        totals = np.bincount(np.concatenate(positions), weights=np.concatenate(scores))
+        candidates = np.flatnonzero(totals)
+        top = candidates[np.argsort(-totals[candidates], kind="stable")[:k]]
+        return [(int(position), float(totals[position])) for position in top]
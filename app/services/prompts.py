@@ -0,0 +1,118 @@
+from langchain_core.prompts import PromptTemplate
+
+# How answers should read, shared by the single-pass QA prompt and the
+# optional rewrite pass
+ANSWER_STYLE_GUIDELINES = """- Keep a friendly, conversational tone
+- Use bullet points only for lists or when it helps clarify multiple points
+- Use simple language where possible while keeping legal terms when necessary
+- Keep paragraphs short
+- Do not add disclaimers or unnecessary statements"""
+
+# Fixed translations of common legal terms, so answers written directly in
+# another language use the same terminology every time
+LEGAL_GLOSSARY = {
+    "FIR (First Information Report)": {"Hindi": "प्रथम सूचना रिपोर्ट (FIR)", "Marathi": "प्रथम खबरी अहवाल (FIR)"},
+    "bail": {"Hindi": "जमानत", "Marathi": "जामीन"},
+    "cognizable offence": {"Hindi": "संज्ञेय अपराध", "Marathi": "दखलपात्र गुन्हा"},
+    "non-cognizable offence": {"Hindi": "असंज्ञेय अपराध", "Marathi": "अदखलपात्र गुन्हा"},
+    "accused": {"Hindi": "अभियुक्त", "Marathi": "आरोपी"},
+    "complainant": {"Hindi": "शिकायतकर्ता", "Marathi": "तक्रारदार"},
+    "punishment": {"Hindi": "सज़ा", "Marathi": "शिक्षा"},
+    "imprisonment": {"Hindi": "कारावास", "Marathi": "कारावास"},
+    "fine": {"Hindi": "जुर्माना", "Marathi": "दंड"},
+    "section": {"Hindi": "धारा", "Marathi": "कलम"},
+    "article": {"Hindi": "अनुच्छेद", "Marathi": "अनुच्छेद"},
+    "Indian Penal Code": {"Hindi": "भारतीय दंड संहिता", "Marathi": "भारतीय दंड संहिता"},
+    "Constitution of India": {"Hindi": "भारत का संविधान", "Marathi": "भारताचे संविधान"},
+    "fundamental rights": {"Hindi": "मौलिक अधिकार", "Marathi": "मूलभूत हक्क"},
+    "Supreme Court": {"Hindi": "सर्वोच्च न्यायालय", "Marathi": "सर्वोच्च न्यायालय"},
+    "High Court": {"Hindi": "उच्च न्यायालय", "Marathi": "उच्च न्यायालय"},
+    "magistrate": {"Hindi": "मजिस्ट्रेट", "Marathi": "दंडाधिकारी"},
+    "police station": {"Hindi": "पुलिस थाना", "Marathi": "पोलीस ठाणे"},
+    "lawyer": {"Hindi": "वकील", "Marathi": "वकील"},
+    "free legal aid": {"Hindi": "निःशुल्क विधिक सहायता", "Marathi": "मोफत कायदेशीर मदत"},
+    "petition": {"Hindi": "याचिका", "Marathi": "याचिका"},
+    "affidavit": {"Hindi": "शपथपत्र", "Marathi": "प्रतिज्ञापत्र"},
+    "divorce": {"Hindi": "तलाक", "Marathi": "घटस्फोट"},
+    "maintenance": {"Hindi": "भरण-पोषण", "Marathi": "पोटगी"},
+    "will": {"Hindi": "वसीयत", "Marathi": "मृत्युपत्र"},
+    "consumer court": {"Hindi": "उपभोक्ता न्यायालय", "Marathi": "ग्राहक न्यायालय"},
+}
+
+
+def answer_language_instructions(language: str) -> str:
+    """
+    Instructions that make the QA prompt answer directly in a language.
+
+    Args:
+        language: Response language
+
+    Returns:
+        Prompt text, empty for English
+    """
+    if language == "English":
+        return ""
+    terms = "\n".join(
+        f"- {term}: {translations[language]}"
+        for term, translations in LEGAL_GLOSSARY.items()
+        if language in translations
+    )
+    instructions = (
+        f"Write the whole answer in {language}, even though the context is in English. "
+        "Keep section, article and rule numbers exactly as in the context."
+    )
+    if terms:
+        instructions += f"\nUse these {language} terms for legal concepts:\n{terms}"
+    return instructions
+
+
+# QA prompt of the retrieval chain in single-pass ANSWER_MODE: the answer is
+# written in its final style (and language) straight away
+QA_PROMPT = PromptTemplate.from_template(
+    """You are a legal assistant helping people understand Indian law. Use the following pieces of context to answer the question at the end. If you don't know the answer, just say that you don't know, don't try to make up an answer.
+
+{context}
+
+Write the answer following these guidelines:
+""" + ANSWER_STYLE_GUIDELINES + """
+
+{language_instructions}
+
+Question: {question}
+Helpful Answer:"""
+)
+
+# Each context document is labelled with its source file, so structured
+# answers can name the sources they used
+SOURCE_DOCUMENT_PROMPT = PromptTemplate.from_template("[Source: {source}]\n{page_content}")
+
+# QA prompt of ANSWER_MODE "structured": one generation returns the answer,
+# follow-up questions and the sources used as a JSON object
+STRUCTURED_QA_PROMPT = PromptTemplate.from_template(
+    """You are a legal assistant helping people understand Indian law. Use the following pieces of context to answer the question at the end. If you don't know the answer, just say that you don't know, don't try to make up an answer.
+
+{context}
+
+Write the answer following these guidelines:
+""" + ANSWER_STYLE_GUIDELINES + """
+
+{language_instructions}
+
+Question: {question}
+
+Respond with only a JSON object, with the "answer" key first:
+{{"answer": "<the answer>", "suggested_questions": ["<three short follow-up questions the user might ask next, in the language of the answer>"], "sources_used": ["<source file names of the context you used>"]}}"""
+)
+
+# Folds turns that have left the session memory window into its running summary
+SESSION_SUMMARY_PROMPT = PromptTemplate.from_template(
+    """Progressively summarize a conversation between a user and a legal assistant about Indian law, adding the new lines to the current summary. Keep the facts of the user's situation, the legal topics discussed and any sections, articles or acts mentioned. Use at most {max_words} words and return only the new summary.
+
+Current summary:
+{summary}
+
+New lines of conversation:
+{new_lines}
+
+New summary:"""
+)
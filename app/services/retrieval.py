@@ -0,0 +1,120 @@
+import asyncio
+import re
+from typing import Any, Dict, List
+
+import numpy as np
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from app.utils.concurrency import run_blocking
+
+# Category hint that chat prefixes onto queries; it only adds noise to
+# keyword matching
+CATEGORY_PREFIX_PATTERN = re.compile(r"^\s*\[Category:[^\]]*\]\s*")
+
+
+def reciprocal_rank_fusion(rankings: List[List[int]], rrf_k: int) -> Dict[int, float]:
+    """
+    Merge rankings with reciprocal rank fusion.
+
+    Args:
+        rankings: Lists of ids, best first
+        rrf_k: Rank offset; larger values flatten the weight of top ranks
+
+    Returns:
+        Dictionary of id to fused score
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (rrf_k + rank + 1)
+    return scores
+
+
+def documents_at(vector_store, positions: List[int]) -> List[Document]:
+    """Chunks of a FAISS store at the given vector positions, in order."""
+    docs = []
+    for position in positions:
+        doc = vector_store.docstore.search(vector_store.index_to_docstore_id[position])
+        if isinstance(doc, Document):
+            docs.append(doc)
+    return docs
+
+
+class VectorRetriever(BaseRetriever):
+    """
+    Plain vector search retriever whose async searches go through a
+    RetrievalBatcher, so concurrent requests share embedding calls and
+    index scans.
+    """
+
+    vector_store: Any
+    batcher: Any
+    k: int = 4
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        embedding = self.vector_store.embedding_function.embed_query(query)
+        _, positions = self.vector_store.index.search(np.array([embedding], dtype=np.float32), self.k)
+        return documents_at(self.vector_store, [int(p) for p in positions[0] if p >= 0])
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        positions = await self.batcher.search(self.vector_store, query, self.k)
+        return documents_at(self.vector_store, positions)
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Retriever that runs BM25 keyword search alongside FAISS vector search
+    and merges both rankings with reciprocal rank fusion, so exact terms
+    like section numbers are matched as well as meaning. With a batcher,
+    async vector searches are batched with those of concurrent requests.
+    """
+
+    vector_store: Any
+    lexical_index: Any
+    k: int = 4
+    candidates: int = 20
+    rrf_k: int = 60
+    batcher: Any = None
+
+    def _vector_positions(self, embedding: List[float]) -> List[int]:
+        _, positions = self.vector_store.index.search(np.array([embedding], dtype=np.float32), self.candidates)
+        return [int(p) for p in positions[0] if p >= 0]
+
+    def _lexical_positions(self, query: str) -> List[int]:
+        keywords = CATEGORY_PREFIX_PATTERN.sub("", query)
+        return [position for position, _ in self.lexical_index.search(keywords, self.candidates)]
+
+    def _fuse(self, vector_positions: List[int], lexical_positions: List[int]) -> List[Document]:
+        scores = reciprocal_rank_fusion([vector_positions, lexical_positions], self.rrf_k)
+        top = sorted(scores, key=scores.get, reverse=True)[:self.k]
+        return documents_at(self.vector_store, top)
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        embedding = self.vector_store.embedding_function.embed_query(query)
+        return self._fuse(self._vector_positions(embedding), self._lexical_positions(query))
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        if self.batcher is not None:
+            vector_positions, lexical_positions = await asyncio.gather(
+                self.batcher.search(self.vector_store, query, self.candidates),
+                run_blocking(self._lexical_positions, query)
+            )
+            return self._fuse(vector_positions, lexical_positions)
+        
+        # Keyword search runs while the query is being embedded
+        embedding, lexical_positions = await asyncio.gather(
+            self.vector_store.embedding_function.aembed_query(query),
+            run_blocking(self._lexical_positions, query)
+        )
+        vector_positions = await run_blocking(self._vector_positions, embedding)
+        return self._fuse(vector_positions, lexical_positions)
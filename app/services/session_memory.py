@@ -0,0 +1,250 @@
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.database import redis_client
+from app.dependencies import SessionMemory, get_condense_llm, get_conversation_memory
+from app.services.prompts import SESSION_SUMMARY_PROMPT
+
+
+def memory_turns(memory: SessionMemory) -> List[List[str]]:
+    """
+    Get the (question, answer) turns held by a session's memory.
+
+    Args:
+        memory: Conversation memory
+
+    Returns:
+        [question, answer] pairs, oldest first
+    """
+    turns = []
+    question = None
+    for message in memory.chat_memory.messages:
+        if message.type == "human":
+            question = message.content
+        elif message.type == "ai" and question is not None:
+            turns.append([question, message.content])
+            question = None
+    return turns
+
+
+def format_turns(turns: List[List[str]]) -> str:
+    """Format turns as conversation lines for the summary prompt."""
+    return "\n".join(f"User: {question}\nAssistant: {answer}" for question, answer in turns)
+
+
+class InMemorySessionStore:
+    """Process-local session state with TTL and LRU eviction."""
+
+    def __init__(self, max_sessions: int, ttl: int):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        # session key -> (state, expires_at)
+        self._sessions: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._sessions.get(key)
+            if entry is None:
+                return None
+            if entry[1] < time.time():
+                del self._sessions[key]
+                return None
+            self._sessions.move_to_end(key)
+            return entry[0]
+
+    async def set(self, key: str, state: Dict):
+        with self._lock:
+            self._sessions[key] = (state, time.time() + self.ttl)
+            self._sessions.move_to_end(key)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+
+class RedisSessionStore:
+    """Redis-backed session state shared by all workers; entries expire by TTL."""
+
+    def __init__(self, client, ttl: int):
+        self.client = client
+        self.ttl = ttl
+
+    async def get(self, key: str) -> Optional[Dict]:
+        value = await self.client.get(f"session:{key}")
+        return json.loads(value) if value else None
+
+    async def set(self, key: str, state: Dict):
+        await self.client.set(f"session:{key}", json.dumps(state), ex=self.ttl)
+
+
+def session_key(owner: str, session_id: str) -> str:
+    """Store key of a session: the same session_id of another owner is another session."""
+    return f"{owner}|{session_id}"
+
+
+class SessionStore:
+    """
+    Server-side conversation memory, so clients only send the new query.
+
+    Sessions are keyed by owner and session_id (see session_key), and a
+    stored state is only used if its recorded owner matches the caller, so
+    guessing or reusing another caller's session_id yields an empty memory.
+
+    Each session keeps its last `turns` turns verbatim and a running summary
+    of older ones. Turns that leave the window are queued as "pending" and
+    folded into the summary in the background by CONDENSE_MODEL, so the
+    summary call never adds to response time.
+
+    State is a dictionary {"owner": str, "turns": [[question, answer], ...],
+    "pending": [[question, answer], ...], "summary": str}.
+    """
+
+    def __init__(self, backend, turns: int, summary_max_words: int = 150):
+        self.backend = backend
+        self.turns = turns
+        self.summary_max_words = summary_max_words
+        self._summarizing = set()
+        self._tasks = set()
+
+    async def _get(self, owner: str, session_id: str) -> Optional[Dict]:
+        try:
+            state = await asyncio.wait_for(
+                self.backend.get(session_key(owner, session_id)), timeout=settings.STAGE_TIMEOUTS["session"]
+            )
+        except Exception as e:
+            print(f"Error loading session {session_id}: {str(e)}")
+            return None
+        if state is not None and state.get("owner") != owner:
+            print(f"Ignoring stored session {session_id}: owner doesn't match")
+            return None
+        return state
+
+    async def _set(self, owner: str, session_id: str, state: Dict):
+        try:
+            await asyncio.wait_for(
+                self.backend.set(session_key(owner, session_id), {**state, "owner": owner}),
+                timeout=settings.STAGE_TIMEOUTS["session"]
+            )
+        except Exception as e:
+            print(f"Error saving session {session_id}: {str(e)}")
+
+    async def load(self, session_id: str, owner: str,
+                   messages: Optional[List[Dict[str, Any]]] = None) -> SessionMemory:
+        """
+        Get a session's conversation memory.
+
+        Args:
+            session_id: Unique session identifier
+            owner: Caller the session belongs to: "user:<id>" for signed-in
+                users, "ip:<address>" for anonymous callers
+            messages: Message history sent by the client; only used for
+                sessions the store doesn't know (older clients, expired sessions)
+
+        Returns:
+            Memory holding the session's recent turns and summary
+        """
+        memory = get_conversation_memory(session_id, owner)
+        state = await self._get(owner, session_id)
+        if state:
+            for question, answer in state.get("turns", []):
+                memory.chat_memory.add_user_message(question)
+                memory.chat_memory.add_ai_message(answer)
+            memory.summary = state.get("summary", "")
+        elif messages:
+            for msg in messages:
+                if msg['role'] == 'user':
+                    memory.chat_memory.add_user_message(msg['content'])
+                elif msg['role'] == 'assistant':
+                    memory.chat_memory.add_ai_message(msg['content'])
+        return memory
+
+    async def save(self, memory: SessionMemory):
+        """
+        Store a session's memory after a response. Turns beyond the window
+        are queued for the summary.
+
+        Args:
+            memory: Conversation memory returned by load()
+        """
+        turns = memory_turns(memory)
+        keep = turns[-self.turns:] if self.turns > 0 else []
+        evicted = turns[:len(turns) - len(keep)]
+
+        # Re-read the state: a background summary may have finished meanwhile
+        state = await self._get(memory.owner, memory.session_id) or {}
+        if keep == state.get("turns") and not evicted:
+            return
+        pending = state.get("pending", []) + evicted
+        await self._set(memory.owner, memory.session_id, {
+            "turns": keep,
+            "pending": pending,
+            "summary": state.get("summary", memory.summary)
+        })
+        key = session_key(memory.owner, memory.session_id)
+        if pending and key not in self._summarizing:
+            # Hold a reference so the task isn't garbage collected mid-run
+            task = asyncio.ensure_future(self._summarize(memory.owner, memory.session_id))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _summarize(self, owner: str, session_id: str):
+        """Fold a session's pending turns into its summary until none are left."""
+        key = session_key(owner, session_id)
+        self._summarizing.add(key)
+        try:
+            while True:
+                state = await self._get(owner, session_id)
+                pending = state.get("pending") if state else None
+                if not pending:
+                    return
+                summary = await self.summarize(state.get("summary", ""), pending)
+
+                # Turns may have been queued while the summary was written
+                state = await self._get(owner, session_id) or state
+                state["summary"] = summary
+                state["pending"] = state.get("pending", [])[len(pending):]
+                await self._set(owner, session_id, state)
+        finally:
+            self._summarizing.discard(key)
+
+    async def summarize(self, summary: str, turns: List[List[str]]) -> str:
+        """
+        Add turns to a running summary.
+
+        Args:
+            summary: Current summary (may be empty)
+            turns: [question, answer] pairs to add
+
+        Returns:
+            New summary. If the model fails, the questions are appended to
+            the old summary, keeping its last summary_max_words words.
+        """
+        prompt = SESSION_SUMMARY_PROMPT.format(
+            summary=summary or "(none)",
+            new_lines=format_turns(turns),
+            max_words=self.summary_max_words
+        )
+        try:
+            result = await asyncio.wait_for(
+                get_condense_llm().ainvoke(prompt), timeout=settings.STAGE_TIMEOUTS["summary"]
+            )
+            return result.content.strip()
+        except Exception as e:
+            print(f"Error summarizing session: {str(e)}")
+            words = " ".join([summary] + [f"User asked: {question}" for question, _ in turns]).split()
+            return " ".join(words[-self.summary_max_words:])
+
+
+@lru_cache
+def get_session_store() -> SessionStore:
+    """Get the process-wide session store (Redis if configured, otherwise in-process)."""
+    if redis_client is not None:
+        backend = RedisSessionStore(redis_client, settings.SESSION_TTL_SECONDS)
+    else:
+        backend = InMemorySessionStore(settings.SESSION_MEMORY_SIZE, settings.SESSION_TTL_SECONDS)
+    return SessionStore(backend, settings.SESSION_MEMORY_TURNS, settings.SESSION_SUMMARY_MAX_WORDS)
@@ -0,0 +1,293 @@
+import bisect
+import json
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from app.config import settings
+
+INDEX_FILE = "statutes.json"
+
+# Provision headings as they appear in the bare acts: "420. Cheating and
+# dishonestly inducing delivery of property.—Whoever ...", optionally behind
+# an amendment footnote marker ("1[21A. Right to education.—"). The title may
+# wrap over a couple of lines; tables of contents don't match because their
+# entries have no dash.
+HEADING_PATTERN = re.compile(
+    r"^[ \t]*(?:\d{1,2}\s*\[\s*)?(\d{1,3}[A-Z]{0,3})\.\s*\[?\s*"
+    r"([\"“‘'(\[]?[A-Z][^—\n]*(?:\n[^—\n]*){0,2}?)\s*\.?\s*[—–]",
+    re.MULTILINE
+)
+
+NUMBER = r"\d{1,3}[A-Za-z]{0,2}"
+UNITS = {"section": "section", "sections": "section", "sec": "section", "secs": "section", "s": "section",
+         "article": "article", "articles": "article", "art": "article", "arts": "article",
+         "rule": "rule", "rules": "rule"}
+
+# "Section 420", "s. 420", "Articles 14 and 21", "Rule 3"
+CITATION_PATTERN = re.compile(
+    rf"\b(sections?|secs?\.?|s\.|articles?|arts?\.?|rules?)\s*({NUMBER}(?:\s*(?:,|and|&)\s*{NUMBER})*)\b",
+    re.IGNORECASE
+)
+
+
+def compile_aliases(aliases: List[str]) -> re.Pattern:
+    """Case-insensitive whole-word pattern matching any of an act's names."""
+    return re.compile(r"\b(?:" + "|".join(re.escape(alias) for alias in aliases) + r")\b", re.IGNORECASE)
+
+
+STATUTE_ALIASES = {source: compile_aliases(statute["aliases"]) for source, statute in settings.STATUTES.items()}
+
+# Names of acts, indexed or not: the indexed acts' aliases, common acronyms
+# of acts that aren't indexed ("CrPC", "NI Act") and "... Act" / "... Code"
+UNINDEXED_ACT_ACRONYMS = [
+    "crpc", "cr.p.c.", "cr.p.c", "cr pc", "cpc", "c.p.c.", "c.p.c", "ni act", "n.i. act", "it act",
+    "i.t. act", "bns", "bnss", "bsa", "iea", "hma", "ndps", "pocso", "mv act", "rti act", "dv act",
+    "posh act", "sarfaesi", "ibc", "gst act", "fema", "pmla", "uapa", "rera", "evidence act",
+]
+ACT_REFERENCE_PATTERN = re.compile(
+    r"(?<![\w.])(?:"
+    + "|".join(
+        re.escape(alias)
+        for alias in sorted(
+            [a for statute in settings.STATUTES.values() for a in statute["aliases"]] + UNINDEXED_ACT_ACRONYMS,
+            key=len, reverse=True
+        )
+    )
+    + r")(?![\w])|\b(?:[\w'’&-]+\s+){1,5}?(?:act|code|sanhita|adhiniyam)\b",
+    re.IGNORECASE
+)
+# How far after (or before) a citation its act is looked for
+ACT_WINDOW_AFTER = 60
+ACT_WINDOW_BEFORE = 30
+
+# "420 IPC", "21 of the Constitution"
+SHORT_CITATION_PATTERN = re.compile(
+    rf"\b({NUMBER})\s+(?:of\s+(?:the\s+)?)?("
+    + "|".join(re.escape(alias) for statute in settings.STATUTES.values() for alias in statute["aliases"])
+    + r")\b",
+    re.IGNORECASE
+)
+
+
+def number_key(number: str) -> Tuple[int, str]:
+    """Sort key of a provision number ("21A" -> (21, "A"))."""
+    digits = re.match(r"\d+", number).group()
+    return int(digits), number[len(digits):]
+
+
+def longest_increasing(keys: List[Tuple[int, str]]) -> List[int]:
+    """Indexes of a longest strictly increasing subsequence of keys."""
+    tails = []
+    tail_indexes = []
+    previous = [-1] * len(keys)
+    for i, key in enumerate(keys):
+        position = bisect.bisect_left(tails, key)
+        if position == len(tails):
+            tails.append(key)
+            tail_indexes.append(i)
+        else:
+            tails[position] = key
+            tail_indexes[position] = i
+        previous[i] = tail_indexes[position - 1] if position else -1
+
+    indexes = []
+    i = tail_indexes[-1] if tail_indexes else -1
+    while i >= 0:
+        indexes.append(i)
+        i = previous[i]
+    return indexes[::-1]
+
+
+def parse_provisions(pages: List[Document]) -> List[dict]:
+    """
+    Split a statute into its numbered provisions.
+
+    Headings are matched anywhere, then the longest run of them in ascending
+    number order is kept: that is the body of the act, while footnotes,
+    tables and schedules that restart their numbering fall out.
+
+    Args:
+        pages: Page documents of one statute, in page order
+
+    Returns:
+        List of {"number", "title", "page", "text"} dictionaries
+    """
+    texts = [page.page_content for page in pages]
+    page_starts = []
+    offset = 0
+    for text in texts:
+        page_starts.append(offset)
+        offset += len(text) + 1
+    full_text = "\n".join(texts)
+
+    matches = list(HEADING_PATTERN.finditer(full_text))
+    headings = [matches[i] for i in longest_increasing([number_key(match.group(1)) for match in matches])]
+
+    provisions = []
+    for i, match in enumerate(headings):
+        end = headings[i + 1].start() if i + 1 < len(headings) else len(full_text)
+        page_index = bisect.bisect_right(page_starts, match.start()) - 1
+        provisions.append({
+            "number": match.group(1),
+            "title": " ".join(match.group(2).split()).rstrip(" ."),
+            "page": pages[page_index].metadata.get("page", page_index),
+            "text": full_text[match.start():end][:settings.STATUTE_MAX_CHARS].strip()
+        })
+    return provisions
+
+
+def write_statute_index(path: str, provisions: Dict[str, List[dict]]):
+    """
+    Save the provisions of each statute next to the vector store.
+
+    Args:
+        path: Directory to save to (a version directory of the vector store)
+        provisions: Dictionary of source file name to parsed provisions
+    """
+    os.makedirs(path, exist_ok=True)
+    index_path = os.path.join(path, INDEX_FILE)
+    with open(index_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(provisions, f)
+    os.replace(index_path + ".tmp", index_path)
+
+
+def read_statute_provisions(path: str) -> Dict[str, List[dict]]:
+    """Provisions saved by write_statute_index, or {} if there are none."""
+    index_path = os.path.join(path, INDEX_FILE)
+    if not os.path.exists(index_path):
+        return {}
+    with open(index_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def act_of_reference(reference: str) -> str:
+    """Source file of the indexed act a reference names, or "" if it names an act that isn't indexed."""
+    for source, pattern in STATUTE_ALIASES.items():
+        if pattern.search(reference):
+            return source
+    return ""
+
+
+def find_citations(query: str) -> List[Tuple[Optional[str], str, Optional[str]]]:
+    """
+    Find provision citations in a query, with the act each one names.
+
+    A citation's act is the first act reference in the text that follows it
+    (up to the next citation), as in "Section 420 IPC" or "Section 138 of
+    the Negotiable Instruments Act", or else the last one just before it
+    ("under the CrPC, section 438").
+
+    Args:
+        query: User's question
+
+    Returns:
+        (unit, number, act) triples in query order. unit is "section",
+        "article", "rule", or None for short forms like "420 IPC"; act is
+        the source file of an indexed act, "" for an act that isn't indexed,
+        or None if the citation names no act
+    """
+    matches = []
+    for match in CITATION_PATTERN.finditer(query):
+        unit = UNITS[match.group(1).lower().rstrip(".")]
+        matches.append((match.start(), match.end(), unit, re.findall(NUMBER, match.group(2))))
+    for match in SHORT_CITATION_PATTERN.finditer(query):
+        if not any(start <= match.start() < end for start, end, _, _ in matches):
+            matches.append((match.start(), match.end(), None, [match.group(1)]))
+    matches.sort()
+
+    citations = []
+    for i, (start, end, unit, numbers) in enumerate(matches):
+        next_start = matches[i + 1][0] if i + 1 < len(matches) else len(query)
+        previous_end = matches[i - 1][1] if i > 0 else 0
+        after = ACT_REFERENCE_PATTERN.search(query[start:min(next_start, end + ACT_WINDOW_AFTER)])
+        before = list(ACT_REFERENCE_PATTERN.finditer(query[max(previous_end, start - ACT_WINDOW_BEFORE):start]))
+        reference = after or (before[-1] if before else None)
+        act = act_of_reference(reference.group()) if reference else None
+        for number in numbers:
+            citations.append((unit, number.upper(), act))
+
+    unique = []
+    for citation in citations:
+        if citation[1] not in [number for _, number, _ in unique]:
+            unique.append(citation)
+    return unique
+
+
+class StatuteIndex:
+    """Exact lookup of statute provisions by (act, provision number)."""
+
+    def __init__(self, provisions: Dict[str, List[dict]]):
+        self.provisions = {
+            (source, provision["number"]): provision
+            for source, items in provisions.items()
+            for provision in items
+        }
+        self.sources = set(provisions)
+
+    def __len__(self):
+        return len(self.provisions)
+
+    def document(self, source: str, number: str) -> Optional[Document]:
+        """A provision as a document, like a retrieved chunk."""
+        provision = self.provisions.get((source, number))
+        if provision is None:
+            return None
+        statute = settings.STATUTES[source]
+        return Document(
+            page_content=f"{statute['name']}, {statute['unit'].title()} {number}\n{provision['text']}",
+            metadata={
+                "source": source,
+                "page": provision["page"],
+                "act": statute["name"],
+                statute["unit"]: number
+            }
+        )
+
+    def lookup(self, query: str, category: str, limit: int = 4) -> List[Document]:
+        """
+        Get the provisions a query cites.
+
+        The act is the one the citation names, else one named elsewhere in
+        the query, else found from the kind of provision cited (articles
+        are in the Constitution), preferring the chat's category when
+        several acts qualify. Citations that still match more than one act
+        are ignored. If any citation names an act that isn't indexed
+        ("Section 438 CrPC"), nothing is returned, so the question goes
+        through normal retrieval instead of being answered from a different
+        act's provision with the same number.
+
+        Args:
+            query: User's question
+            category: Legal category of the chat
+            limit: Maximum number of provisions
+
+        Returns:
+            Provision documents; empty if the query cites none that are
+            indexed, or cites an act that isn't
+        """
+        citations = find_citations(query)
+        if not citations or any(act == "" for _, _, act in citations):
+            return []
+        named = [
+            source for source, pattern in STATUTE_ALIASES.items()
+            if source in self.sources and pattern.search(query)
+        ]
+
+        documents = []
+        for unit, number, act in citations:
+            candidates = [act] if act else named or [
+                source for source in self.sources
+                if source in settings.STATUTES and unit in (None, settings.STATUTES[source]["unit"])
+            ]
+            matches = [source for source in candidates if (source, number) in self.provisions]
+            if len(matches) > 1:
+                in_category = [source for source in matches if source in settings.CATEGORY_SOURCES.get(category, [])]
+                matches = in_category or matches
+            if len(matches) == 1:
+                documents.append(self.document(matches[0], number))
+            if len(documents) == limit:
+                break
+        return documents
@@ -0,0 +1,159 @@
+import json
+import re
+from typing import List
+
+from pydantic import ValidationError
+
+from app.models.schemas import ChatResponse
+
+ANSWER_KEY_PATTERN = re.compile(r'"answer"\s*:\s*"')
+FENCE_PATTERN = re.compile(r"```(?:json)?", re.IGNORECASE)
+TRAILING_COMMA_PATTERN = re.compile(r",\s*([}\]])")
+JSON_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+MAX_SUGGESTED_QUESTIONS = 3
+
+
+class AnswerStreamParser:
+    """
+    Incrementally extracts the "answer" string from JSON output as it is
+    streamed, so the answer can be shown before the whole object (follow-up
+    questions, sources) has been generated.
+
+    Text before the "answer" key (code fences, preambles) is skipped, and
+    escapes split across chunks are held back until complete.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.position = None  # Where decoding of the answer string resumes
+        self.done = False
+
+    @property
+    def started(self) -> bool:
+        return self.position is not None
+
+    def feed(self, chunk: str) -> str:
+        """
+        Add a chunk of output.
+
+        Args:
+            chunk: Next piece of the generated text
+
+        Returns:
+            Newly decoded answer text (may be empty)
+        """
+        self.buffer += chunk
+        if self.done:
+            return ""
+        if self.position is None:
+            match = ANSWER_KEY_PATTERN.search(self.buffer)
+            if not match:
+                return ""
+            self.position = match.end()
+
+        decoded = []
+        i = self.position
+        while i < len(self.buffer):
+            ch = self.buffer[i]
+            if ch == '"':
+                self.done = True
+                i += 1
+                break
+            if ch != "\\":
+                decoded.append(ch)
+                i += 1
+                continue
+            if i + 1 >= len(self.buffer):
+                break
+            escape = self.buffer[i + 1]
+            if escape != "u":
+                decoded.append(JSON_ESCAPES.get(escape, escape))
+                i += 2
+                continue
+            # \uXXXX, or a surrogate pair \uXXXX\uXXXX
+            if i + 6 > len(self.buffer):
+                break
+            try:
+                code = int(self.buffer[i + 2:i + 6], 16)
+            except ValueError:
+                decoded.append(self.buffer[i + 2:i + 6])
+                i += 6
+                continue
+            if 0xD800 <= code < 0xDC00:
+                if i + 12 > len(self.buffer):
+                    break
+                try:
+                    low = int(self.buffer[i + 8:i + 12], 16)
+                    decoded.append(chr(0x10000 + ((code - 0xD800) << 10) + (low - 0xDC00)))
+                    i += 12
+                    continue
+                except ValueError:
+                    pass
+            decoded.append(chr(code))
+            i += 6
+        self.position = i
+        return "".join(decoded)
+
+
+def parse_structured_output(text: str) -> dict:
+    """
+    Parse the JSON object of a structured answer, tolerating code fences,
+    text around the object, trailing commas and raw newlines in strings.
+
+    Output that isn't a JSON object (e.g. cut off by the token limit) is
+    salvaged: the answer string is decoded as far as it goes, or the whole
+    text is taken as the answer.
+
+    Args:
+        text: Generated text
+
+    Returns:
+        Dictionary with at least an "answer" key
+    """
+    cleaned = FENCE_PATTERN.sub("", text).strip()
+    start, end = cleaned.find("{"), cleaned.rfind("}")
+    if start != -1 and end > start:
+        candidate = cleaned[start:end + 1]
+        for attempt in (candidate, TRAILING_COMMA_PATTERN.sub(r"\1", candidate)):
+            try:
+                data = json.loads(attempt, strict=False)
+            except ValueError:
+                continue
+            if isinstance(data, dict) and isinstance(data.get("answer"), str) and data["answer"].strip():
+                return data
+
+    parser = AnswerStreamParser()
+    answer = parser.feed(cleaned)
+    return {"answer": answer.strip() if parser.started and answer.strip() else cleaned}
+
+
+def parse_structured_answer(text: str, sources: List[str]) -> ChatResponse:
+    """
+    Turn a structured answer into a ChatResponse, validated against its schema.
+
+    Sources the model says it used are kept only if they were retrieved;
+    if it names none of them, all retrieved sources are listed.
+
+    Args:
+        text: Generated text with the JSON object
+        sources: Source file names of the retrieved documents
+
+    Returns:
+        ChatResponse with answer, sources and suggested_questions
+    """
+    data = parse_structured_output(text)
+    questions = data.get("suggested_questions")
+    if isinstance(questions, list):
+        questions = [q.strip() for q in questions if isinstance(q, str) and q.strip()][:MAX_SUGGESTED_QUESTIONS]
+    used = data.get("sources_used")
+    used = [s for s in used if isinstance(s, str) and s in sources] if isinstance(used, list) else []
+
+    try:
+        return ChatResponse.model_validate({
+            "answer": data["answer"],
+            "sources": list(dict.fromkeys(used)) or sources,
+            "suggested_questions": questions or []
+        })
+    except (ValidationError, TypeError) as e:
+        print(f"Invalid structured answer, keeping the answer only: {str(e)}")
+        return ChatResponse(answer=str(data["answer"]), sources=sources)
@@ -0,0 +1,454 @@
+import asyncio
+import base64
+import fcntl
+import json
+import os
+import re
+import time
+import uuid
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.config import settings
+from app.database import redis_client
+from app.dependencies import embed_query, get_embeddings
+from app.utils.concurrency import run_blocking
+from app.services.translation import translate_text
+
+# Starter questions per category, used until the first background refresh
+SEED_QUESTIONS = {
+    "Know Your Rights": [
+        "What are my rights if I am arrested by the police?",
+        "Can the police search my house without a warrant?",
+        "How do I file an RTI application?",
+        "Am I entitled to free legal aid?",
+        "What can I do if the police refuse to register my FIR?",
+    ],
+    "Criminal Law": [
+        "What is the difference between a bailable and a non-bailable offence?",
+        "How do I apply for anticipatory bail?",
+        "What is the punishment for cheating under the IPC?",
+        "What happens after an FIR is registered?",
+        "Can a criminal case be settled out of court?",
+    ],
+    "Civil Law": [
+        "How do I file a civil suit in India?",
+        "What is the limitation period for filing a civil case?",
+        "How can I recover money lent to someone?",
+        "What is an injunction and when can I get one?",
+        "How long does a civil case usually take?",
+    ],
+    "Family Law": [
+        "What are the grounds for divorce in India?",
+        "How is child custody decided after a divorce?",
+        "Can a wife claim maintenance from her husband?",
+        "How do I register a marriage?",
+        "What are the inheritance rights of daughters?",
+    ],
+    "Cyber Law": [
+        "How do I report a cyber crime?",
+        "What is the punishment for online fraud?",
+        "What can I do if someone hacks my social media account?",
+        "Is sharing someone's photos without consent a crime?",
+        "What protection does the IT Act give against identity theft?",
+    ],
+    "Property Law": [
+        "What documents should I check before buying property?",
+        "How do I transfer property to a family member?",
+        "What are a tenant's rights against eviction?",
+        "How is ancestral property divided among heirs?",
+        "How do I register a sale deed?",
+    ],
+    "Consumer Law": [
+        "How do I file a complaint in a consumer court?",
+        "What can I do if I receive a defective product?",
+        "Can I get compensation for deficient service?",
+        "What is the time limit for filing a consumer complaint?",
+        "Do I need a lawyer to file a consumer complaint?",
+    ],
+    "Corporate Law": [
+        "How do I register a private limited company?",
+        "What are the duties of a company director?",
+        "What annual filings does a company have to make?",
+        "How can a company be wound up?",
+        "What is the difference between an LLP and a private limited company?",
+    ],
+}
+
+
+class QuestionPool:
+    """Suggested questions for one category, with embeddings and translations."""
+
+    def __init__(self, questions: List[str], vectors: Optional[np.ndarray] = None,
+                 translations: Optional[Dict[str, List[str]]] = None):
+        self.questions = questions
+        # Unit-length embeddings aligned with questions, once computed
+        self.vectors = vectors
+        # Language -> translated questions aligned with questions
+        self.translations = translations or {}
+
+    def localized(self, language: str) -> List[str]:
+        """Questions in the given language, falling back to English."""
+        return self.translations.get(language, self.questions)
+
+    def to_dict(self) -> Dict:
+        """Serialize the pool to JSON-compatible data (vectors as base64 float32)."""
+        vectors = None
+        if self.vectors is not None:
+            vectors = base64.b64encode(self.vectors.astype(np.float32).tobytes()).decode("ascii")
+        return {"questions": self.questions, "vectors": vectors, "translations": self.translations}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "QuestionPool":
+        """Rebuild a pool serialized with to_dict."""
+        vectors = None
+        if data.get("vectors"):
+            vectors = np.frombuffer(base64.b64decode(data["vectors"]), dtype=np.float32)
+            vectors = vectors.reshape(len(data["questions"]), -1)
+        return cls(data["questions"], vectors, data.get("translations"))
+
+
+def seed_questions(category: str) -> List[str]:
+    """Starter questions for a category."""
+    return SEED_QUESTIONS.get(category, [
+        f"What are the basics of {category}?",
+        f"What rights do I have under {category} law?",
+        f"What recent developments have occurred in {category} law?"
+    ])
+
+
+# Current pool per category; refreshed pools replace these wholesale
+_pools: Dict[str, QuestionPool] = {
+    category: QuestionPool(seed_questions(category)) for category in settings.LEGAL_CATEGORIES
+}
+_generation = 0  # Generation of the stored pools installed in _pools
+_refresh_task = None
+
+
+def get_question_pool(category: str) -> QuestionPool:
+    """Get the current question pool for a category."""
+    pool = _pools.get(category)
+    if pool is None:
+        pool = _pools[category] = QuestionPool(seed_questions(category))
+    return pool
+
+
+def get_suggested_questions(category: str, language: str = "English", count: int = 3) -> List[str]:
+    """
+    Get general suggested questions for a category, without any LLM call.
+
+    Args:
+        category: Legal category
+        language: Response language
+        count: Number of questions
+
+    Returns:
+        List of suggested questions
+    """
+    return get_question_pool(category).localized(language)[:count]
+
+
+def rank_questions(query_vector: np.ndarray, pool: QuestionPool, language: str, count: int = 3) -> List[str]:
+    """
+    Pick the pool questions closest to a query.
+
+    Questions that are near-duplicates of the query itself are skipped.
+
+    Args:
+        query_vector: Unit-length query embedding
+        pool: Question pool with vectors
+        language: Response language
+        count: Number of questions
+
+    Returns:
+        List of follow-up questions
+    """
+    scores = pool.vectors @ query_vector
+    localized = pool.localized(language)
+    ranked = [i for i in np.argsort(-scores) if scores[i] < settings.SUGGESTION_DUPLICATE_THRESHOLD]
+    return [localized[i] for i in ranked[:count]]
+
+
+async def select_follow_up_questions(query: str, category: str, language: str, count: int = 3) -> List[str]:
+    """
+    Select follow-up questions for a query from the category's question pool.
+
+    Args:
+        query: User's question
+        category: Legal category
+        language: Response language
+        count: Number of questions
+
+    Returns:
+        List of follow-up questions in the response language
+    """
+    pool = get_question_pool(category)
+    if pool.vectors is None:
+        return pool.localized(language)[:count]
+    return rank_questions(await embed_query(query), pool, language, count)
+
+
+def parse_questions(text: str) -> List[str]:
+    """Extract questions from a list-formatted LLM response."""
+    questions = []
+    for line in text.split("\n"):
+        # Strip numbering and bullets
+        line = re.sub(r"^\s*(?:[-*•]|\d+[.)])\s*", "", line).strip()
+        if line.endswith("?"):
+            questions.append(line)
+    return questions
+
+
+async def build_question_pool(category: str, llm) -> QuestionPool:
+    """
+    Generate, embed and translate a fresh question pool for a category.
+
+    Args:
+        category: Legal category
+        llm: Language model
+
+    Returns:
+        New question pool
+    """
+    prompt = f"""
+    Generate {settings.SUGGESTION_POOL_SIZE} common legal questions related to the category: {category}, as asked in India.
+
+    These questions should be:
+    1. Clear and specific
+    2. Relevant to {category} law
+    3. Questions that a non-expert might ask
+    4. Different from each other, covering a range of topics
+
+    Format your response as a simple list with each question on a new line, without numbers or bullets.
+    """
+    result = await llm.ainvoke(prompt)
+
+    # Keep the seed questions first, then add new generated ones
+    questions = list(seed_questions(category))
+    seen = {q.lower() for q in questions}
+    for question in parse_questions(result.content):
+        if question.lower() not in seen:
+            seen.add(question.lower())
+            questions.append(question)
+    questions = questions[:max(settings.SUGGESTION_POOL_SIZE, len(seed_questions(category)))]
+
+    vectors = np.asarray(await get_embeddings().aembed_documents(questions), dtype=np.float32)
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+    translations = {}
+    if settings.ENABLE_TRANSLATION:
+        for language in settings.SUPPORTED_LANGUAGES:
+            if language == "English":
+                continue
+            # Translate as a bullet list so each question is its own segment
+            translated = await translate_text(
+                "\n".join(f"- {q}" for q in questions), "English", language, llm
+            )
+            translated = [re.sub(r"^\s*[-*•]\s*", "", line).strip()
+                          for line in translated.split("\n") if line.strip()]
+            if len(translated) == len(questions):
+                translations[language] = translated
+
+    return QuestionPool(questions, vectors, translations)
+
+
+class FilePoolStore:
+    """Question pools in a JSON file, refreshed by whichever worker holds its lock file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock_file = None
+
+    def _load(self) -> Optional[Dict]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _save(self, data: Dict):
+        # Write a temporary file and swap it in, so readers never see half a file
+        temporary = f"{self.path}.{os.getpid()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temporary, self.path)
+
+    async def load(self) -> Optional[Dict]:
+        return await run_blocking(self._load)
+
+    async def save(self, data: Dict):
+        await run_blocking(self._save, data)
+
+    async def acquire(self) -> bool:
+        lock_file = open(f"{self.path}.lock", "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    async def release(self):
+        if self._lock_file is not None:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+            self._lock_file.close()
+            self._lock_file = None
+
+
+class RedisPoolStore:
+    """
+    Question pools in Redis, shared by all workers and hosts. The refresh
+    lock expires after SUGGESTION_LOCK_SECONDS in case its holder dies.
+    """
+
+    def __init__(self, client, lock_seconds: int):
+        self.client = client
+        self.lock_seconds = lock_seconds
+        self._token = None
+
+    async def load(self) -> Optional[Dict]:
+        value = await self.client.get("question-pools")
+        return json.loads(value) if value else None
+
+    async def save(self, data: Dict):
+        await self.client.set("question-pools", json.dumps(data, ensure_ascii=False))
+
+    async def acquire(self) -> bool:
+        token = uuid.uuid4().hex
+        if await self.client.set("question-pools:lock", token, nx=True, ex=self.lock_seconds):
+            self._token = token
+            return True
+        return False
+
+    async def release(self):
+        if self._token is not None:
+            held = await self.client.get("question-pools:lock")
+            if held is not None and held.decode() == self._token:
+                await self.client.delete("question-pools:lock")
+            self._token = None
+
+
+def get_pool_store():
+    """Get the shared question pool store (Redis if configured, otherwise a file)."""
+    if redis_client is not None:
+        return RedisPoolStore(redis_client, settings.SUGGESTION_LOCK_SECONDS)
+    return FilePoolStore(settings.SUGGESTION_POOL_PATH)
+
+
+def install_question_pools(data: Dict):
+    """Replace the current pools with stored ones."""
+    global _generation
+    for category, pool in data["pools"].items():
+        _pools[category] = QuestionPool.from_dict(pool)
+    _generation = data["generation"]
+
+
+def pool_built_at(data: Optional[Dict], category: str) -> float:
+    """When a category's stored pool was built (0 if it never was)."""
+    if data is None:
+        return 0.0
+    return data.get("pools_built_at", {}).get(category, data.get("built_at", 0.0) if category in data["pools"] else 0.0)
+
+
+def stale_categories(data: Optional[Dict]) -> List[str]:
+    """Categories whose stored pool is missing or older than SUGGESTION_REFRESH_SECONDS."""
+    now = time.time()
+    return [
+        category for category in settings.LEGAL_CATEGORIES
+        if now - pool_built_at(data, category) >= settings.SUGGESTION_REFRESH_SECONDS
+    ]
+
+
+async def refresh_question_pools(llm, categories: List[str]):
+    """
+    Build new question pools for categories.
+
+    Args:
+        llm: Language model
+        categories: Categories to rebuild
+
+    Returns:
+        (pools, failed): new pools by category, and the categories whose
+        build failed
+    """
+    pools = {}
+    failed = []
+    for category in categories:
+        try:
+            pools[category] = await build_question_pool(category, llm)
+        except Exception as e:
+            print(f"Error refreshing suggested questions for {category}: {str(e)}")
+            failed.append(category)
+    return pools, failed
+
+
+async def sync_question_pools(store, llm):
+    """
+    Install the stored pools if another worker has built newer ones, and
+    rebuild stale ones if no other worker is already doing so.
+
+    Categories whose rebuild fails keep their previously stored pool and
+    build time, so they stay stale and are retried at the next poll instead
+    of seed pools being published as fresh.
+
+    Args:
+        store: FilePoolStore or RedisPoolStore
+        llm: Language model
+    """
+    global _generation
+    data = await store.load()
+    if data is not None and data["generation"] != _generation:
+        install_question_pools(data)
+    if not stale_categories(data) or not await store.acquire():
+        return
+    try:
+        # Another worker may have finished a rebuild while we took the lock
+        data = await store.load()
+        if data is not None and data["generation"] != _generation:
+            install_question_pools(data)
+        stale = stale_categories(data)
+        if not stale:
+            return
+        pools, failed = await refresh_question_pools(llm, stale)
+        if not pools:
+            return
+
+        stored = dict(data["pools"]) if data else {}
+        built_at = {category: pool_built_at(data, category) for category in stored}
+        now = time.time()
+        for category, pool in pools.items():
+            stored[category] = pool.to_dict()
+            built_at[category] = now
+        generation = (data["generation"] if data else 0) + 1
+        await store.save({
+            "generation": generation,
+            "pools": stored,
+            "pools_built_at": built_at
+        })
+        _pools.update(pools)
+        _generation = generation
+        if failed:
+            print(f"Suggested question pools not refreshed for {', '.join(failed)}; retrying at the next poll")
+    finally:
+        await store.release()
+
+
+async def run_question_pool_refresh(llm):
+    """Keep the question pools in sync with the store, checking every SUGGESTION_POLL_SECONDS."""
+    store = get_pool_store()
+    while True:
+        try:
+            await sync_question_pools(store, llm)
+        except Exception as e:
+            print(f"Error syncing suggested question pools: {str(e)}")
+        await asyncio.sleep(settings.SUGGESTION_POLL_SECONDS)
+
+
+def start_question_pool_refresh(llm):
+    """Start loading and refreshing the shared question pools in the background."""
+    global _refresh_task
+    if _refresh_task is None or _refresh_task.done():
+        _refresh_task = asyncio.create_task(run_question_pool_refresh(llm))
+    return _refresh_task
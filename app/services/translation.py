@@ -1,20 +1,224 @@
-def translate_text(text, source_lang, target_lang, llm):
+import hashlib
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+from app.config import settings
+
+# Bullet and numbered list markers, kept as-is around translated segments
+BULLET_PATTERN = re.compile(r"^(\s*(?:[-*\u2022]|\d+[.)])\s+)(.*)$")
+
+# Markers used to translate several segments in one LLM call
+SEGMENT_MARKER_PATTERN = re.compile(r"\[\[(\d+)\]\]")
+PARTIAL_MARKER_PATTERN = re.compile(r"\[(?:\[\d*\]?)?$")
+
+
+class SegmentMarkerError(ValueError):
+    """A streamed batch translation's [[n]] markers didn't run 1..N in order."""
+
+
+# Unicode ranges of the scripts supported languages are written in
+LANGUAGE_SCRIPTS = {
+    "Hindi": ("\u0900", "\u097f"),
+    "Marathi": ("\u0900", "\u097f"),
+}
+
+
+class TranslationMemory:
     """
-    Translate text from source language to target language.
+    Segment-level translation memory.
+    
+    Translations are keyed by a hash of the segment text and the language
+    pair. Recent entries are kept in an LRU in memory; if a path is given,
+    all entries are also persisted to a SQLite file shared across restarts.
+    """
+
+    def __init__(self, max_entries: int, path: str = ""):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS translations (key TEXT PRIMARY KEY, translation TEXT NOT NULL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def key(segment: str, source_lang: str, target_lang: str) -> str:
+        raw = f"{source_lang}|{target_lang}|{segment.strip()}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, segment: str, source_lang: str, target_lang: str):
+        key = self.key(segment, source_lang, target_lang)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            if self._db is None:
+                return None
+            row = self._db.execute("SELECT translation FROM translations WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._remember(key, row[0])
+            return row[0]
+
+    def set(self, segment: str, source_lang: str, target_lang: str, translation: str):
+        key = self.key(segment, source_lang, target_lang)
+        with self._lock:
+            self._remember(key, translation)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO translations (key, translation) VALUES (?, ?)",
+                    (key, translation)
+                )
+                self._db.commit()
+
+    def _remember(self, key: str, translation: str):
+        self._entries[key] = translation
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+@lru_cache
+def get_translation_memory() -> TranslationMemory:
+    """Get the process-wide translation memory."""
+    return TranslationMemory(settings.TRANSLATION_MEMORY_SIZE, settings.TRANSLATION_MEMORY_PATH)
+
+
+def split_segments(text):
+    """
+    Split text into translatable segments: paragraphs and bullet items.
     
     Args:
-        text: Text to translate
+        text: Text to split
+        
+    Returns:
+        List of (kind, value) parts that concatenate back to the text. Parts
+        of kind "segment" are translated; parts of kind "text" (line breaks,
+        blank lines, bullet markers) are kept as-is.
+    """
+    parts = []
+    paragraph = []
+    
+    def flush():
+        if paragraph:
+            parts.append(("segment", "\n".join(paragraph)))
+            paragraph.clear()
+    
+    for i, line in enumerate(text.split("\n")):
+        bullet = BULLET_PATTERN.match(line)
+        if line.strip() and not bullet and paragraph:
+            # Continuation of the current paragraph
+            paragraph.append(line)
+            continue
+        flush()
+        if i > 0:
+            parts.append(("text", "\n"))
+        if not line.strip():
+            parts.append(("text", line))
+        elif bullet:
+            parts.append(("text", bullet.group(1)))
+            parts.append(("segment", bullet.group(2)))
+        else:
+            paragraph.append(line)
+    flush()
+    return parts
+
+
+def is_in_language(text, language, threshold=0.5):
+    """
+    Check whether most letters of a text are in the script of a language.
+    
+    Used to catch answers that were meant to be written directly in a
+    language but came back in English. Languages with no known script
+    always pass.
+    
+    Args:
+        text: Text to check
+        language: Expected language
+        threshold: Minimum share of letters in the language's script
+        
+    Returns:
+        True if the text looks like it is in the language
+    """
+    script = LANGUAGE_SCRIPTS.get(language)
+    letters = [ch for ch in text if ch.isalpha()]
+    if script is None or not letters:
+        return True
+    in_script = sum(1 for ch in letters if script[0] <= ch <= script[1])
+    return in_script / len(letters) >= threshold
+
+def needs_translation(segment):
+    """Whether a segment contains any words (numbers and symbols are kept as-is)."""
+    return any(ch.isalpha() for ch in segment)
+
+
+def lookup_segments(parts, source_lang, target_lang, memory):
+    """
+    Look up the segments of a text in the translation memory.
+    
+    Args:
+        parts: Parts returned by split_segments
         source_lang: Source language
         target_lang: Target language
-        llm: Language model to use for translation
+        memory: Translation memory
         
     Returns:
-        Translated text
+        (known, missing): translations found for segments, and the unique
+        segments that still need translating, in order of appearance
     """
-    if source_lang == target_lang:
-        return text
+    known = {}
+    missing = []
+    for kind, value in parts:
+        if kind != "segment" or value in known or value in missing:
+            continue
+        if not needs_translation(value):
+            known[value] = value
+            continue
+        cached = memory.get(value, source_lang, target_lang)
+        if cached is not None:
+            known[value] = cached
+        else:
+            missing.append(value)
+    return known, missing
 
-    translation_prompt = f"""
+
+def build_batch_translation_prompt(segments, source_lang, target_lang):
+    """
+    Build a prompt translating several numbered segments in one call.
+    
+    Args:
+        segments: Segments to translate
+        source_lang: Source language
+        target_lang: Target language
+        
+    Returns:
+        Prompt string
+    """
+    numbered = "\n".join(f"[[{i}]]\n{segment}" for i, segment in enumerate(segments, start=1))
+    return build_translation_prompt(numbered, source_lang, target_lang) + f"""
+    The text above consists of {len(segments)} numbered segments. Translate each segment separately and
+    keep every marker ([[1]], [[2]], ...) exactly as it is, on its own line before its translated segment.
+    """
+
+def build_translation_prompt(text, source_lang, target_lang):
+    """
+    Build the legal translation prompt for a piece of text.
+    
+    Args:
+        text: Text to translate
+        source_lang: Source language
+        target_lang: Target language
+        
+    Returns:
+        Prompt string
+    """
+    return f"""
     You are a professional legal translator with expertise in accurately translating legal documents while preserving their precise meaning and intent.
 
     Task:
@@ -32,6 +236,189 @@ def translate_text(text, source_lang, target_lang, llm):
 
     {text}
     """
+
+async def translate_text(text, source_lang, target_lang, llm):
+    """
+    Translate text from source language to target language.
     
-    response = llm.invoke(translation_prompt)
-    return response.content
\ No newline at end of file
+    The text is split into paragraph and bullet segments. Segments already
+    in the translation memory are reused, and only new segments are sent
+    to the LLM, together in a single call.
+    
+    Args:
+        text: Text to translate
+        source_lang: Source language
+        target_lang: Target language
+        llm: Language model to use for translation
+        
+    Returns:
+        Translated text
+    """
+    if source_lang == target_lang:
+        return text
+
+    memory = get_translation_memory()
+    parts = split_segments(text)
+    translations, missing = lookup_segments(parts, source_lang, target_lang, memory)
+
+    if len(missing) == 1:
+        response = await llm.ainvoke(build_translation_prompt(missing[0], source_lang, target_lang))
+        translations[missing[0]] = response.content.strip()
+        memory.set(missing[0], source_lang, target_lang, translations[missing[0]])
+    elif missing:
+        response = await llm.ainvoke(build_batch_translation_prompt(missing, source_lang, target_lang))
+        translated = parse_batch_translation(response.content, len(missing))
+        if translated is None:
+            # The markers didn't survive; translate the whole text in one piece
+            return await translate_whole_text(text, source_lang, target_lang, llm)
+        for segment, translation in zip(missing, translated):
+            translations[segment] = translation
+            memory.set(segment, source_lang, target_lang, translation)
+
+    return "".join(translations[value] if kind == "segment" else value for kind, value in parts)
+
+async def translate_whole_text(text, source_lang, target_lang, llm):
+    """
+    Translate text in one piece, bypassing the translation memory. Used when
+    a batch translation's segment markers don't line up.
+    
+    Args:
+        text: Text to translate
+        source_lang: Source language
+        target_lang: Target language
+        llm: Language model to use for translation
+        
+    Returns:
+        Translated text
+    """
+    response = await llm.ainvoke(build_translation_prompt(text, source_lang, target_lang))
+    return response.content
+
+def parse_batch_translation(output, expected):
+    """
+    Split the output of a batch translation back into segments.
+    
+    Args:
+        output: LLM output with [[n]] markers
+        expected: Number of segments that were sent
+        
+    Returns:
+        List of translated segments, or None if the markers don't line up
+    """
+    pieces = SEGMENT_MARKER_PATTERN.split(output)
+    # pieces = [preamble, "1", text1, "2", text2, ...]
+    numbers = [int(n) for n in pieces[1::2]]
+    if numbers != list(range(1, expected + 1)):
+        return None
+    return [piece.strip() for piece in pieces[2::2]]
+
+async def stream_translation(text, source_lang, target_lang, llm):
+    """
+    Translate text, yielding the translation as it is generated.
+    
+    Segments found in the translation memory are yielded immediately; the
+    rest are translated in one streamed call. New translations are only
+    stored once the whole output is in and its [[n]] markers have been
+    checked to run 1..N in order, as parse_batch_translation does.
+    
+    Args:
+        text: Text to translate
+        source_lang: Source language
+        target_lang: Target language
+        llm: Language model to use for translation
+        
+    Yields:
+        Chunks of translated text
+        
+    Raises:
+        SegmentMarkerError: If the markers didn't line up. Nothing is stored
+            and the chunks already yielded may pair text with the wrong
+            segment; callers should fall back to translate_whole_text.
+    """
+    if source_lang == target_lang:
+        yield text
+        return
+
+    memory = get_translation_memory()
+    parts = split_segments(text)
+    known, missing = lookup_segments(parts, source_lang, target_lang, memory)
+
+    if not missing:
+        yield "".join(known[value] if kind == "segment" else value for kind, value in parts)
+        return
+
+    if len(missing) == 1:
+        prompt = build_translation_prompt(missing[0], source_lang, target_lang)
+    else:
+        prompt = build_batch_translation_prompt(missing, source_lang, target_lang)
+    stream = llm.astream(prompt)
+    buffer = ""
+    done = False
+    current = 0 if len(missing) > 1 else 1  # Number of the segment being streamed
+    markers = []  # Marker numbers in the order they were read
+    translated = []  # (segment, translation) pairs, stored once markers are checked
+
+    async def next_chunk():
+        nonlocal buffer, done
+        try:
+            chunk = await stream.__anext__()
+            buffer += chunk.content
+        except StopAsyncIteration:
+            done = True
+
+    for kind, value in parts:
+        if kind != "segment":
+            yield value
+            continue
+        if value in known:
+            yield known[value]
+            continue
+        # Stream this segment's translation up to the next marker
+        number = missing.index(value) + 1
+        translation = ""
+        while True:
+            match = SEGMENT_MARKER_PATTERN.search(buffer)
+            if current < number:
+                # Skip ahead to the marker that starts this segment
+                if match:
+                    current = int(match.group(1))
+                    markers.append(current)
+                    buffer = buffer[match.end():]
+                    continue
+            else:
+                if match:
+                    end = match.start()
+                elif done:
+                    end = len(buffer.rstrip())
+                else:
+                    # Hold back trailing whitespace and a possibly partial marker
+                    partial = PARTIAL_MARKER_PATTERN.search(buffer)
+                    end = len(buffer[:partial.start()].rstrip() if partial else buffer.rstrip())
+                piece = buffer[:end] if translation else buffer[:end].lstrip()
+                if match:
+                    piece = piece.rstrip()
+                if piece:
+                    translation += piece
+                    yield piece
+                buffer = buffer[end:]
+                if match or done:
+                    break
+            if done:
+                break
+            await next_chunk()
+        if translation:
+            known[value] = translation
+            translated.append((value, translation))
+        else:
+            # Nothing came back for this segment; keep the original text
+            yield value
+
+    if len(missing) > 1:
+        # Read the rest of the output so stray or extra markers are seen too
+        while not done:
+            await next_chunk()
+        markers.extend(int(n) for n in SEGMENT_MARKER_PATTERN.findall(buffer))
+        if markers != list(range(1, len(missing) + 1)):
+            raise SegmentMarkerError(f"Expected markers 1..{len(missing)}, got {markers}")
+    for segment, translation in translated:
+        memory.set(segment, source_lang, target_lang, translation)
@@ -0,0 +1,301 @@
+import glob
+import os
+import shutil
+import time
+from uuid import uuid4
+from collections.abc import Mapping
+from typing import Callable, Optional, Union
+
+import faiss
+import numpy as np
+from langchain_community.docstore.base import Docstore
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from app.config import settings
+from app.services.chunk_store import HEADER_FILE, STORE_FILES, ChunkStore, write_chunk_store
+from app.services.lexical import INDEX_FILES as LEXICAL_FILES, write_lexical_index
+
+INDEX_FILE = "index.faiss"
+
+# Each save writes a complete new version of the store under versions/ and
+# then points CURRENT at it
+CURRENT_FILE = "CURRENT"
+VERSIONS_DIR = "versions"
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+# Map flat vector codes straight from the file instead of copying them into
+# process memory (older faiss versions only support IO_FLAG_MMAP)
+MMAP_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+# Files of earlier store formats, removed when a store is saved
+LEGACY_FILES = ["index.pkl", "docstore.sqlite"]
+
+
+class ChunkStoreDocstore(Docstore):
+    """
+    Docstore over a ChunkStore. Docstore ids are vector positions, so a
+    search result is resolved to its chunk without any id lookup table.
+    """
+
+    def __init__(self, chunks: ChunkStore):
+        self.chunks = chunks
+
+    def search(self, search: str) -> Union[str, Document]:
+        position = int(search)
+        if not 0 <= position < len(self.chunks):
+            return f"ID {search} not found."
+        return self.chunks.document(position)
+
+
+class PositionIndexMap(Mapping):
+    """Vector position -> docstore id mapping for a ChunkStoreDocstore."""
+
+    def __init__(self, count: int):
+        self.count = count
+
+    def __getitem__(self, position):
+        if not 0 <= position < self.count:
+            raise KeyError(position)
+        return str(int(position))
+
+    def __iter__(self):
+        return iter(range(self.count))
+
+    def __len__(self):
+        return self.count
+
+
+def store_files_path(path: str) -> str:
+    """
+    Directory holding the files of a store's current version.
+
+    Readers resolve this once and read every file of the store (index,
+    chunks, lexical index) from it, so they never mix two versions.
+
+    Args:
+        path: Store directory
+
+    Returns:
+        The version directory CURRENT points at, or the store directory
+        itself for stores saved before versioning
+    """
+    try:
+        with open(os.path.join(path, CURRENT_FILE), encoding="utf-8") as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        return path
+    return os.path.join(path, VERSIONS_DIR, version)
+
+
+def store_file_dir(path: str, name: str, files_path: Optional[str] = None) -> str:
+    """
+    Directory holding a file saved with a store's version (see the
+    write_files argument of save_vector_store).
+
+    Args:
+        path: Store directory
+        name: File name
+        files_path: Version directory already resolved with store_files_path
+
+    Returns:
+        The version directory, or the store directory if the file is only
+        there (stores saved before the file was versioned)
+    """
+    files_path = files_path or store_files_path(path)
+    if not os.path.exists(os.path.join(files_path, name)) and os.path.exists(os.path.join(path, name)):
+        return path
+    return files_path
+
+
+def search_index_path(path: str, index_type: str) -> str:
+    """Path of the approximate index of a given type in a store directory."""
+    return os.path.join(path, f"index.{index_type}.faiss")
+
+
+def pq_subquantizers(dimension: int, preferred: int) -> int:
+    """Largest number of PQ sub-quantizers up to `preferred` that divides the dimension."""
+    return next(m for m in range(min(preferred, dimension), 0, -1) if dimension % m == 0)
+
+
+def build_search_index(flat_index, index_type: str):
+    """
+    Build an approximate index holding the same vectors, at the same
+    positions, as a flat index.
+    
+    IVF indexes are trained on a random sample of up to
+    INDEX_TRAINING_SAMPLE vectors.
+    
+    Args:
+        flat_index: Exact faiss index with the vectors
+        index_type: "ivf_flat", "ivf_pq" or "hnsw"
+    
+    Returns:
+        faiss index
+    """
+    vectors = flat_index.reconstruct_n(0, flat_index.ntotal)
+    n, dimension = vectors.shape
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, settings.INDEX_HNSW_M)
+        index.hnsw.efConstruction = settings.INDEX_HNSW_EF_CONSTRUCTION
+        index.add(vectors)
+        return index
+    
+    # faiss wants at least 39 training vectors per list
+    nlist = settings.INDEX_NLIST or int(4 * np.sqrt(n))
+    nlist = max(1, min(nlist, n // 39))
+    quantizer = faiss.IndexFlatL2(dimension)
+    if index_type == "ivf_flat":
+        index = faiss.IndexIVFFlat(quantizer, dimension, nlist)
+    elif index_type == "ivf_pq":
+        index = faiss.IndexIVFPQ(
+            quantizer, dimension, nlist,
+            pq_subquantizers(dimension, settings.INDEX_PQ_M), settings.INDEX_PQ_BITS
+        )
+    else:
+        raise ValueError(f"Unknown index type '{index_type}'. Must be one of: {', '.join(INDEX_TYPES)}")
+    
+    sample_size = min(n, settings.INDEX_TRAINING_SAMPLE)
+    sample = vectors[np.random.default_rng(0).choice(n, sample_size, replace=False)]
+    index.train(sample)
+    index.add(vectors)
+    # Keep vectors reconstructable by position (used for category centroids)
+    index.make_direct_map()
+    return index
+
+
+def tune_search_index(index, nprobe: Optional[int] = None, ef_search: Optional[int] = None):
+    """
+    Set the query-time search breadth of an approximate index; flat indexes
+    are left as they are.
+    
+    Args:
+        index: faiss index
+        nprobe: IVF lists to visit (default INDEX_NPROBE)
+        ef_search: HNSW candidate list size (default INDEX_EF_SEARCH)
+    
+    Returns:
+        The same index
+    """
+    if hasattr(index, "nprobe"):
+        index.nprobe = nprobe or settings.INDEX_NPROBE
+    if hasattr(index, "hnsw"):
+        index.hnsw.efSearch = ef_search or settings.INDEX_EF_SEARCH
+    return index
+
+
+def save_vector_store(vectors: FAISS, path: str, write_files: Optional[Callable[[str], None]] = None):
+    """
+    Save a FAISS vector store as a native faiss index plus a columnar chunk
+    store (no pickle) and a BM25 lexical index over the chunks. The saved
+    index is always exact; with an approximate INDEX_TYPE, that index is
+    built and saved next to it.
+
+    All files go into a new version directory, and CURRENT is then switched
+    to it in one os.replace. A worker loading the store at any moment sees
+    either the old version or the new one, never a mix. The previous version
+    is kept for workers that resolved it just before the switch; older ones
+    are removed (workers that still have their files mapped keep them until
+    they reload).
+
+    Args:
+        vectors: FAISS vector store
+        path: Directory to save to
+        write_files: Called with the new version directory before the switch,
+            to save other files that have to change together with the vectors
+    """
+    version = f"{time.strftime('%Y%m%d%H%M%S')}-{uuid4().hex[:8]}"
+    files_path = os.path.join(path, VERSIONS_DIR, version)
+    os.makedirs(files_path)
+    previous = store_files_path(path)
+
+    # Chunks in vector position order, so position i is chunk i
+    docs = []
+    for position in range(vectors.index.ntotal):
+        doc_id = vectors.index_to_docstore_id[position]
+        doc = vectors.docstore.search(doc_id)
+        docs.append(Document(id=doc_id, page_content=doc.page_content, metadata=doc.metadata))
+    write_chunk_store(files_path, docs)
+    write_lexical_index(files_path, [doc.page_content for doc in docs])
+
+    faiss.write_index(vectors.index, os.path.join(files_path, INDEX_FILE))
+    if settings.INDEX_TYPE != "flat" and vectors.index.ntotal >= settings.INDEX_MIN_VECTORS:
+        search_path = search_index_path(files_path, settings.INDEX_TYPE)
+        faiss.write_index(build_search_index(vectors.index, settings.INDEX_TYPE), search_path)
+    if write_files is not None:
+        write_files(files_path)
+
+    current_path = os.path.join(path, CURRENT_FILE)
+    with open(current_path + ".tmp", "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(current_path + ".tmp", current_path)
+
+    keep = {version, os.path.basename(previous)}
+    for old_path in glob.glob(os.path.join(path, VERSIONS_DIR, "*")):
+        if os.path.basename(old_path) not in keep:
+            shutil.rmtree(old_path, ignore_errors=True)
+    # Files of the unversioned layout and earlier store formats
+    legacy = [INDEX_FILE] + STORE_FILES + LEXICAL_FILES + LEGACY_FILES
+    legacy += [os.path.basename(p) for p in glob.glob(os.path.join(path, "index.*.faiss"))]
+    for name in legacy:
+        if os.path.exists(os.path.join(path, name)):
+            os.remove(os.path.join(path, name))
+
+
+def load_vector_store(path: str, embeddings, writable: bool = False) -> FAISS:
+    """
+    Load a vector store saved by save_vector_store.
+
+    `path` may be a store directory (its current version is loaded) or a
+    version directory resolved with store_files_path, so callers that read
+    other files of the store can use the same version.
+
+    By default the index and chunk store are memory-mapped read-only, so all
+    workers share one copy through the page cache and chunks are decoded
+    only when a search returns them. The approximate index of the configured
+    INDEX_TYPE is used if ingestion built one, tuned to INDEX_NPROBE and
+    INDEX_EF_SEARCH. Stores saved by FAISS.save_local are still loaded, the
+    old way.
+
+    Args:
+        path: Directory of the vector store
+        embeddings: Embedding model
+        writable: Load the index and chunks into memory so the store can be
+            modified (used by ingestion)
+
+    Returns:
+        FAISS vector store
+    """
+    path = store_files_path(path)
+    index_path = os.path.join(path, INDEX_FILE)
+    if not os.path.exists(os.path.join(path, HEADER_FILE)):
+        print(f"No chunk store in {path}, loading the legacy pickled docstore; re-run ingestion to convert it")
+        return FAISS.load_local(path, embeddings, allow_dangerous_deserialization=True)
+
+    chunks = ChunkStore(path)
+    if not writable:
+        search_path = search_index_path(path, settings.INDEX_TYPE)
+        if settings.INDEX_TYPE != "flat" and os.path.exists(search_path):
+            index = tune_search_index(faiss.read_index(search_path, MMAP_FLAGS))
+        else:
+            index = faiss.read_index(index_path, MMAP_FLAGS)
+        return FAISS(
+            embedding_function=embeddings,
+            index=index,
+            docstore=ChunkStoreDocstore(chunks),
+            index_to_docstore_id=PositionIndexMap(len(chunks))
+        )
+
+    docs = {}
+    index_to_docstore_id = {}
+    for position in range(len(chunks)):
+        doc = chunks.document(position)
+        docs[doc.id] = doc
+        index_to_docstore_id[position] = doc.id
+    return FAISS(
+        embedding_function=embeddings,
+        index=faiss.read_index(index_path),
+        docstore=InMemoryDocstore(docs),
+        index_to_docstore_id=index_to_docstore_id
+    )
@@ -0,0 +1,54 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from app.config import settings
+
+# Bounded pool for blocking work (FAISS search, sync SDK clients, PDF parsing)
+# that would otherwise stall the event loop
+blocking_executor = ThreadPoolExecutor(
+    max_workers=settings.BLOCKING_POOL_SIZE,
+    thread_name_prefix="lawzo-blocking"
+)
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    Run a blocking callable in the bounded thread pool.
+    
+    Args:
+        func: Blocking callable
+        *args: Positional arguments for func
+        **kwargs: Keyword arguments for func
+        
+    Returns:
+        Result of func
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(blocking_executor, partial(func, *args, **kwargs))
+
+def install_default_executor():
+    """
+    Make the bounded pool the event loop's default executor, so that
+    libraries calling loop.run_in_executor(None, ...) (e.g. LangChain's
+    async retriever fallbacks) share the same limit.
+    """
+    asyncio.get_running_loop().set_default_executor(blocking_executor)
+
+class RateLimiter:
+    """Spaces out async calls so that at most `per_minute` start each minute."""
+    
+    def __init__(self, per_minute: int):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next_slot = 0.0
+    
+    async def wait(self):
+        """Wait for the next free slot."""
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.interval
+        await asyncio.sleep(slot - now)
+    
+    def pause(self, seconds: float):
+        """Hold back all callers for a while, e.g. after the API pushed back."""
+        self._next_slot = max(self._next_slot, time.monotonic() + seconds)
@@ -0,0 +1,101 @@
+"""
+Recall-vs-latency benchmark of the approximate index types against exact
+flat search.
+
+Uses the vectors of the saved vector store (or synthetic clustered vectors
+with --synthetic N), builds each approximate index the way ingestion does,
+and sweeps nprobe / efSearch. Queries are stored vectors with added noise,
+searched one at a time as the API does.
+
+Usage:
+    python benchmark_index.py [--store my_vector_store] [--synthetic 100000]
+                              [--queries 500] [--k 4]
+"""
+import argparse
+import os
+import time
+
+import faiss
+import numpy as np
+
+from app.config import settings
+from app.services.vector_store import INDEX_FILE, build_search_index, store_files_path, tune_search_index
+
+SWEEPS = {
+    "ivf_flat": ("nprobe", [1, 4, 8, 16, 32, 64]),
+    "ivf_pq": ("nprobe", [1, 4, 8, 16, 32, 64]),
+    "hnsw": ("efSearch", [16, 32, 64, 128, 256]),
+}
+
+
+def load_vectors(args):
+    """Vectors of the saved store, or synthetic clustered vectors."""
+    if args.synthetic:
+        rng = np.random.default_rng(0)
+        centers = rng.normal(size=(max(1, args.synthetic // 100), args.dimension))
+        labels = rng.integers(len(centers), size=args.synthetic)
+        return (centers[labels] + 0.5 * rng.normal(size=(args.synthetic, args.dimension))).astype(np.float32)
+    index = faiss.read_index(os.path.join(store_files_path(args.store), INDEX_FILE))
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def timed_search(index, queries, k):
+    """Search queries one at a time; returns (result ids, latencies in ms)."""
+    ids = np.empty((len(queries), k), dtype=np.int64)
+    latencies = []
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        _, ids[i] = index.search(query[None, :], k)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return ids, np.array(latencies)
+
+
+def recall(approximate, exact):
+    """Mean fraction of the exact top-k found by the approximate search."""
+    return np.mean([len(set(a) & set(e)) / len(e) for a, e in zip(approximate, exact)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--store", default=settings.VECTOR_STORE_PATH, help="Vector store directory")
+    parser.add_argument("--synthetic", type=int, default=0, help="Use N synthetic vectors instead of the store")
+    parser.add_argument("--dimension", type=int, default=768, help="Dimension of synthetic vectors")
+    parser.add_argument("--queries", type=int, default=500, help="Number of queries")
+    parser.add_argument("--k", type=int, default=settings.RETRIEVAL_K, help="Results per query")
+    parser.add_argument("--types", nargs="+", default=list(SWEEPS), choices=list(SWEEPS), help="Index types")
+    args = parser.parse_args()
+
+    vectors = load_vectors(args)
+    n, dimension = vectors.shape
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(n, min(args.queries, n), replace=False)]
+    queries = (queries + 0.1 * vectors.std() * rng.normal(size=queries.shape)).astype(np.float32)
+    print(f"{n} vectors, dimension {dimension}, {len(queries)} queries, k={args.k}")
+
+    flat = faiss.IndexFlatL2(dimension)
+    flat.add(vectors)
+    exact, latencies = timed_search(flat, queries, args.k)
+    print(f"\n{'index':<10} {'param':<14} {'recall':>7} {'mean ms':>8} {'p95 ms':>8} {'size MB':>8} {'build s':>8}")
+    print(f"{'flat':<10} {'-':<14} {1.0:>7.3f} {latencies.mean():>8.3f} "
+          f"{np.percentile(latencies, 95):>8.3f} {vectors.nbytes / 2**20:>8.1f} {'-':>8}")
+
+    for index_type in args.types:
+        start = time.perf_counter()
+        index = build_search_index(flat, index_type)
+        build_seconds = time.perf_counter() - start
+        size_mb = len(faiss.serialize_index(index)) / 2**20
+
+        param, values = SWEEPS[index_type]
+        for value in values:
+            if param == "nprobe":
+                tune_search_index(index, nprobe=value)
+            else:
+                tune_search_index(index, ef_search=value)
+            approximate, latencies = timed_search(index, queries, args.k)
+            print(f"{index_type:<10} {f'{param}={value}':<14} {recall(approximate, exact):>7.3f} "
+                  f"{latencies.mean():>8.3f} {np.percentile(latencies, 95):>8.3f} "
+                  f"{size_mb:>8.1f} {build_seconds:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+from app.config import settings
+from app.services import chatbot
+from app.services.statutes import StatuteIndex
+
+
+def long_provision(number: str, page: int) -> dict:
+    text = f"{number}. Provision {number}.—" + " ".join(f"clause-{number}-{i}" for i in range(2000))
+    return {"number": number, "title": f"Provision {number}", "page": page,
+            "text": text[:settings.STATUTE_MAX_CHARS]}
+
+
+def use_statute_index(monkeypatch, numbers):
+    index = StatuteIndex({"ipc_act.pdf": [long_provision(n, i) for i, n in enumerate(numbers)]})
+    monkeypatch.setattr(chatbot, "get_statute_index", lambda: index)
+    monkeypatch.setattr(settings, "ENABLE_CITATION_LOOKUP", True)
+    return index
+
+
+def test_two_long_cited_provisions_are_kept_in_full(monkeypatch):
+    index = use_statute_index(monkeypatch, ["302", "420"])
+    documents = chatbot.get_cited_provisions("What do Section 302 and Section 420 IPC say?", "Criminal Law")
+
+    assert [doc.metadata["section"] for doc in documents] == ["302", "420"]
+    for doc in documents:
+        full = index.document("ipc_act.pdf", doc.metadata["section"]).page_content
+        assert len(full) > settings.CONTEXT_MAX_TOKENS * settings.CONTEXT_CHARS_PER_TOKEN / 2
+        assert doc.page_content == full
+
+
+def test_many_cited_provisions_share_the_budget(monkeypatch):
+    use_statute_index(monkeypatch, ["302", "304", "307", "420"])
+    documents = chatbot.get_cited_provisions("Compare Sections 302, 304, 307 and 420 IPC", "Criminal Law")
+
+    budget = settings.CITATION_CONTEXT_MAX_TOKENS * settings.CONTEXT_CHARS_PER_TOKEN
+    assert [doc.metadata["section"] for doc in documents] == ["302", "304", "307", "420"]
+    assert all(doc.page_content for doc in documents)
+    assert sum(len(doc.page_content) for doc in documents) <= budget
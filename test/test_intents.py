@@ -0,0 +1,48 @@
+from app.config import settings
+from app.services.chatbot import condensing_history
+from app.services.intents import is_self_contained
+
+HISTORY = ["Human: What is the punishment for cheating?", "Assistant: Up to seven years under Section 420 IPC."]
+
+STANDALONE_QUESTIONS = [
+    "What is the procedure to file an FIR at a police station?",
+    "Is it legal for my landlord to keep the security deposit?",
+    "How do I apply for anticipatory bail in a criminal case?",
+    "What rights does a tenant have if the owner wants them to leave?",
+    "Can I get more compensation for a defective product from the seller?",
+    "What documents are needed to register a marriage in India?",
+    "What other options do I have if the police refuse to register my complaint?",
+]
+
+FOLLOW_UP_QUESTIONS = [
+    "And for women?",
+    "What about under the new criminal laws?",
+    "What is the punishment for it in that case?",
+    "Can you tell me more about that section?",
+    "Is the same true for companies registered abroad?",
+    "Please elaborate on the second point of your answer",
+    "Does this law apply to private companies as well as government ones?",
+    "Is that provision applicable to minors as well?",
+    "Can the said section be invoked against a company director?",
+    "What is the maximum punishment under this act for a first offence?",
+]
+
+
+def test_standalone_questions_are_self_contained():
+    for question in STANDALONE_QUESTIONS:
+        assert is_self_contained(question, settings.SELF_CONTAINED_MIN_WORDS), question
+
+
+def test_back_references_are_not_self_contained():
+    for question in FOLLOW_UP_QUESTIONS:
+        assert not is_self_contained(question, settings.SELF_CONTAINED_MIN_WORDS), question
+
+
+def test_standalone_questions_skip_condensing():
+    for question in STANDALONE_QUESTIONS:
+        assert condensing_history(question, HISTORY) == [], question
+
+
+def test_follow_ups_keep_history_for_condensing():
+    for question in FOLLOW_UP_QUESTIONS:
+        assert condensing_history(question, HISTORY) == HISTORY, question
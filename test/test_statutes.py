@@ -0,0 +1,50 @@
+from app.services.statutes import StatuteIndex, find_citations
+
+
+def provision(number: str) -> dict:
+    return {"number": number, "title": f"Provision {number}", "page": 1, "text": f"{number}. Provision {number}.—Text."}
+
+
+INDEX = StatuteIndex({
+    "ipc_act.pdf": [provision(n) for n in ["125", "138", "302", "420", "438"]],
+    "COI.pdf": [provision(n) for n in ["14", "21"]],
+    "CompaniesAct2013.pdf": [provision(n) for n in ["138", "149"]],
+})
+
+
+def looked_up(query: str, category: str = "Criminal Law") -> list:
+    return [(doc.metadata["source"], doc.metadata.get("section") or doc.metadata.get("article"))
+            for doc in INDEX.lookup(query, category)]
+
+
+def test_citations_of_unindexed_acts_are_left_to_retrieval():
+    assert looked_up("What does Section 438 CrPC say about anticipatory bail?") == []
+    assert looked_up("What is Section 138 of the Negotiable Instruments Act?") == []
+    assert looked_up("Can my wife claim maintenance under Section 125 CrPC?") == []
+    assert looked_up("Is a cheque bounce under section 138 NI Act a criminal offence?") == []
+    assert looked_up("What is section 66A of the IT Act?") == []
+    assert looked_up("Under the CPC, section 9, which courts can hear civil suits?") == []
+
+
+def test_any_unindexed_citation_skips_the_lookup():
+    assert looked_up("Compare Section 420 IPC with Section 438 CrPC") == []
+
+
+def test_citations_of_indexed_acts_are_looked_up():
+    assert looked_up("What is the punishment under Section 420 IPC?") == [("ipc_act.pdf", "420")]
+    assert looked_up("What does section 302 of the Indian Penal Code say?") == [("ipc_act.pdf", "302")]
+    assert looked_up("Explain Article 21 of the Constitution", "Know Your Rights") == [("COI.pdf", "21")]
+    assert looked_up("What is 420 IPC?") == [("ipc_act.pdf", "420")]
+
+
+def test_unqualified_citations_use_the_category():
+    assert looked_up("What is Section 420?") == [("ipc_act.pdf", "420")]
+    assert looked_up("What does section 138 say?", "Corporate Law") == [("CompaniesAct2013.pdf", "138")]
+
+
+def test_citation_act_is_the_one_next_to_it():
+    assert find_citations("Section 149 of the Companies Act and Section 302 IPC") == [
+        ("section", "149", "CompaniesAct2013.pdf"), ("section", "302", "ipc_act.pdf")
+    ]
+    assert find_citations("Section 438 CrPC") == [("section", "438", "")]
+    assert find_citations("Section 420") == [("section", "420", None)]